@@ -2,87 +2,318 @@ import os
 import json
 import sys
 import time
+import re
+import socket
+import functools
+import unicodedata
+import hashlib
+import heapq
+import bisect
+import itertools
+import argparse
+import threading
+import socketserver
+import zipfile
+import mmap
+import struct
+import shlex
+import signal
+import subprocess
+import shutil
+import zlib
+import contextlib
+import errno
+import sqlite3
+import secrets
+import hmac
+import stat
+import platform
+import tempfile
+from collections import Counter, deque, namedtuple
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from json.decoder import scanstring
 from datetime import datetime
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QComboBox,
     QPushButton, QLabel, QLineEdit, QTreeWidget, QTreeWidgetItem, QMenu,
     QFileDialog, QMessageBox, QFrame, QInputDialog, QSplitter, QTextEdit,
     QGroupBox, QCheckBox, QSpinBox, QTabWidget, QScrollArea, QListWidget,
-    QProgressBar, QStatusBar, QToolTip, QSystemTrayIcon
+    QProgressBar, QStatusBar, QToolTip, QSystemTrayIcon, QDialog, QDialogButtonBox, QListWidgetItem
 )
-from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect, pyqtSignal, QThread, QTimer, QSettings, QMimeData
+from PyQt6.QtCore import Qt, QPropertyAnimation, QEasingCurve, QRect, pyqtSignal, QThread, QTimer, QSettings, QMimeData, QObject, QFileSystemWatcher
 from PyQt6.QtGui import QFont, QColor, QPalette, QIcon, QPixmap, QPainter, QLinearGradient, QKeySequence, QDragEnterEvent, QDropEvent, QAction, QShortcut
 
-class ProjectCreationThread(QThread):
-    """Background thread for project creation with progress updates"""
-    progress_updated = pyqtSignal(int, str)
-    creation_finished = pyqtSignal(bool, str)
-    
-    def __init__(self, creator, preset_name, project_path):
-        super().__init__()
-        self.creator = creator
+STARTED_AT = time.perf_counter()  # Imports done; the startup report measures from here
+
+class CreationJob:
+    """One project creation run by a JobQueue.
+
+    Worker threads only assign the plain fields below; the GUI reads them
+    when the queue reports the job changed.
+    """
+    FINISHED = ("done", "failed", "cancelled")
+    _ids = itertools.count(1)
+
+    def __init__(self, preset_name, project_path, options=None, git_init=False, run_hooks=False):
+        self.id = next(self._ids)
         self.preset_name = preset_name
         self.project_path = project_path
-    
-    def run(self):
+        self.options = options
+        self.git_init = git_init
+        self.run_hooks = run_hooks
+        self.future = None
+        self.reset()
+
+    def reset(self):
+        """Return the job to the queue, e.g. to retry it."""
+        self.state = "queued"  # queued, running, done, failed or cancelled
+        self.progress = 0
+        self.message = "Waiting for a worker..."
+        self.hook_results = []
+        self.throttled = 0.0
+        self.cancel_event = threading.Event()
+        self.cancellable = True  # Until the project has been created; hooks can't be stopped
+
+    @property
+    def finished(self):
+        return self.state in self.FINISHED
+
+class JobQueue(QObject):
+    """Run project creations on a reusable pool of worker threads.
+
+    The pool is BLUEPRINT_JOBS threads wide (default 2); further jobs wait
+    for a free worker. Workers never touch widgets or emit signals: they
+    update their CreationJob and mark it changed, and a timer on the GUI
+    thread reports every job that changed since its last tick in a single
+    jobs_updated signal, so any number of concurrent jobs costs the event
+    loop one update per UPDATE_MS.
+    """
+    jobs_updated = pyqtSignal(list)
+    job_finished = pyqtSignal(object)
+
+    UPDATE_MS = 100
+    DEFAULT_WORKERS = 2
+
+    def __init__(self, creator, parent=None):
+        super().__init__(parent)
+        self.creator = creator
+        self.jobs = {}
+        self.workers = max(1, int(os.environ.get("BLUEPRINT_JOBS") or self.DEFAULT_WORKERS))
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="blueprint-job")
+        self._lock = threading.Lock()
+        self._changed = set()
+        self._finished = []
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.UPDATE_MS)
+        self.timer.timeout.connect(self.flush)
+
+    def submit(self, preset_name, project_path, options=None, git_init=False, run_hooks=False):
+        """Queue a creation; it starts as soon as a worker is free."""
+        job = CreationJob(preset_name, project_path, options, git_init, run_hooks)
+        self.jobs[job.id] = job
+        self._start(job)
+        return job
+
+    def retry(self, job):
+        """Queue a failed or cancelled job again."""
+        if job.state not in ("failed", "cancelled"):
+            return False
+        job.reset()
+        self._start(job)
+        return True
+
+    def cancel(self, job):
+        """Cancel a job; a running one stops before its next node.
+
+        Once its project has been created, e.g. while its hooks run, a job can't be cancelled.
+        """
+        with self._lock:
+            if job.finished or not job.cancellable:
+                return False
+            job.cancel_event.set()
+        if job.future.cancel():  # Still waiting for a worker
+            self._finish(job, "cancelled", "Cancelled before it started")
+        return True
+
+    def active(self):
+        return [job for job in self.jobs.values() if not job.finished]
+
+    def remove_finished(self):
+        """Forget finished jobs; returns their ids."""
+        removed = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in removed:
+            del self.jobs[job_id]
+        return removed
+
+    def shutdown(self):
+        """Cancel every job and wait for the workers to stop; hooks still running are killed."""
+        for job in self.active():
+            job.cancel_event.set()
+            job.future.cancel()
+        self._pool.shutdown(wait=True)
+
+    def flush(self):
+        """Report the jobs changed since the last tick; runs on the GUI thread."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            finished, self._finished = self._finished, []
+            idle = all(job.finished for job in self.jobs.values())
+        jobs = [self.jobs[job_id] for job_id in sorted(changed) if job_id in self.jobs]
+        if jobs:
+            self.jobs_updated.emit(jobs)
+        for job in finished:
+            self.job_finished.emit(job)
+        if idle:
+            self.timer.stop()
+
+    def _start(self, job):
+        self._touch(job)
+        job.future = self._pool.submit(self._run, job)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def _touch(self, job):
+        with self._lock:
+            self._changed.add(job.id)
+
+    def _update(self, job, progress, message):
+        job.progress = progress
+        job.message = message
+        self._touch(job)
+
+    def _finish(self, job, state, message):
+        with self._lock:
+            job.state = state
+            job.message = message
+            if state == "done":
+                job.progress = 100
+            self._changed.add(job.id)
+            self._finished.append(job)
+
+    def _run(self, job):
+        job.state = "running"
+        self._update(job, 10, "Preparing project structure...")
+        # Jobs writing to the same mount share its I/O limits; each keeps its own throttled time
+        throttle = IOGovernor.throttle_for(job.project_path)
         try:
-            self.progress_updated.emit(10, "Preparing project structure...")
-            time.sleep(0.2)  # Small delay for visual feedback
-            
-            self.progress_updated.emit(30, "Creating directories...")
-            success = self.creator.create_project_with_progress(
-                self.preset_name, self.project_path, self.progress_updated
+            created = self.creator.create_project_with_progress(
+                job.preset_name, job.project_path, lambda progress, message: self._update(job, progress, message),
+                job.git_init, job.options, job.cancel_event, throttle
             )
-            
-            if success:
-                self.progress_updated.emit(100, "Project created successfully!")
-                self.creation_finished.emit(True, "Project structure created successfully!")
-            else:
-                self.creation_finished.emit(False, "Template not found!")
+            job.throttled = throttle.throttled if throttle is not None else 0.0
+            with self._lock:
+                job.cancellable = False
+                cancelled = job.cancel_event.is_set()
+                self._changed.add(job.id)
+            if not created:
+                if cancelled:
+                    self._finish(job, "cancelled", "Cancelled")
+                else:
+                    self._finish(job, "failed", "Template not found!")
+                return
+            if cancelled:
+                # The cancel came as the last node was created: the project is complete, but its hooks are not run
+                self._finish(job, "done", "Created before it could be cancelled" + ("; hooks not run" if job.run_hooks else ""))
+                return
+            if job.run_hooks:
+                self._update(job, 100, "Running post-create hooks...")
+                job.hook_results = self.creator.run_hooks(
+                    job.preset_name, job.project_path,
+                    on_finished=lambda result: self._update(
+                        job, 100, f"Hook '{result.name}': {result.status} ({result.elapsed:.1f}s)"
+                    ),
+                    stop=job.cancel_event  # Only set by shutdown once the job is no longer cancellable
+                )
+            failed = sum(result.status != "ok" for result in job.hook_results)
+            message = f"Created; {failed} hook(s) did not succeed" if failed else "Created"
+            if job.throttled >= 0.1:
+                message += f" (throttled {job.throttled:.1f}s by I/O limits)"
+            self._finish(job, "done", message)
         except Exception as e:
-            self.creation_finished.emit(False, f"Failed to create project: {str(e)}")
+            self._finish(job, "failed", f"Failed to create project: {e}")
 
 class AnimatedButton(QPushButton):
     def __init__(self, text, parent=None, tooltip=None):
         super().__init__(text, parent)
         if tooltip:
             self.setToolTip(tooltip)
-        self.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4a90e2, stop:1 #357abd);
-                color: white;
-                border: none;
-                border-radius: 12px;
-                padding: 12px 24px;
-                font-size: 14px;
-                font-weight: bold;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #5ba0f2, stop:1 #4080cd);
-                border: 2px solid #ffffff40;
-            }
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3a80d2, stop:1 #2570ad);
-                padding: 13px 23px 11px 25px;
-            }
-            QPushButton:disabled {
-                background: #555;
-                color: #999;
-            }
-        """)
+
+def node_items(structure):
+    """The (name, content) nodes of one structure level; keys starting with ``$`` are preset directives."""
+    return [(name, content) for name, content in structure.items() if not name.startswith("$")]
+
+def is_folder(content):
+    """Whether a node is a folder; files are None, their text, or an asset reference ``{"$source": path}``."""
+    return isinstance(content, dict) and "$source" not in content
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            break
+        size /= 1024
+    return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+class CreatedPath(namedtuple("CreatedPath", "path kind bytes elapsed throttled")):
+    """A node materialized by ProjectStructureCreator.iter_create.
+
+    ``path`` is relative to the project root, ``kind`` is ``"dir"`` or
+    ``"file"``, ``bytes`` is the number of bytes written and ``elapsed`` the
+    seconds since creation started, of which ``throttled`` were spent
+    waiting on I/O limits (see IOGovernor).
+    """
+    __slots__ = ()
 
 class ProjectStructureCreator:
-    def __init__(self):
-        self.presets_file = "presets.json"
-        self.presets = self.load_presets()
+    FEEDBACK_BUDGET = 2.0
+    PROGRESS_INTERVAL = 0.1
+    NODES_PER_WORKER = 2000
 
-    def load_presets(self):
-        """Load presets from JSON file or return default presets if file doesn't exist."""
-        default_presets = {
+    DESCRIPTIONS = {
+        "react-app": "Modern React application with TypeScript support, testing setup, and build tools.",
+        "nextjs-app": "Next.js application with app router, TypeScript, and Tailwind CSS setup.",
+        "express-api": "Express.js REST API with middleware, authentication, and database integration.",
+        "django-app": "Django web application with apps structure, settings management, and deployment files.",
+        "fastapi-app": "FastAPI application with async support, automatic API documentation, and testing.",
+        "vue-app": "Vue.js application with router, state management, and component structure.",
+        "data-science-project": "Data science project with notebooks, data pipelines, and model organization.",
+        "flutter-app": "Flutter mobile application with proper architecture and platform-specific code.",
+        "go-microservice": "Go microservice with clean architecture, API documentation, and deployment files.",
+        "mobile-app-rn": "React Native mobile app with navigation, services, and cross-platform support."
+    }
+
+    APP_DIR = os.path.dirname(os.path.abspath(__file__))
+    REMOVED = {"$removed": True}  # Hides a preset of a lower layer
+
+    def __init__(self, load=True):
+        """Load every preset layer, or with ``load=False`` start with the built-in presets only.
+
+        Without loading, the caller reads and merges the layers itself, e.g.
+        through a PresetLoader so that the GUI appears before they are read.
+        """
+        # The user layer is the only one saved to; see preset_layers
+        self.presets_file = self.layer_file(self.user_dir())
+        self.validator = PresetValidator()
+        self.invalid_presets = {}
+        self.user_presets = {}
+        self.unreadable_layers = []
+        self._lower_presets = set()
+        self.presets = self.load_presets() if load else self.start_loading()
+        self._plan_cache = {}  # Preset name -> {options key: plan}
+        self._variant_cache = {}
+        self._digest_cache = {}
+        self._stats_cache = {}
+        self._plan_lock = threading.Lock()
+        self._search_index = None
+        self._history = None
+        self._preset_history = None
+        self.backend = default_backend()
+
+    @staticmethod
+    def builtin_presets():
+        """The presets shipped with the app, below every preset layer."""
+        return {
             "react-app": {
                 "public": {
                     "images": {},
@@ -617,95 +848,690 @@ class ProjectStructureCreator:
                 "babel.config.js": None
             }
         }
-        if os.path.exists(self.presets_file):
+
+    def load_presets(self, loaded_presets=None):
+        """Load presets from JSON file or return default presets if file doesn't exist."""
+        # Built-in presets are trusted. Presets from JSON files are validated and
+        # normalized, and unsafe ones are left out and reported through invalid_presets.
+        # Presets in stores are decoded when first used and validated then, since
+        # anyone may drop a store into a layer folder; only the team layer caches,
+        # which this app writes from validated presets, are trusted as they are.
+        library = self.start_loading()
+        for layer, path in self.preset_layers():
+            self.merge_layer(library, layer, path, self.read_layer(layer, path, self.invalid_presets, loaded_presets))
+        return library
+
+    def start_loading(self):
+        """Reset the layer bookkeeping and return a library of just the built-in presets, to merge layers into."""
+        library = PresetLibrary(self.builtin_presets(), self.validator, self.stored_preset_invalid)
+        self.invalid_presets = {}
+        self.user_presets = {}
+        self.unreadable_layers = []
+        self._lower_presets = set(library)
+        return library
+
+    def stored_preset_invalid(self, preset_name, problems):
+        """Called by the library when a stored preset fails to decode or validate; it is dropped from the presets."""
+        self.invalid_presets[preset_name] = problems
+        self.invalidate_plans(preset_name)
+        print(f"Skipped invalid preset '{preset_name}':\n{PresetValidationError(problems)}", file=sys.stderr)
+
+    def read_layer(self, layer, path, invalid, loaded_presets=None):
+        """Read one preset layer as (names, entries), or None if it is missing or unreadable.
+
+        ``entries`` are (name, entry) pairs: the validated structure, the
+        PresetStore holding it (decoded when first used) or None where the
+        layer removes a lower layer's preset. Invalid presets are named but
+        have no entry; their problems go into ``invalid``. Touches no loaded
+        state, so it can run on a background thread.
+        """
+        if layer == "user" and loaded_presets is not None:
+            source = loaded_presets
+        elif layer == "team":
+            source = self.read_cached_layer(path, invalid)
+        else:
+            source = self.read_presets_path(path)
+        if source is None:
+            return None
+        entries = []
+        if isinstance(source, PresetStore):
+            removed_record = PresetStore.encode(self.REMOVED)
+            for name in source:
+                entries.append((name, None if source.raw(name) == removed_record else source))
+            return list(source), entries
+        for name in source:
+            if source[name] == self.REMOVED:
+                entries.append((name, None))
+                continue
+            normalized, problems = self.validator.check(source[name])
+            if problems:
+                invalid[name] = problems
+            else:
+                entries.append((name, normalized))
+        return list(source), entries
+
+    def merge_layer(self, library, layer, path, read):
+        """Apply a layer returned by read_layer on top of library; returns the (added, changed, removed) names.
+
+        Layers must be merged in preset_layers order, after start_loading.
+        """
+        added, changed, removed = [], [], []
+        if read is None:
+            if os.path.exists(path):
+                self.unreadable_layers.append(path)
+            return added, changed, removed
+        names, entries = read
+        for name, entry in entries:
+            if entry is None:
+                if name in library:
+                    del library[name]
+                    removed.append(name)
+                continue
+            (changed if name in library else added).append(name)
+            if isinstance(entry, PresetStore):
+                library.add_stored(name, entry)
+            else:
+                library[name] = entry
+        if layer == "user":
+            self.user_presets = dict.fromkeys(names)
+        else:
+            self._lower_presets.update(names)
+        return added, changed, removed
+
+    @staticmethod
+    def user_dir():
+        """Folder of the user's own, writable preset layer (BLUEPRINT_CONFIG_DIR overrides it)."""
+        if os.environ.get("BLUEPRINT_CONFIG_DIR"):
+            return os.environ["BLUEPRINT_CONFIG_DIR"]
+        if sys.platform == "win32":
+            return os.path.join(os.environ.get("APPDATA", os.path.expanduser("~")), "Blueprint Generator")
+        return os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"), "blueprint-generator")
+
+    def system_dir(self):
+        if sys.platform == "win32":
+            return os.path.join(os.environ.get("PROGRAMDATA", "C:\\ProgramData"), "Blueprint Generator")
+        return "/etc/blueprint-generator"
+
+    def cache_dir(self):
+        if sys.platform == "win32":
+            return os.path.join(os.environ.get("LOCALAPPDATA", self.user_dir()), "Blueprint Generator", "cache")
+        return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "blueprint-generator")
+
+    def layer_file(self, folder):
+        """The presets file of a layer folder: a binary store if one exists there, else presets.json."""
+        store_path = os.path.join(folder, PresetStore.FILENAME)
+        return store_path if os.path.exists(store_path) else os.path.join(folder, "presets.json")
+
+    def preset_layers(self):
+        """Preset files as (layer, path) pairs, from lowest to highest precedence.
+
+        After the built-in presets come the presets shipped next to the
+        application, a system-wide file, the team shares listed in
+        BLUEPRINT_TEAM_PRESETS (separated by os.pathsep and read through a
+        local cache) and the user's own file. A preset overrides those of the
+        same name below it, and ``{"$removed": true}`` hides one.
+        """
+        team_paths = [path for path in os.environ.get("BLUEPRINT_TEAM_PRESETS", "").split(os.pathsep) if path]
+        return ([("app", self.layer_file(self.APP_DIR)), ("system", self.layer_file(self.system_dir()))]
+                + [("team", path) for path in team_paths]
+                + [("user", self.presets_file)])
+
+    def preset_source_paths(self):
+        """Files the presets are read from, for change watching."""
+        return [os.path.abspath(path) for _, path in self.preset_layers()]
+
+    def shared_source_paths(self):
+        """Preset files on team shares, which are polled rather than watched."""
+        return [os.path.abspath(path) for layer, path in self.preset_layers() if layer == "team"]
+
+    def read_presets_path(self, path):
+        """Return the presets stored in a JSON file or store, or None if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        if path.endswith(PresetStore.EXTENSION):
             try:
-                with open(self.presets_file, 'r') as f:
-                    loaded_presets = json.load(f)
-                default_presets.update(loaded_presets)
-                return default_presets
-            except json.JSONDecodeError:
-                return default_presets
-        return default_presets
+                return PresetStore(path)
+            except (OSError, ValueError):
+                return None
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
 
-    def save_presets(self):
-        """Save presets to JSON file."""
+    def read_cached_layer(self, path, invalid):
+        """Read a preset layer on a slow shared mount through a local cache.
+
+        The cache is a validated PresetStore copy tagged with the source's
+        mtime and size: while those match, only one stat reaches the share. A
+        share that cannot be reached falls back to the last cached copy.
+        Problems of the presets left out are added to ``invalid``.
+        """
+        key = hashlib.sha1(os.path.abspath(path).encode("utf-8", "surrogateescape")).hexdigest()
+        cache_path = os.path.join(self.cache_dir(), key + PresetStore.EXTENSION)
+        meta_path = os.path.join(self.cache_dir(), key + ".json")
         try:
-            with open(self.presets_file, 'w') as f:
-                json.dump(self.presets, f, indent=2)
-        except Exception as e:
-            print(f"Error saving presets: {str(e)}")
+            st = os.stat(path)
+            signature = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            signature = None
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if signature is None or meta.get("signature") == signature:
+                cached = PresetStore(cache_path, trusted=True)
+                invalid.update((name, [tuple(p) for p in problems])
+                               for name, problems in meta.get("invalid", {}).items())
+                return cached
+        except (OSError, ValueError):
+            pass
+        source = self.read_presets_path(path) if signature else None
+        if source is None:
+            return None
+        records = []
+        layer_invalid = {}
+        for name in source:
+            structure = source[name]
+            normalized, problems = (structure, []) if structure == self.REMOVED else self.validator.check(structure)
+            if problems:
+                layer_invalid[name] = problems
+            else:
+                records.append((name, PresetStore.encode(normalized)))
+        invalid.update(layer_invalid)
+        try:
+            os.makedirs(self.cache_dir(), exist_ok=True)
+            PresetStore.write(cache_path, records)
+            with open(meta_path + ".tmp", 'w') as f:
+                json.dump({"source": os.path.abspath(path), "signature": signature, "invalid": layer_invalid}, f)
+            os.replace(meta_path + ".tmp", meta_path)
+            return PresetStore(cache_path, trusted=True)
+        except (OSError, ValueError) as e:
+            print(f"Error caching presets from {path}: {str(e)}", file=sys.stderr)
+            return source  # Validated again when read: a PresetStore source is not trusted
+
+    def apply_layer(self, layer, path, read, invalid):
+        """Merge a layer read elsewhere (see PresetLoader) into the loaded presets; returns (added, changed, removed)."""
+        self.invalid_presets.update(invalid)
+        added, changed, removed = self.merge_layer(self.presets, layer, path, read)
+        if changed or removed:
+            self.invalidate_plans(*changed, *removed)
+        self._update_search_index(added=added + changed, removed=removed)
+        return added, changed, removed
+
+    def reload_presets(self):
+        """Re-read the preset sources and apply only the entries that changed.
+
+        Returns the (added, changed, removed) preset names. A presets file that
+        exists but cannot be parsed (e.g. half-written) is ignored until the
+        next change instead of dropping every custom preset.
+        """
+        previous = (self.invalid_presets, self.user_presets, self._lower_presets)
+        fresh = self.load_presets()
+        if self.unreadable_layers:
+            self.invalid_presets, self.user_presets, self._lower_presets = previous
+            return [], [], []
+        # Compared as encoded records, so stored presets are not decoded just to be compared
+        added = [name for name in fresh if name not in self.presets]
+        changed = [name for name in fresh if name in self.presets and not fresh.same_entry(name, self.presets)]
+        removed = [name for name in self.presets if name not in fresh]
+        for name in added + changed:
+            self.presets.adopt(name, fresh)
+        for name in removed:
+            del self.presets[name]
+        if changed or removed:
+            self.invalidate_plans(*changed, *removed)
+        self._update_search_index(added=added + changed, removed=removed)
+        return added, changed, removed
+
+    def save_presets(self):
+        """Save the user layer: presets added or changed by the user, and removals of lower-layer ones.
+
+        Raises OSError if the presets file can't be written.
+        """
+        os.makedirs(os.path.dirname(self.presets_file), exist_ok=True)
+        kept = [name for name in self.user_presets if name in self.presets]
+        removed = [name for name in self.user_presets if name not in self.presets]
+        if self.presets_file.endswith(PresetStore.EXTENSION):
+            mapped = [store for store in self.presets.stores()
+                      if os.path.abspath(store.path) == os.path.abspath(self.presets_file)]
+            # Entries never decoded are copied over as stored
+            PresetStore.write(self.presets_file, itertools.chain(
+                self.presets.records(kept), ((name, PresetStore.encode(self.REMOVED)) for name in removed)
+            ), release=mapped)
+            for store in self.presets.rebind(PresetStore(self.presets_file)):
+                store.close()
+            return
+        user_layer = {name: self.presets[name] if name in self.presets else self.REMOVED
+                      for name in self.user_presets}
+        with open(self.presets_file, 'w') as f:
+            json.dump(user_layer, f, indent=2)
 
     def create_structure(self, base_path, structure):
         """Create folder structure recursively."""
         if not os.path.exists(base_path):
             os.makedirs(base_path)
-        for name, content in structure.items():
-            path = os.path.join(base_path, name)
-            if content is None:  # File
-                with open(path, 'w') as f:
-                    f.write("")  # Create empty file
-            else:  # Directory
-                os.makedirs(path, exist_ok=True)
-                self.create_structure(path, content)
+        for key, content in node_items(structure):
+            for name in NamePattern.names(key):
+                path = os.path.join(base_path, name)
+                if isinstance(content, dict) and not is_folder(content):  # Asset
+                    shutil.copyfile(asset_path(content["$source"]), path)
+                elif not isinstance(content, dict):  # File
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(content or "")
+                else:  # Directory
+                    os.makedirs(path, exist_ok=True)
+                    self.create_structure(path, content)
 
-    def create_project(self, preset_name, project_path):
+    def create_project(self, preset_name, project_path, options=None):
         """Create project structure from preset."""
         if preset_name in self.presets:
-            self.create_structure(project_path, self.presets[preset_name])
+            self.create_from_plan(
+                self.compile_preset(preset_name, options), project_path, self.plan_workers(preset_name)
+            )
             return True
         return False
+
+    def compile_preset(self, preset_name, options=None):
+        """Compile a preset, for the given option values, into a cached PresetPlan.
+
+        Each combination of option values is resolved and compiled once, so
+        creating a variant costs the same as creating a preset without options.
+        """
+        key = self.options_key(preset_name, options)
+        plan = self._plan_cache.get(preset_name, {}).get(key)
+        if plan is not None:
+            return plan
+        plan = PresetPlan(self.preset_variant(preset_name, options), self.preset_stats(preset_name, options)["nodes"])
+        with self._plan_lock:
+            self._plan_cache.setdefault(preset_name, {})[key] = plan
+        return plan
+
+    def preset_options(self, preset_name):
+        """The options a preset declares: {name: {"default", ["choices"], ["description"]}}."""
+        return self.presets[preset_name].get("$options") or {}
+
+    def option_values(self, preset_name, options=None):
+        """Every option of a preset with its value: the given ones, checked, and defaults for the rest."""
+        declared = self.preset_options(preset_name)
+        values = {name: option["default"] for name, option in declared.items()}
+        for name, value in (options or {}).items():
+            option = declared.get(name)
+            if option is None:
+                raise ValueError(f"Template {preset_name!r} has no option {name!r}")
+            if "choices" in option:
+                if value not in option["choices"]:
+                    raise ValueError(f"Option {name!r} must be one of: {', '.join(option['choices'])}")
+            elif not isinstance(value, bool):
+                raise ValueError(f"Option {name!r} must be true or false")
+            values[name] = value
+        return values
+
+    def parse_options(self, preset_name, assignments):
+        """Option values from NAME=VALUE strings, as given on the command line."""
+        declared = self.preset_options(preset_name)
+        options = {}
+        for assignment in assignments:
+            name, _, value = assignment.partition("=")
+            name, value = name.strip(), value.strip()
+            option = declared.get(name)
+            if option is None or "choices" in option:
+                options[name] = value  # option_values reports unknown names and values
+            elif value.lower() in ("", "1", "true", "yes", "on"):
+                options[name] = True
+            elif value.lower() in ("0", "false", "no", "off"):
+                options[name] = False
+            else:
+                raise ValueError(f"Option {name!r} must be true or false")
+        return options
+
+    def options_key(self, preset_name, options=None):
+        """Hashable key of a full set of option values; () for presets without options."""
+        if "$options" not in self.presets[preset_name]:
+            if options:
+                self.option_values(preset_name, options)  # Reports the unknown option
+            return ()
+        return tuple(sorted(self.option_values(preset_name, options).items()))
+
+    def preset_variant(self, preset_name, options=None):
+        """The concrete structure of a preset for the given options, with the matching $if nodes merged in."""
+        structure = self.presets[preset_name]
+        if "$if" not in structure:
+            self.options_key(preset_name, options)
+            return structure
+        key = self.options_key(preset_name, options)
+        variant = self._variant_cache.get(preset_name, {}).get(key)
+        if variant is None:
+            variant = PresetVariant.resolve(structure, dict(key))
+            with self._plan_lock:
+                self._variant_cache.setdefault(preset_name, {})[key] = variant
+        return variant
+
+    def preset_digest_tree(self, preset_name):
+        """Cached Merkle digest tree of a preset, used for fast diffing."""
+        digest_tree = self._digest_cache.get(preset_name)
+        if digest_tree is None:
+            digest_tree = TreeDiffer().digest_tree(self.presets[preset_name])
+            with self._plan_lock:
+                self._digest_cache[preset_name] = digest_tree
+        return digest_tree
+
+    def invalidate_plans(self, *preset_names):
+        """Drop cached plans, digest trees and stats for the given presets, or all of them if none are given."""
+        with self._plan_lock:
+            if not preset_names:
+                self._plan_cache.clear()
+                self._variant_cache.clear()
+                self._digest_cache.clear()
+                self._stats_cache.clear()
+            for preset_name in preset_names:
+                self._plan_cache.pop(preset_name, None)
+                self._variant_cache.pop(preset_name, None)
+                self._digest_cache.pop(preset_name, None)
+                self._stats_cache.pop(preset_name, None)
+
+    def run_history(self):
+        """The RunHistory in the user folder, opened on first use."""
+        if self._history is None:
+            self._history = RunHistory(os.path.join(self.user_dir(), RunHistory.FILENAME))
+        return self._history
+
+    def preset_history(self):
+        """The PresetHistory in the user folder, opened on first use."""
+        if self._preset_history is None:
+            self._preset_history = PresetHistory(os.path.join(self.user_dir(), PresetHistory.FILENAME))
+        return self._preset_history
+
+    def log_run(self, preset_name, project_path, nodes=None, written=None, duration=None, outcome="ok", error="",
+                throttled=None):
+        """Record one creation of a preset in the run history."""
+        preset_hash = None
+        if preset_name in self.presets:
+            preset_hash = self.preset_digest_tree(preset_name)[0].hex()
+        self.run_history().record(
+            preset_name, project_path, nodes, written, duration, outcome, error, preset_hash, throttled=throttled
+        )
+
+    def record_run(self, preset_name, project_path, records):
+        """Pass CreatedPath records through, logging the run once they are exhausted, fail or are abandoned."""
+        started = time.perf_counter()
+        nodes = written = 0
+        throttled = None
+        outcome, error = "cancelled", ""
+        try:
+            for record in records:
+                nodes += 1
+                written += record.bytes
+                throttled = record.throttled
+                yield record
+            outcome = "ok"
+        except Exception as e:
+            outcome, error = "failed", str(e)
+            raise
+        finally:
+            self.log_run(preset_name, project_path, nodes, written, time.perf_counter() - started, outcome, error,
+                         throttled)
+
+    def create_from_plan(self, plan, project_path, workers=1):
+        """Materialize a compiled plan below project_path; returns the seconds spent throttled by I/O limits.
+
+        With several workers, the top level is created first and then each
+        top-level folder is filled in on its own thread; all of them share
+        the limits of the destination's mount.
+        """
+        throttle = IOGovernor.throttle_for(project_path)
+        if workers <= 1:
+            deque(self.iter_create_plan(plan, project_path, throttle=throttle), maxlen=0)
+            return throttle.throttled if throttle is not None else 0.0
+        top, subtrees = plan.split()
+        deque(self.backend.materialize(top, project_path, throttle=throttle), maxlen=0)
+        # One task per worker, each taking the next folder to fill, so a pattern is expanded only as it is created
+        folders = ((name, subplan) for names, subplan in subtrees for name in names)
+        lock = threading.Lock()
+        failed = threading.Event()  # Then the other workers stop too
+
+        def fill():
+            while not failed.is_set():
+                with lock:
+                    name, subplan = next(folders, (None, None))
+                if name is None:
+                    return
+                try:
+                    deque(self.backend.materialize(subplan, os.path.join(project_path, name), throttle=throttle), 0)
+                except BaseException:
+                    failed.set()
+                    raise
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(fill) for _ in range(workers)]:
+                future.result()
+        return throttle.throttled if throttle is not None else 0.0
+
+    def iter_create(self, preset_name, project_path, git_init=False, options=None):
+        """Create a preset below project_path, yielding a CreatedPath as each node is materialized.
+
+        Nodes are created only as the consumer pulls records, so a slow
+        downstream stage throttles creation and memory stays constant however
+        large the scaffold is. With ``git_init`` the project also becomes a git
+        repository whose initial commit holds the scaffold. ``options`` picks
+        the variant of a preset with conditional nodes.
+        """
+        if preset_name not in self.presets:
+            raise KeyError(f"Template not found: {preset_name!r}")
+        plan = self.compile_preset(preset_name, options)
+        git = GitRepoWriter(project_path, f"Initial scaffold from {preset_name}") if git_init else None
+        return self.record_run(preset_name, project_path, self.iter_create_plan(plan, project_path, git=git))
+
+    def iter_create_streamed(self, source_path, project_path, preset_name=None):
+        """Create a preset straight from a JSON presets file, yielding a CreatedPath per node as it is parsed.
+
+        The preset is never loaded whole (see StreamedPreset), so the first
+        node exists almost at once and memory stays flat however many nodes
+        the preset has. Without ``preset_name`` the file's first preset is
+        used. The run is recorded in the history as ``file.json#preset``.
+        """
+        label = f"{os.path.basename(source_path)}#{preset_name or ''}".rstrip("#")
+        plan = StreamedPreset(source_path, preset_name)
+        return self.record_run(label, project_path, self.iter_create_plan(plan, project_path))
+
+    def iter_create_plan(self, plan, project_path, backend=None, git=None, assets=None, throttle=None):
+        """Generator behind iter_create for an already compiled plan, optionally filling a GitRepoWriter.
+
+        ``assets`` is the AssetCopier to copy asset files with, e.g. to follow their progress in bytes.
+        ``throttle`` is the IOThrottle to create under; by default the destination mount's limits apply.
+        """
+        started = time.perf_counter()
+        backend = backend or self.backend
+        throttle = throttle or IOGovernor.throttle_for(project_path)
+        if throttle is not None:
+            assets = assets or AssetCopier()
+            assets.throttle = throttle
+        if git is not None:
+            git.init(plan)  # Creates project_path too
+        for rel_path, is_dir, written in backend.materialize(plan, project_path, assets, throttle):
+            if git is not None and not is_dir:
+                git.add_file(rel_path)
+            yield CreatedPath(rel_path, "dir" if is_dir else "file", written, time.perf_counter() - started,
+                              throttle.throttled if throttle is not None else 0.0)
+        if git is not None:
+            git.commit(plan)
     
-    def create_project_with_progress(self, preset_name, project_path, progress_callback):
-        """Create project structure with progress updates."""
+    def create_project_with_progress(self, preset_name, project_path, progress_callback, git_init=False, options=None,
+                                     cancelled=None, throttle=None):
+        """Create project structure with progress updates.
+
+        ``progress_callback(percent, message)`` is also called from asset copying threads.
+        Once the ``cancelled`` event is set, creation stops before the next
+        node and False is returned. Pass a ``throttle`` (see
+        IOGovernor.throttle_for) to read how long I/O limits held it back.
+        """
         if preset_name not in self.presets:
             return False
         
-        structure = self.presets[preset_name]
-        total_items = self._count_items(structure)
-        created_items = 0
+        plan = self.compile_preset(preset_name, options)
+        git = GitRepoWriter(project_path, f"Initial scaffold from {preset_name}") if git_init else None
+        total_items = max(len(plan), 1)
+        # Spread at most FEEDBACK_BUDGET seconds of visual delay over the items
+        feedback_delay = min(0.05, self.FEEDBACK_BUDGET / total_items)
+        if feedback_delay < 0.001:
+            feedback_delay = 0
+        last_progress = None
+        assets = None
+        if plan.has_assets():
+            # Large copies dominate: follow them in bytes, reported at most every PROGRESS_INTERVAL
+            assets = AssetCopier()
+            assets.expect(plan)
+            reported = [0.0]
+
+            def report_bytes(copied, total):
+                now = time.monotonic()
+                if now - reported[0] >= self.PROGRESS_INTERVAL or copied >= total:
+                    reported[0] = now
+                    progress_callback(int(30 + copied / max(total, 1) * 60),
+                                           f"Copying assets: {format_size(copied)} of {format_size(total)}")
+            assets.on_progress = report_bytes
         
-        def create_with_progress(base_path, structure_dict):
-            nonlocal created_items
-            for name, content in structure_dict.items():
-                item_path = os.path.join(base_path, name)
-                if content is None:  # File
-                    with open(item_path, 'w') as f:
-                        f.write('')
-                else:  # Directory
-                    os.makedirs(item_path, exist_ok=True)
-                    if content:
-                        create_with_progress(item_path, content)
-                
-                created_items += 1
+        # Errors propagate, so the caller can say what went wrong (e.g. a missing asset file)
+        records = self.record_run(preset_name, project_path,
+                                  self.iter_create_plan(plan, project_path, git=git, assets=assets, throttle=throttle))
+        for created_items, record in enumerate(records, 1):
+            if cancelled is not None and cancelled.is_set():
+                records.close()  # Logged as a cancelled run
+                return False
+            if assets is not None and assets.total:
+                progress = int(30 + assets.copied / assets.total * 60)
+            else:
                 progress = int(30 + (created_items / total_items) * 60)
-                progress_callback.emit(progress, f"Created: {name}")
-                time.sleep(0.05)  # Small delay for visual feedback
-        
-        try:
-            os.makedirs(project_path, exist_ok=True)
-            create_with_progress(project_path, structure)
-            return True
-        except Exception:
-            return False
+            if feedback_delay or progress != last_progress:
+                progress_callback(progress, f"Created: {os.path.basename(record.path)}")
+                last_progress = progress
+            if feedback_delay:
+                time.sleep(feedback_delay)  # Small delay for visual feedback
+        return True
     
-    def _count_items(self, structure):
-        """Count total number of items in structure for progress calculation."""
-        count = 0
-        for name, content in structure.items():
-            count += 1
-            if content and isinstance(content, dict):
-                count += self._count_items(content)
-        return count
+    def preset_stats(self, preset_name, options=None):
+        """Statistics stored with a preset; computed once and cached for presets saved without them.
+
+        For a preset with conditional nodes they describe the variant chosen by
+        ``options`` (by default, the one with every option at its default).
+        """
+        structure = self.presets[preset_name]
+        key = self.options_key(preset_name, options)
+        stats = None if "$if" in structure else structure.get("$stats")
+        stats = stats or self._stats_cache.get(preset_name, {}).get(key)
+        if stats is None:
+            stats = structure_stats(self.preset_variant(preset_name, options))
+            self._stats_cache.setdefault(preset_name, {})[key] = stats
+        return stats
+
+    def format_stats(self, stats):
+        return (f"📊 {stats['nodes']:,} items · {stats['files']:,} files · {stats['folders']:,} folders · "
+                f"depth {stats['depth']} · {format_size(stats['content_bytes'])}")
+
+    def format_options(self, preset_name):
+        """One-line summary of a preset's options and their defaults; empty if it has none."""
+        parts = []
+        for name, option in self.preset_options(preset_name).items():
+            if "choices" in option:
+                parts.append(f"{name} = {option['default']} ({' | '.join(option['choices'])})")
+            else:
+                parts.append(f"{name} = {'yes' if option['default'] else 'no'}")
+        return f"🧩 Options: {', '.join(parts)}" if parts else ""
+
+    def preset_hooks(self, preset_name):
+        """The post-create hooks a preset declares, by name."""
+        return self.presets[preset_name].get("$hooks") or {}
+
+    def run_hooks(self, preset_name, project_path, max_parallel=None, on_finished=None, stop=None):
+        """Run a preset's post-create hooks in project_path; returns their HookResults.
 
-    def add_preset(self, preset_name, structure):
-        """Add a new preset and save to file."""
+        Setting the ``stop`` event kills the hooks still running and skips the rest.
+        """
+        return HookScheduler(max_parallel).run(self.preset_hooks(preset_name), project_path, on_finished, stop)
+
+    def format_hook_results(self, results):
+        symbols = {"ok": "✓", "failed": "✗", "timeout": "⏱", "cancelled": "⏹", "skipped": "–"}
+        return "\n".join(
+            f"{symbols[result.status]} {result.name}  {result.status} · {result.elapsed:.2f}s" for result in results
+        )
+
+    def plan_workers(self, preset_name, max_workers=8):
+        """How many workers are worth using to create a preset, judging by its size."""
+        return max(1, min(max_workers, self.preset_stats(preset_name)["nodes"] // self.NODES_PER_WORKER))
+
+    def describe(self, preset_name):
+        """Human-readable description of a preset."""
+        return self.DESCRIPTIONS.get(preset_name, "Custom project template structure.")
+
+    def search_presets(self, query, limit=None):
+        """Search preset names, descriptions and contained file names."""
+        if not query.strip():
+            return list(self.presets)[:limit] if limit else list(self.presets)
+        if self._search_index is None:
+            self._search_index = PresetSearchIndex()
+            self._index_presets(self.presets)
+        return self._search_index.search(query, limit)
+
+    def _index_presets(self, preset_names):
+        for preset_name in preset_names:
+            try:
+                structure = self.presets[preset_name]
+            except (KeyError, PresetValidationError):
+                continue  # A stored preset that failed validation; see stored_preset_invalid
+            self._search_index.add(preset_name, structure, self.describe(preset_name))
+
+    def _update_search_index(self, added=(), removed=()):
+        if self._search_index is None:
+            return  # Built on first search
+        for preset_name in removed:
+            self._search_index.remove(preset_name)
+        self._index_presets(added)
+
+    def add_preset(self, preset_name, structure, save=True):
+        """Add a new preset and save to file; raises PresetValidationError for unsafe structures.
+
+        Bulk imports pass ``save=False`` and call save_presets once at the end.
+        """
+        structure = self.validator.validate(structure)
+        structure = {**structure, "$stats": structure_stats(structure)}  # The validated one is cached; don't touch it
+        history = self.preset_history()
+        previous = self.presets.get(preset_name)
+        if previous is not None and history.latest_version(preset_name) is None:
+            # Keep what is being replaced as the first version
+            history.record(preset_name, previous, (previous.get("$stats") or {}).get("nodes"))
+        history.record(preset_name, structure, structure["$stats"]["nodes"])
+        self.invalid_presets.pop(preset_name, None)
         self.presets[preset_name] = structure
-        self.save_presets()
+        self.user_presets[preset_name] = None
+        self.invalidate_plans(preset_name)
+        self._update_search_index(added=[preset_name])
+        if save:
+            self.save_presets()
+
+    def restore_preset_version(self, preset_name, version):
+        """Make an earlier version of a preset current again; it is saved as the newest version."""
+        self.add_preset(preset_name, self.preset_history().version(preset_name, version))
+
+    def export_bundle(self, file_path, preset_names):
+        """Write presets to one compressed bundle, storing shared subtrees and file bodies once."""
+        with PresetBundle(file_path, "w") as bundle:
+            for preset_name in preset_names:
+                bundle.add(preset_name, self.presets[preset_name], self.preset_stats(preset_name))
 
     def delete_preset(self, preset_name):
-        """Delete a preset."""
+        """Delete a preset; its saved versions stay in the preset history."""
         if preset_name in self.presets:
+            history = self.preset_history()
+            if history.latest_version(preset_name) is None:
+                history.record(preset_name, self.presets[preset_name],
+                               (self.presets[preset_name].get("$stats") or {}).get("nodes"))
+            history.record_deletion(preset_name)
             del self.presets[preset_name]
+            if preset_name in self._lower_presets:
+                self.user_presets[preset_name] = None  # Saved as a removal
+            else:
+                self.user_presets.pop(preset_name, None)
+            self.invalidate_plans(preset_name)
+            self._update_search_index(removed=[preset_name])
             self.save_presets()
             return True
         return False
@@ -729,95 +1555,3584 @@ class ProjectStructureCreator:
             structure.update(build_structure(root.child(i)))
         return structure
 
+class PresetValidationError(ValueError):
+    """A preset failed validation; ``problems`` lists every (tree path, message) found."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        super().__init__("\n".join(f"{path or '/'}: {message}" for path, message in problems))
+
+
+class PresetValidator:
+    """Normalize and check a preset structure in one linear pass.
+
+    Names are stripped and NFC-normalized; names that would escape the
+    destination or fail on some platform (path separators, ``.``/``..``,
+    control characters such as NUL, absolute paths, Windows-reserved names
+    and characters, case-insensitive collisions) are reported with their tree
+    path. Verdicts are cached by content hash, so the same content is only
+    checked once.
+    """
+    DIRECTIVES = {"$stats", "$hooks", "$options", "$if"}
+    RESERVED_NAMES = {"CON", "PRN", "AUX", "NUL"} | {f"{port}{i}" for port in ("COM", "LPT") for i in range(1, 10)}
+    FORBIDDEN_CHARS = '<>:"|?*'
+    ABSOLUTE = re.compile(r"^([\\/]|[A-Za-z]:)")
+    MAX_VERDICTS = 1024
+    DEFAULT_MAX_NODES = 100_000_000
+
+    def __init__(self):
+        self._verdicts = {}
+        self.max_nodes = int(os.environ.get("BLUEPRINT_MAX_NODES") or self.DEFAULT_MAX_NODES)
+
+    def content_hash(self, structure):
+        return hashlib.sha1(json.dumps(structure, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+    def check(self, structure):
+        """Return (normalized structure, problems), reusing the verdict for content seen before.
+
+        The normalized structure is shared with the verdict cache, so callers must not modify it.
+        """
+        key = self.content_hash(structure)
+        verdict = self._verdicts.get(key)
+        if verdict is None:
+            problems = []
+            if isinstance(structure, dict):
+                normalized = self._check_level(structure, "", problems)
+                self._check_size(normalized, problems)
+            else:
+                normalized = None
+                problems.append(("", "A preset must be an object of folders and files"))
+            if len(self._verdicts) >= self.MAX_VERDICTS:
+                self._verdicts.clear()
+            verdict = self._verdicts[key] = (normalized, problems)
+        return verdict
+
+    def validate(self, structure):
+        """Return the normalized (shared, read-only) structure, or raise PresetValidationError listing every problem."""
+        normalized, problems = self.check(structure)
+        if problems:
+            raise PresetValidationError(problems)
+        return normalized
+
+    def _check_level(self, structure, prefix, problems):
+        normalized = {}
+        seen = {}
+        variants = {}
+        stored_stats = False
+        for key, content in structure.items():
+            if key.startswith("$"):
+                if prefix or key not in self.DIRECTIVES:
+                    problems.append((prefix + key, "Unknown directive (names starting with '$' are reserved)"))
+                elif key in ("$options", "$if"):
+                    variants[key] = content  # Checked against the finished level below
+                elif key == "$stats":
+                    stored_stats = True  # Only a cache, so it is recomputed below rather than trusted
+                else:
+                    if key == "$hooks":
+                        self._check_hooks(content, problems)
+                    normalized[key] = content
+                continue
+            name = unicodedata.normalize("NFC", key.strip())
+            path = prefix + name
+            problem = self._name_problem(name)
+            if problem:
+                problems.append((path, problem))
+            folded = name.casefold()
+            if folded in seen:
+                other = seen[folded]
+                where = "" if other == name else " on case-insensitive filesystems"
+                problems.append((path, f"Collides with '{prefix + other}'{where}"))
+            seen[folded] = name
+            if content is None or isinstance(content, str):  # File
+                normalized[name] = content
+            elif isinstance(content, dict) and "$source" in content:  # Asset file
+                if set(content) != {"$source"} or not isinstance(content["$source"], str) or not content["$source"].strip():
+                    problems.append((path, 'An asset file must be {"$source": "path/to/file"}'))
+                normalized[name] = {"$source": content["$source"]}
+            elif isinstance(content, dict):  # Directory
+                normalized[name] = self._check_level(content, path + "/", problems)
+            else:
+                problems.append((path, "Must be null or a string (a file), {\"$source\": path} (an asset) or an object (a folder)"))
+        if variants:
+            options = self._check_options(variants.get("$options", {}), problems)
+            if options:
+                normalized["$options"] = options
+            if "$if" in variants:
+                normalized["$if"] = self._check_overlays(variants["$if"], options, normalized, problems)
+        if stored_stats and not problems:
+            normalized["$stats"] = structure_stats(normalized)
+        return normalized
+
+    def _check_size(self, normalized, problems):
+        """Cap the items a preset stands for once its patterns are multiplied out, overlays included."""
+        nodes = (normalized.get("$stats") or structure_stats(normalized))["nodes"]
+        nodes += sum(structure_stats(overlay)["nodes"] for overlay in normalized.get("$if", {}).values())
+        if nodes > self.max_nodes:
+            problems.append(("", f"Stands for {nodes:,} items, more than the limit of {self.max_nodes:,} "
+                                 "(set BLUEPRINT_MAX_NODES to raise it)"))
+
+    def _check_options(self, options, problems):
+        """Normalize ``$options`` to {name: {"default", ["choices"], ["description"]}}."""
+        if not isinstance(options, dict):
+            problems.append(("$options", "Must be an object mapping option names to their settings"))
+            return {}
+        normalized = {}
+        for name, spec in options.items():
+            path = f"$options/{name}"
+            if not PresetVariant.OPTION_NAME.match(name):
+                problems.append((path, "Option names may only use letters, digits, '_' and '-'"))
+                continue
+            if isinstance(spec, bool):
+                spec = {"default": spec}
+            if not isinstance(spec, dict):
+                problems.append((path, "Must be true/false or an object with 'default', 'choices' and 'description'"))
+                continue
+            unknown = sorted(set(spec) - {"default", "choices", "description"})
+            if unknown:
+                problems.append((path, f"Unknown option keys: {', '.join(unknown)}"))
+            option = {}
+            choices = spec.get("choices")
+            if choices is None:
+                option["default"] = spec.get("default", False)
+                if not isinstance(option["default"], bool):
+                    problems.append((path, "'default' of a yes/no option must be true or false"))
+            elif (not isinstance(choices, list) or not choices or len(set(choices)) != len(choices)
+                    or not all(isinstance(choice, str) and PresetVariant.OPTION_NAME.match(choice) for choice in choices)):
+                problems.append((path, "'choices' must be a list of distinct words (letters, digits, '_', '-')"))
+            else:
+                option["default"] = spec.get("default", choices[0])
+                option["choices"] = choices
+                if option["default"] not in choices:
+                    problems.append((path, "'default' must be one of the choices"))
+            if "description" in spec:
+                if isinstance(spec["description"], str):
+                    option["description"] = spec["description"]
+                else:
+                    problems.append((path, "'description' must be a string"))
+            normalized[name] = option
+        return normalized
+
+    def _check_overlays(self, overlays, options, base, problems):
+        """Check ``$if`` overlays: their conditions, their nodes, and that they merge cleanly into the base."""
+        if not isinstance(overlays, dict):
+            problems.append(("$if", "Must be an object mapping conditions to the nodes they add"))
+            return {}
+        normalized = {}
+        merged = base
+        for condition, overlay in overlays.items():
+            path = f"$if/{condition}"
+            try:
+                PresetVariant.parse_condition(condition, options)
+            except ValueError as e:
+                problems.append((path, str(e)))
+            if not isinstance(overlay, dict):
+                problems.append((path, "Must be an object of the folders and files to add"))
+                continue
+            overlay = normalized[condition] = self._check_level(overlay, path + "/", problems)
+            # Checked against the base and every earlier overlay, since any of them may hold together
+            conflicts = []
+            merged = PresetVariant.merge(merged, overlay, conflicts)
+            problems.extend((f"{path}/{where}", problem) for where, problem in conflicts)
+        return normalized
+
+    def _check_hooks(self, hooks, problems):
+        if not isinstance(hooks, dict):
+            problems.append(("$hooks", "Must be an object mapping hook names to {run, after, timeout}"))
+            return
+        count = len(problems)
+        for name, spec in hooks.items():
+            path = f"$hooks/{name}"
+            if not isinstance(spec, dict):
+                problems.append((path, "Must be an object with a 'run' command"))
+                continue
+            unknown = sorted(set(spec) - {"run", "after", "timeout"})
+            if unknown:
+                problems.append((path, f"Unknown hook keys: {', '.join(unknown)}"))
+            command = spec.get("run")
+            if not (isinstance(command, str) and command.strip()) and not (
+                isinstance(command, list) and command and all(isinstance(arg, str) for arg in command)
+            ):
+                problems.append((path, "'run' must be a command string or a non-empty list of arguments"))
+            after = spec.get("after", [])
+            if not isinstance(after, list) or not all(isinstance(dep, str) and dep in hooks for dep in after):
+                problems.append((path, "'after' must be a list of other hooks of this preset"))
+            timeout = spec.get("timeout", HookScheduler.DEFAULT_TIMEOUT)
+            if isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0:
+                problems.append((path, "'timeout' must be a positive number of seconds"))
+        if len(problems) > count:
+            return
+        remaining = {name: set(spec.get("after", [])) for name, spec in hooks.items()}
+        while True:
+            ready = [name for name, after in remaining.items() if not after & remaining.keys()]
+            if not ready:
+                break
+            for name in ready:
+                del remaining[name]
+        if remaining:
+            problems.append(("$hooks", f"Dependency cycle between {', '.join(sorted(remaining))}"))
+
+    def _name_problem(self, name):
+        if not name:
+            return "Empty name"
+        if name in (".", ".."):
+            return f"'{name}' is not allowed as a name"
+        if self.ABSOLUTE.match(name):
+            return "Absolute paths are not allowed"
+        if "/" in name or "\\" in name:
+            return "Contains a path separator"
+        if any(ord(char) < 32 for char in name):
+            return "Contains a control character such as NUL"
+        bad_chars = sorted(set(name) & set(self.FORBIDDEN_CHARS))
+        if bad_chars:
+            return f"Contains {''.join(bad_chars)!r}, which Windows does not allow"
+        if name.endswith((".", " ")):
+            return "Ends with a dot or space, which Windows does not allow"
+        if name.split(".")[0].upper() in self.RESERVED_NAMES:
+            return f"'{name}' is a reserved device name on Windows"
+        pattern = NamePattern.parse(name)
+        if pattern is not None:
+            return self._pattern_problem(pattern)
+        return None
+
+    def _pattern_problem(self, pattern):
+        # Judged from what each group can produce, however many names the pattern stands for
+        if pattern.can_contain("/\\"):
+            return "Can expand to a name containing a path separator"
+        if pattern.can_contain([chr(code) for code in range(32)]):
+            return "Can expand to a name containing a control character such as NUL"
+        bad_chars = [char for char in self.FORBIDDEN_CHARS if pattern.can_contain(char)]
+        if bad_chars:
+            return f"Can expand to a name containing {''.join(bad_chars)!r}, which Windows does not allow"
+        if pattern.can_be_only("."):
+            return "Can expand to an empty name or one of only dots, such as '..'"
+        if pattern.can_end_with(". "):
+            return "Can expand to a name ending with a dot or space, which Windows does not allow"
+        if pattern.can_have_stem(self.RESERVED_NAMES):
+            return "Can expand to a reserved device name on Windows"
+        return None
+
+
+class PresetVariant:
+    """Feature options (``$options``) and conditional nodes (``$if``) of a preset.
+
+    ``$options`` declares yes/no options (``"tests": true``) and choices
+    (``"ci": {"choices": ["github", "gitlab", "none"]}``). ``$if`` maps a
+    condition to the folders and files it adds, merged into the preset root
+    when the condition holds. A condition is a comma-separated list of terms
+    that must all hold: ``tests``, ``!tests``, ``ci=github``, ``ci=github|gitlab``
+    or ``ci!=none``. Conditions are only evaluated when a combination of
+    option values is resolved into a concrete structure, which
+    ProjectStructureCreator caches along with its compiled plan.
+    """
+    OPTION_NAME = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_-]*$")
+    TERM = re.compile(r"^(!?)([A-Za-z0-9_][A-Za-z0-9_-]*)(?:(!?=)(.+))?$")
+
+    @classmethod
+    def parse_condition(cls, condition, options):
+        """Parse a condition into (name, negated, values) terms; raise ValueError if it is malformed."""
+        terms = []
+        for text in condition.split(","):
+            match = cls.TERM.match(text.strip())
+            if not match:
+                raise ValueError(f"Malformed condition term {text.strip()!r}")
+            bang, name, operator, values = match.groups()
+            option = options.get(name)
+            if option is None:
+                raise ValueError(f"Unknown option {name!r}")
+            if operator is None:
+                if "choices" in option:
+                    raise ValueError(f"Option {name!r} has choices; compare it, e.g. {name}={option['choices'][0]}")
+                terms.append((name, bool(bang), (True,)))
+                continue
+            if bang:
+                raise ValueError(f"Negate a comparison with '!=', not {text.strip()!r}")
+            if "choices" not in option:
+                raise ValueError(f"Yes/no option {name!r} is tested by name alone, e.g. {name} or !{name}")
+            values = tuple(value.strip() for value in values.split("|"))
+            unknown = [value for value in values if value not in option["choices"]]
+            if unknown:
+                raise ValueError(f"{', '.join(unknown)} is not a choice of {name!r}")
+            terms.append((name, operator == "!=", values))
+        return terms
+
+    @classmethod
+    def resolve(cls, structure, values):
+        """The concrete structure for a full set of option values: the base plus every overlay that holds."""
+        options = structure.get("$options", {})
+        resolved = {key: content for key, content in structure.items() if key not in ("$options", "$if", "$stats")}
+        for condition, overlay in structure.get("$if", {}).items():
+            if all((values[name] in accepted) != negated
+                   for name, negated, accepted in cls.parse_condition(condition, options)):
+                resolved = cls.merge(resolved, overlay)
+        return resolved
+
+    @classmethod
+    def merge(cls, base, overlay, conflicts=None):
+        """Merge overlay into base without modifying either; untouched folders are shared, not copied.
+
+        A file in the overlay replaces a file of the same name. A folder meeting
+        a file, or names differing only in case, are appended to ``conflicts``
+        as (path, problem) when it is given.
+        """
+        merged = dict(base)
+        folded = {name.casefold(): name for name in base if not name.startswith("$")}
+        for name, content in overlay.items():
+            existing_name = folded.get(name.casefold())
+            if existing_name is None:
+                merged[name] = content
+                folded[name.casefold()] = name
+                continue
+            existing = merged[existing_name]
+            if conflicts is not None:
+                if existing_name != name:
+                    conflicts.append((name, f"Collides with '{existing_name}' on case-insensitive filesystems"))
+                elif is_folder(existing) != is_folder(content):
+                    conflicts.append((name, "Is a file in one place and a folder in another"))
+            if is_folder(existing) and is_folder(content):
+                sub = []
+                merged[existing_name] = cls.merge(existing, content, sub if conflicts is not None else None)
+                if conflicts is not None:
+                    conflicts.extend((f"{name}/{where}", problem) for where, problem in sub)
+            else:
+                merged[existing_name] = content
+        return merged
+
+
+class NamePattern:
+    """A node name with brace groups, standing for many sibling nodes that share one subtree.
+
+    ``svc-{001..200}`` is a zero-padded numeric range, ``{00..ff}`` a hex
+    range, ``{a..z}`` a character range, ``{0..100..10}`` a range with a step
+    and ``{api,web,worker}`` a list. Several groups in one name expand to
+    their product. ``{{`` and ``}}`` stand for a literal brace. Names are
+    generated on demand and counted arithmetically, so a pattern is never
+    expanded into memory.
+    """
+    GROUP = re.compile(r"\{\{|\}\}|\{([^{}]*)\}")
+    DECIMAL = re.compile(r"-?\d+$")
+    HEX = re.compile(r"[0-9a-fA-F]+$")
+
+    def __init__(self, name, parts):
+        self.name = name
+        self.parts = parts  # Literal strings and (count, generator factory, contains, list items or None) choices
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def parse(cls, name):
+        """Return the pattern for a node name, or None if it has no expandable group or escaped brace."""
+        if "{" not in name and "}}" not in name:
+            return None
+        parts = []
+        literal = ""
+        position = 0
+        for match in cls.GROUP.finditer(name):
+            if match.group(1) is None:  # An escaped brace
+                choice = match.group()[0]
+            else:
+                choice = cls._parse_group(match.group(1))
+                if choice is None:
+                    continue
+            literal += name[position:match.start()]
+            position = match.end()
+            if isinstance(choice, str):
+                literal += choice
+            else:
+                parts += [literal, choice]
+                literal = ""
+        if not position:
+            return None
+        parts.append(literal + name[position:])
+        return cls(name, tuple(part for part in parts if part != ""))
+
+    @classmethod
+    def names(cls, name):
+        """The concrete names a node name stands for (a sized iterable)."""
+        pattern = cls.parse(name)
+        return pattern if pattern is not None else (name,)
+
+    @classmethod
+    def multiplicity(cls, name):
+        pattern = cls.parse(name)
+        return len(pattern) if pattern is not None else 1
+
+    @classmethod
+    def _parse_group(cls, body):
+        if ".." in body:
+            bounds = body.split("..")
+            if len(bounds) not in (2, 3) or (len(bounds) == 3 and not cls.DECIMAL.match(bounds[2])):
+                return None
+            step = abs(int(bounds[2])) if len(bounds) == 3 else 1
+            start, end = bounds[0], bounds[1]
+            if step == 0:
+                return None
+            if cls.DECIMAL.match(start) and cls.DECIMAL.match(end):
+                padded = any(len(b.lstrip("-")) > 1 and b.lstrip("-").startswith("0") for b in (start, end))
+                width = max(len(start), len(end)) if padded else 0
+                return cls._range(int(start), int(end), step, lambda value: f"{value:0{width}d}", 10)
+            if len(start) == 1 and len(end) == 1:
+                return cls._range(ord(start), ord(end), step, chr)
+            if cls.HEX.match(start) and cls.HEX.match(end):
+                spec = f"0{len(start)}{'X' if start.isupper() else 'x'}"
+                return cls._range(int(start, 16), int(end, 16), step, lambda value: format(value, spec), 16)
+            return None
+        if "," in body:
+            items = tuple(body.split(","))
+            return len(items), lambda: iter(items), items.__contains__, items
+        return None
+
+    @staticmethod
+    def _range(start, end, step, formatter, base=None):
+        """A range choice; ``base`` is 10 or 16 for numbers and None for characters."""
+        values = range(start, end + 1, step) if start <= end else range(start, end - 1, -step)
+
+        def contains(text):
+            if base is None:
+                return len(text) == 1 and ord(text) in values
+            try:
+                value = int(text, base)
+            except ValueError:
+                return False
+            return value in values and formatter(value) == text
+        return len(values), lambda: map(formatter, values), contains, None
+
+    def can_contain(self, chars):
+        """Whether some expansion contains one of the given characters, judged group by group."""
+        for part in self.parts:
+            if isinstance(part, str):
+                if any(char in part for char in chars):
+                    return True
+            elif part[3] is not None:
+                if any(char in item for item in part[3] for char in chars):
+                    return True
+            elif any(part[2](char) for char in chars):
+                return True
+        return False
+
+    def can_be_only(self, chars):
+        """Whether some expansion is empty or made only of the given characters."""
+        for part in self.parts:
+            if isinstance(part, str):
+                if not set(part) <= set(chars):
+                    return False
+            elif part[3] is not None:
+                if not any(set(item) <= set(chars) for item in part[3]):
+                    return False
+            elif not any(part[2](char) for char in chars):
+                return False
+        return True
+
+    def can_end_with(self, chars):
+        """Whether some expansion ends with one of the given characters."""
+        for part in reversed(self.parts):
+            if isinstance(part, str):
+                return part[-1] in chars
+            if part[3] is None:
+                return any(part[2](char) for char in chars)
+            if any(item and item[-1] in chars for item in part[3]):
+                return True
+            if "" not in part[3]:
+                return False
+        return False
+
+    def can_be(self, text):
+        """Whether some expansion equals text, ignoring case."""
+        text = text.lower()
+        positions = {0}
+        for part in self.parts:
+            if isinstance(part, str):
+                values = (part,)
+            elif part[3] is not None:
+                values = part[3]
+            else:
+                # Only pieces of text, in either case, can matter
+                values = [
+                    "".join(chars) for start in range(len(text)) for end in range(start + 1, len(text) + 1)
+                    for chars in itertools.product(*((c.upper(), c.lower()) for c in text[start:end]))
+                ]
+                values = [value for value in values if part[2](value)]
+            positions = {position + len(value) for position in positions for value in values
+                         if text.startswith(value.lower(), position)}
+            if not positions:
+                return False
+        return len(text) in positions
+
+    def can_have_stem(self, stems):
+        """Whether the part before the first dot of some expansion, in upper case, is one of stems."""
+        prefixes = {stem[:i] for stem in stems for i in range(len(stem) + 1)}
+
+        def feed(state, text):
+            for char in text:
+                if state in stems:
+                    return True if char == "." else None
+                if char == "." or state + char.upper() not in prefixes:
+                    return None
+                state += char.upper()
+            return state
+
+        states = {""}
+        for part in self.parts:
+            if isinstance(part, str):
+                values = (part,)
+            elif part[3] is not None:
+                values = part[3]
+            else:
+                # Only the values continuing some stem, or the dot ending one, can matter
+                values = {"."} | {
+                    "".join(chars) for state in states for stem in stems if stem.startswith(state)
+                    for end in range(len(state) + 1, len(stem) + 1)
+                    for chars in itertools.product(*((c.upper(), c.lower()) for c in stem[len(state):end]))
+                }
+                values = [value for value in values if part[2](value)]
+            next_states = set()
+            for state in states:
+                for value in values:
+                    result = feed(state, value)
+                    if result is True:
+                        return True
+                    if result is not None:
+                        next_states.add(result)
+            states = next_states
+            if not states:
+                return False
+        return bool(states & set(stems))
+
+    def __len__(self):
+        count = 1
+        for part in self.parts:
+            if not isinstance(part, str):
+                count *= part[0]
+        return count
+
+    def __iter__(self):
+        return self._expand(0, "")
+
+    def _expand(self, index, prefix):
+        if index == len(self.parts):
+            yield prefix
+            return
+        part = self.parts[index]
+        if isinstance(part, str):
+            yield from self._expand(index + 1, prefix + part)
+        else:
+            for choice in part[1]():
+                yield from self._expand(index + 1, prefix + choice)
+
+
+class PresetPlan:
+    """A preset compiled for materialization.
+
+    Name patterns are parsed once and the node count is known up front, while
+    (relative_path, is_dir, body) entries are generated lazily, parents first,
+    so plans for patterned presets stay small. ``body`` is the encoded content
+    of a file, an AssetSource for a file copied from an asset, or None for
+    folders and empty files.
+    """
+
+    def __init__(self, structure, node_count=None):
+        self.root = self._compile(structure)
+        self.node_count = self._count(self.root) if node_count is None else node_count
+
+    @staticmethod
+    def _body(content):
+        if isinstance(content, dict):
+            return AssetSource(asset_path(content["$source"]))
+        return content.encode("utf-8") if content else None
+
+    @classmethod
+    def from_compiled(cls, entries):
+        plan = cls.__new__(cls)
+        plan.root = entries
+        plan.node_count = plan._count(entries)
+        return plan
+
+    def _compile(self, structure):
+        # Folders compile to a tuple of entries, files to their encoded body (None when empty) or an AssetSource
+        return tuple(
+            (NamePattern.names(name), self._compile(content) if is_folder(content) else self._body(content))
+            for name, content in node_items(structure)
+        )
+
+    def has_assets(self, entries=None):
+        """Whether any file of the plan is copied from an asset file."""
+        return any(
+            isinstance(child, AssetSource) or (isinstance(child, tuple) and self.has_assets(child))
+            for _, child in (self.root if entries is None else entries)
+        )
+
+    def split(self):
+        """Split into a plan for the top level alone and one (names, plan) per non-empty top-level folder entry.
+
+        ``names`` is what the entry's name stands for; a pattern is not expanded.
+        """
+        top = tuple((names, () if isinstance(child, tuple) else child) for names, child in self.root)
+        subtrees = [
+            (names, PresetPlan.from_compiled(child))
+            for names, child in self.root if isinstance(child, tuple) and child
+        ]
+        return PresetPlan.from_compiled(top), subtrees
+
+    def _count(self, entries):
+        return sum(
+            len(names) * (1 + (self._count(child) if isinstance(child, tuple) else 0)) for names, child in entries
+        )
+
+    def __len__(self):
+        return self.node_count
+
+    def __iter__(self):
+        return self._walk(self.root, "")
+
+    def _walk(self, entries, prefix):
+        for names, child in entries:
+            for name in names:
+                rel_path = os.path.join(prefix, name) if prefix else name
+                if isinstance(child, tuple):
+                    yield rel_path, True, None
+                    yield from self._walk(child, rel_path)
+                else:
+                    yield rel_path, False, child
+
+
+class JsonStreamReader:
+    """Scan JSON text from a file object incrementally, holding only the unread part of the current chunk.
+
+    Strings and complete values are decoded by ``json``'s scanner. Reads grow
+    with the pending text, so a long string spanning many chunks is still
+    scanned in linear time.
+    """
+    CHUNK = 1 << 16
+    WHITESPACE = re.compile(r"[ \t\n\r]*")
+    NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+    LITERALS = {"n": ("null", None), "t": ("true", True), "f": ("false", False)}
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # Characters dropped from the front of the buffer
+        self._decoder = json.JSONDecoder()
+
+    def _more(self):
+        chunk = self.file.read(max(self.CHUNK, len(self.buffer) - self.pos))
+        if not chunk:
+            return False
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def error(self, message):
+        return ValueError(f"{message} at character {self.offset + self.pos}")
+
+    def peek(self):
+        """The next character that is not whitespace, which is left unread."""
+        while True:
+            if self.pos < len(self.buffer):
+                char = self.buffer[self.pos]
+                if char not in " \t\n\r":
+                    return char
+                self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            elif not self._more():
+                raise self.error("Unexpected end of file")
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise self.error(f"Expected {char!r}")
+        self.pos += 1
+
+    def skip_if(self, char):
+        """Read char if it comes next; returns whether it did."""
+        if self.peek() != char:
+            return False
+        self.pos += 1
+        return True
+
+    def string(self):
+        if self.peek() != '"':
+            raise self.error("Expected a string")
+        while True:
+            try:
+                value, end = scanstring(self.buffer, self.pos + 1)
+            except json.JSONDecodeError:
+                # Cut off by the end of the chunk; reads double, so long strings are rescanned only a few times
+                if not self._more():
+                    raise self.error("Unterminated or malformed string")
+                continue
+            self.pos = end
+            return value
+
+    def value(self):
+        """Read one complete value into memory."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._more():
+                    raise self.error("Malformed or truncated value")
+                continue
+            if end == len(self.buffer) and self.NUMBER.fullmatch(self.buffer, self.pos) and self._more():
+                continue  # The number may go on in the next chunk
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Read past one value without keeping it, however large it is."""
+        char = self.peek()
+        if char in "{[":
+            self.pos += 1
+            close = "}" if char == "{" else "]"
+            if self.skip_if(close):
+                return
+            while True:
+                if char == "{":
+                    self.string()
+                    self.expect(":")
+                self.skip()
+                if self.skip_if(close):
+                    return
+                self.expect(",")
+        elif char == '"':
+            self.string()
+        elif char in self.LITERALS:
+            self.literal()
+        else:
+            self.value()
+
+    def literal(self):
+        """Read null, true or false."""
+        word, value = self.LITERALS.get(self.peek(), ("", None))
+        while len(self.buffer) - self.pos < len(word) and self._more():
+            pass
+        if not word or not self.buffer.startswith(word, self.pos):
+            raise self.error("Expected a value")
+        self.pos += len(word)
+        return value
+
+
+class StreamedPreset:
+    """One preset read straight from a JSON presets file, iterated as PresetPlan entries while it is parsed.
+
+    Nothing is loaded or counted up front: each (relative_path, is_dir, body)
+    entry is yielded as soon as its node has been read, so creation starts
+    after the first few bytes and memory grows with the depth of the tree and
+    the largest file body, not with the number of nodes. Names are checked as
+    they arrive, except for case-insensitive collisions, which would mean
+    remembering every name of a level. A node with a brace pattern is read
+    whole, to repeat it, and compiled like any plan. ``$`` directives are
+    skipped; ``$if`` is refused, since resolving it needs the whole preset.
+    Each iteration reads the file again.
+    """
+    MAX_NAME_VERDICTS = 4096
+
+    def __init__(self, path, preset_name=None):
+        self.path = path
+        self.preset_name = preset_name
+        self.validator = PresetValidator()
+        self._name_problems = {}  # Generated presets repeat the same names at every level
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            reader = JsonStreamReader(f)
+            reader.expect("{")
+            if not reader.skip_if("}"):
+                while True:
+                    name = reader.string()
+                    reader.expect(":")
+                    if self.preset_name is None or name == self.preset_name:
+                        reader.expect("{")
+                        yield from self._walk(reader)
+                        return
+                    reader.skip()
+                    if reader.skip_if("}"):
+                        break
+                    reader.expect(",")
+        raise KeyError(f"Template not found in {self.path}: {self.preset_name!r}")
+
+    def _walk(self, reader):
+        # One loop with a stack of open folders rather than a generator per level
+        prefixes = [""]
+        key = None  # Already read while telling a folder from an asset
+        first = True
+        while True:
+            if key is None:
+                if reader.skip_if("}"):
+                    prefixes.pop()
+                    if not prefixes:
+                        return
+                    first = False
+                    continue
+                if not first:
+                    reader.expect(",")
+                key = reader.string()
+            first = False
+            reader.expect(":")
+            prefix = prefixes[-1]
+            if key.startswith("$"):
+                if prefix or key not in PresetValidator.DIRECTIVES:
+                    raise PresetValidationError([(prefix + key, "Unknown directive (names starting with '$' are reserved)")])
+                if key == "$if":
+                    raise PresetValidationError([(key, "Conditional nodes cannot be streamed; create the template normally")])
+                reader.skip()
+                key = None
+                continue
+            name = unicodedata.normalize("NFC", key.strip())
+            key = None
+            if NamePattern.parse(name) is not None:
+                structure = self.validator.validate({name: reader.value()})
+                for rel_path, is_dir, body in PresetPlan(structure):
+                    yield prefix + rel_path, is_dir, body
+                continue
+            path = prefix + name
+            self._check_name(name, path)
+            char = reader.peek()
+            if char == '"':
+                yield path, False, PresetPlan._body(reader.string())
+            elif char == "n":
+                yield path, False, reader.literal()
+            elif char == "{":
+                reader.pos += 1
+                if reader.peek() == '"':
+                    key = reader.string()
+                if key == "$source":  # Asset file
+                    reader.expect(":")
+                    source = reader.string()
+                    if not source.strip() or not reader.skip_if("}"):
+                        raise PresetValidationError([(path, 'An asset file must be {"$source": "path/to/file"}')])
+                    yield path, False, PresetPlan._body({"$source": source})
+                    key = None
+                    continue
+                yield path, True, None
+                prefixes.append(path + os.sep)
+                first = True
+            else:
+                raise PresetValidationError(
+                    [(path, "Must be null or a string (a file), {\"$source\": path} (an asset) or an object (a folder)")]
+                )
+
+    def _check_name(self, name, path):
+        if name not in self._name_problems:
+            if len(self._name_problems) >= self.MAX_NAME_VERDICTS:
+                self._name_problems.clear()
+            self._name_problems[name] = self.validator._name_problem(name)
+        if self._name_problems[name]:
+            raise PresetValidationError([(path, self._name_problems[name])])
+
+
+class AssetSource:
+    """Compiled body of a file copied from a local asset file at the absolute ``path``.
+
+    Not a tuple, since compiled plans tell folders apart by being tuples.
+    """
+    __slots__ = ("path",)
+
+    def __init__(self, path):
+        self.path = path
+
+    def __eq__(self, other):
+        return isinstance(other, AssetSource) and other.path == self.path
+
+    def __hash__(self):
+        return hash((AssetSource, self.path))
+
+    def __repr__(self):
+        return f"AssetSource({self.path!r})"
+
+def structure_stats(structure):
+    """Node, file and folder counts, depth and content size of a structure, in one pass.
+
+    Name patterns are multiplied out rather than expanded.
+    """
+    stats = {"nodes": 0, "files": 0, "folders": 0, "depth": 0, "content_bytes": 0}
+    for name, content in node_items(structure):
+        times = NamePattern.multiplicity(name)
+        if not is_folder(content):  # File; the size of an asset is only known when it is copied
+            stats["files"] += times
+            child = {"nodes": 0, "files": 0, "folders": 0, "depth": 0,
+                     "content_bytes": len(content.encode("utf-8")) if isinstance(content, str) else 0}
+        else:  # Directory
+            stats["folders"] += times
+            child = structure_stats(content)
+        for key in ("nodes", "files", "folders", "content_bytes"):
+            stats[key] += times * child[key]
+        stats["nodes"] += times
+        stats["depth"] = max(stats["depth"], 1 + child["depth"])
+    return stats
+
+
+def asset_path(source):
+    """Real path of a ``$source`` reference, which must lie inside BLUEPRINT_ASSET_DIR.
+
+    That defaults to the ``assets`` folder next to the user's presets.
+    Relative references are looked up there; absolute and ``~`` ones are
+    accepted only if they point into it. Symlinks are resolved first, so
+    no reference reaches a file elsewhere. Raises ValueError otherwise.
+    """
+    root = os.path.realpath(
+        os.environ.get("BLUEPRINT_ASSET_DIR") or os.path.join(ProjectStructureCreator.user_dir(), "assets")
+    )
+    path = os.path.realpath(os.path.join(root, os.path.expanduser(source)))
+    try:
+        inside = path != root and os.path.commonpath([root, path]) == root
+    except ValueError:  # On another drive
+        inside = False
+    if not inside:
+        raise ValueError(f"Asset {source!r} is outside the asset folder {root}")
+    return path
+
+class AssetCopier:
+    """Copy asset files into new projects without moving their bytes through Python where possible.
+
+    ``copy_file_range`` is tried first (the kernel may clone blocks or copy
+    server-side), then ``sendfile``, then a loop through one reused buffer.
+    Files of LARGE_BYTES or more are copied on a pool shared by the whole
+    process, BLUEPRINT_ASSET_COPIES threads wide (default 2): the project's
+    other nodes are created meanwhile, and no more than that many large
+    copies compete for the disk at once. ``on_progress(copied, total)`` is
+    called from the copying threads as bytes arrive. With a ``throttle``
+    (an IOThrottle), each chunk takes an inflight slot and counts against
+    the bytes limit.
+    """
+    CHUNK = 8 << 20
+    LARGE_BYTES = 64 << 20
+    DEFAULT_PARALLEL = 2
+    FALLBACK_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF,
+                       getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), getattr(errno, "ENOTSOCK", errno.EINVAL)}
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def __init__(self, on_progress=None, throttle=None):
+        self.on_progress = on_progress
+        self.throttle = throttle
+        self.total = 0
+        self.copied = 0
+        self._lock = threading.Lock()
+        self._pending = []
+
+    @classmethod
+    def methods(cls):
+        """The copy methods this platform offers, best first."""
+        methods = []
+        if hasattr(os, "copy_file_range"):
+            methods.append("copy_file_range")
+        if hasattr(os, "sendfile") and sys.platform.startswith("linux"):  # Elsewhere it only writes to sockets
+            methods.append("sendfile")
+        return methods + ["buffered"]
+
+    @classmethod
+    def shared_pool(cls):
+        with cls._pool_lock:
+            if cls._pool is None:
+                workers = int(os.environ.get("BLUEPRINT_ASSET_COPIES") or cls.DEFAULT_PARALLEL)
+                cls._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="asset-copy")
+            return cls._pool
+
+    def expect(self, plan):
+        """Add the size of every asset copy in plan to ``total``; returns it."""
+        sizes = {}
+        for _, is_dir, body in plan:
+            if isinstance(body, AssetSource):
+                if body.path not in sizes:
+                    try:
+                        sizes[body.path] = os.stat(body.path).st_size
+                    except OSError:
+                        sizes[body.path] = 0  # Reported when its copy is attempted
+                self.total += sizes[body.path]
+        return self.total
+
+    def start(self, source, fd, rel_path):
+        """Copy an asset into the open file fd, which is closed afterwards.
+
+        Returns the bytes copied, or None when a large copy goes on in the
+        background; finished() and drain() report those.
+        """
+        try:
+            size = os.stat(source.path).st_size
+            if size >= self.LARGE_BYTES:
+                self._pending.append((rel_path, self.shared_pool().submit(self._copy_and_close, source, fd, size)))
+                return None
+        except BaseException:
+            os.close(fd)
+            raise
+        return self._copy_and_close(source, fd, size)
+
+    def finished(self):
+        """(rel_path, False, bytes) records of background copies that have completed."""
+        done, pending = [], []
+        for entry in self._pending:
+            (done if entry[1].done() else pending).append(entry)
+        self._pending = pending
+        return [(rel_path, False, future.result()) for rel_path, future in done]
+
+    def drain(self):
+        """Wait for the remaining background copies, yielding a record as each completes."""
+        while self._pending:
+            wait([future for _, future in self._pending], return_when=FIRST_COMPLETED)
+            yield from self.finished()
+
+    def _copy_and_close(self, source, fd, size):
+        try:
+            src = os.open(source.path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+            try:
+                return self._copy(src, fd, size)
+            finally:
+                os.close(src)
+        finally:
+            os.close(fd)
+
+    def _copy(self, src, dst, size):
+        methods = self.methods()
+        copied = 0
+        buffer = reader = None
+        chunk, slot = self.CHUNK, contextlib.nullcontext
+        if self.throttle is not None:
+            chunk, slot = self.throttle.chunk(self.CHUNK), self.throttle.slot
+        while copied < size:
+            count = min(chunk, size - copied)
+            method = methods[0]
+            try:
+                with slot():
+                    if method == "copy_file_range":
+                        n = os.copy_file_range(src, dst, count)
+                    elif method == "sendfile":
+                        n = os.sendfile(dst, src, None, count)
+                    else:
+                        if buffer is None:
+                            buffer = memoryview(bytearray(min(self.CHUNK, size)))
+                            reader = open(src, "rb", buffering=0, closefd=False)
+                        n = reader.readinto(buffer[:count])
+                        view = buffer[:n]
+                        while view:
+                            view = view[os.write(dst, view):]
+            except OSError as e:
+                # Unsupported for this pair of files: fall back, unless bytes have already moved
+                if copied or method == "buffered" or e.errno not in self.FALLBACK_ERRORS:
+                    raise
+                methods.pop(0)
+                continue
+            if not n:
+                if not copied and method != "buffered":
+                    methods.pop(0)  # Some filesystems report success without copying
+                    continue
+                break  # The source shrank while being copied
+            copied += n
+            if self.throttle is not None:
+                self.throttle.transfer(n)
+            self._advance(n)
+        return copied
+
+    def _advance(self, count):
+        with self._lock:
+            self.copied += count
+            copied = self.copied
+        if self.on_progress:
+            self.on_progress(copied, self.total)
+
+
+def check_node_path(rel_path):
+    """Refuse a relative node path that could leave the project folder; the validator rejects these first."""
+    for name in rel_path.split(os.sep):
+        if name in ("", ".", "..") or "/" in name or "\\" in name or "\0" in name:
+            raise ValueError(f"Unsafe node name {name!r} in {rel_path!r}")
+
+
+class PathBackend:
+    """Materialize plans by full path: portable, but every call re-resolves the whole path."""
+    name = "path"
+    FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_CLOEXEC", 0) | getattr(os, "O_BINARY", 0)
+
+    def materialize(self, plan, project_path, assets=None, throttle=None):
+        """Create each plan entry, yielding (relative_path, is_dir, bytes_written) after it exists.
+
+        Large asset copies may finish after later entries; their records follow when they do.
+        Each folder and file created waits its turn under ``throttle`` (an IOThrottle), if given.
+        """
+        assets = assets or AssetCopier(throttle=throttle)
+        op = throttle.op if throttle is not None else contextlib.nullcontext
+        with op():
+            os.makedirs(project_path, exist_ok=True)
+        for rel_path, is_dir, body in plan:
+            check_node_path(rel_path)
+            path = os.path.join(project_path, rel_path)
+            if is_dir:
+                with op():
+                    os.makedirs(path, exist_ok=True)
+                yield rel_path, True, 0
+                continue
+            if isinstance(body, AssetSource):
+                with op():
+                    fd = os.open(path, self.FILE_FLAGS, 0o666)
+                written = assets.start(body, fd, rel_path)
+                if written is None:
+                    yield from assets.finished()
+                    continue
+                yield rel_path, False, written
+                continue
+            with op():
+                with open(path, 'wb') as f:
+                    if body:
+                        f.write(body)
+            if body and throttle is not None:
+                throttle.transfer(len(body))
+            yield rel_path, False, len(body) if body else 0
+        yield from assets.drain()
+
+
+class DirFdBackend:
+    """Materialize plans relative to an open descriptor of each parent directory (Linux).
+
+    Every node is created with a single-component ``dir_fd`` lookup instead of
+    resolving its full path, and files are created and written with
+    ``os.open``/``os.write`` without building Python file objects. Existing
+    files are truncated and existing folders reused, as with PathBackend.
+    """
+    name = "dirfd"
+    DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_CLOEXEC", 0)
+    FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_CLOEXEC", 0)
+
+    @classmethod
+    def is_supported(cls):
+        return (sys.platform.startswith("linux") and os.mkdir in os.supports_dir_fd
+                and os.open in os.supports_dir_fd)
+
+    def materialize(self, plan, project_path, assets=None, throttle=None):
+        """Create each plan entry, yielding (relative_path, is_dir, bytes_written) after it exists.
+
+        ``plan`` is a PresetPlan or any iterable of its entries, parents
+        first, such as a StreamedPreset. Large asset copies may finish after
+        later entries; their records follow when they do. Each folder and
+        file created or opened waits its turn under ``throttle`` (an
+        IOThrottle), if given.
+        """
+        assets = assets or AssetCopier(throttle=throttle)
+        op = throttle.op if throttle is not None else contextlib.nullcontext
+        with op():
+            os.makedirs(project_path, exist_ok=True)
+            root_fd = os.open(project_path, self.DIR_FLAGS)
+        try:
+            if isinstance(plan, PresetPlan):
+                yield from self._walk(plan.root, root_fd, "", assets, throttle)
+            else:
+                yield from self._walk_entries(plan, root_fd, assets, throttle)
+        finally:
+            os.close(root_fd)
+        yield from assets.drain()
+
+    def _walk(self, entries, dir_fd, prefix, assets, throttle=None):
+        op = throttle.op if throttle is not None else contextlib.nullcontext
+        for names, child in entries:
+            for name in names:
+                check_node_path(name)
+                rel_path = prefix + name
+                if isinstance(child, AssetSource):
+                    with op():
+                        fd = self._open_file(name, dir_fd)
+                    written = assets.start(child, fd, rel_path)
+                    if written is None:
+                        yield from assets.finished()
+                    else:
+                        yield rel_path, False, written
+                    continue
+                if not isinstance(child, tuple):  # File
+                    with op():
+                        self._create_file(name, dir_fd, child)
+                    if child and throttle is not None:
+                        throttle.transfer(len(child))
+                    yield rel_path, False, len(child) if child else 0
+                    continue
+                with op():
+                    try:
+                        os.mkdir(name, dir_fd=dir_fd)
+                    except FileExistsError:
+                        pass
+                yield rel_path, True, 0
+                if child:
+                    with op():
+                        child_fd = os.open(name, self.DIR_FLAGS, dir_fd=dir_fd)
+                    try:
+                        yield from self._walk(child, child_fd, rel_path + os.sep, assets, throttle)
+                    finally:
+                        os.close(child_fd)
+
+    def _walk_entries(self, entries, root_fd, assets, throttle=None):
+        op = throttle.op if throttle is not None else contextlib.nullcontext
+        # Descriptors of the folders on the path to the current entry, innermost last
+        open_dirs = [("", root_fd)]
+        try:
+            for rel_path, is_dir, body in entries:
+                check_node_path(rel_path)
+                parent, name = os.path.split(rel_path)
+                while open_dirs[-1][0] and parent != open_dirs[-1][0] and not parent.startswith(open_dirs[-1][0] + os.sep):
+                    os.close(open_dirs.pop()[1])
+                if parent != open_dirs[-1][0]:
+                    inner = parent[len(open_dirs[-1][0]) + 1:] if open_dirs[-1][0] else parent
+                    with op():
+                        open_dirs.append((parent, os.open(inner, self.DIR_FLAGS, dir_fd=open_dirs[-1][1])))
+                dir_fd = open_dirs[-1][1]
+                if is_dir:
+                    with op():
+                        try:
+                            os.mkdir(name, dir_fd=dir_fd)
+                        except FileExistsError:
+                            pass
+                    yield rel_path, True, 0
+                elif isinstance(body, AssetSource):
+                    with op():
+                        fd = self._open_file(name, dir_fd)
+                    written = assets.start(body, fd, rel_path)
+                    if written is None:
+                        yield from assets.finished()
+                    else:
+                        yield rel_path, False, written
+                else:
+                    with op():
+                        self._create_file(name, dir_fd, body)
+                    if body and throttle is not None:
+                        throttle.transfer(len(body))
+                    yield rel_path, False, len(body) if body else 0
+        finally:
+            for _, fd in open_dirs[1:]:
+                os.close(fd)
+
+    def _open_file(self, name, dir_fd):
+        try:
+            return os.open(name, self.FILE_FLAGS, 0o666, dir_fd=dir_fd)
+        except FileExistsError:
+            return os.open(name, os.O_WRONLY | os.O_TRUNC, dir_fd=dir_fd)
+
+    def _create_file(self, name, dir_fd, body=None):
+        fd = self._open_file(name, dir_fd)
+        try:
+            view = memoryview(body) if body else None
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
+
+
+def default_backend():
+    """The fastest supported materialization backend; BLUEPRINT_BACKEND=path forces the portable one."""
+    if os.environ.get("BLUEPRINT_BACKEND") != "path" and DirFdBackend.is_supported():
+        return DirFdBackend()
+    return PathBackend()
+
+
+def benchmark_backends(plan, repeat=3, base_dir=None):
+    """Time each backend materializing plan into fresh folders; returns {name: best seconds}."""
+
+    results = {}
+    backends = [PathBackend()] + ([DirFdBackend()] if DirFdBackend.is_supported() else [])
+    for backend in backends:
+        timings = []
+        for _ in range(repeat):
+            work_dir = tempfile.mkdtemp(prefix="blueprint-bench-", dir=base_dir)
+            try:
+                started = time.perf_counter()
+                deque(backend.materialize(plan, os.path.join(work_dir, "project")), maxlen=0)
+                timings.append(time.perf_counter() - started)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+        results[backend.name] = min(timings)
+    return results
+
+
+class HookResult(namedtuple("HookResult", "name status returncode elapsed log")):
+    """Outcome of one post-create hook.
+
+    ``status`` is ``"ok"``, ``"failed"`` (non-zero exit, or the command could
+    not be started), ``"timeout"``, ``"cancelled"`` (stopped while running) or
+    ``"skipped"`` (a hook it runs after did not succeed, or the run was
+    stopped first); ``log`` is its combined stdout and stderr.
+    """
+    __slots__ = ()
+
+
+class HookScheduler:
+    """Run a preset's post-create hooks (its ``$hooks`` directive) as a dependency graph.
+
+    Each hook is ``{"run": command, "after": [hooks], "timeout": seconds}``;
+    a command string is split shell-style but never run through a shell.
+    Hooks whose dependencies have succeeded run concurrently, at most
+    ``max_parallel`` at a time (BLUEPRINT_HOOK_JOBS), in the project folder,
+    each with its own timeout and captured output. Hooks after one that did
+    not succeed are skipped.
+    """
+    DEFAULT_TIMEOUT = 300
+    DEFAULT_PARALLEL = 4
+    STOP_POLL = 0.1  # Seconds between checks of the stop event while a hook runs
+
+    def __init__(self, max_parallel=None):
+        self.max_parallel = max(1, max_parallel or int(os.environ.get("BLUEPRINT_HOOK_JOBS", self.DEFAULT_PARALLEL)))
+
+    def run(self, hooks, cwd, on_finished=None, stop=None):
+        """Run hooks in cwd and return their HookResults in completion order.
+
+        ``on_finished`` is called with each result from the calling thread.
+        Once the ``stop`` event is set, running hooks are killed and the
+        others are skipped.
+        """
+        waiting = {name: set(spec.get("after", ())) for name, spec in hooks.items()}
+        dependents = {name: [] for name in hooks}
+        for name, after in waiting.items():
+            for dependency in after:
+                dependents[dependency].append(name)
+        results = {}
+        running = {}
+        with ThreadPoolExecutor(max_workers=self.max_parallel) as pool:
+            while True:
+                for name in [name for name, after in waiting.items() if not after]:
+                    del waiting[name]
+                    if stop is not None and stop.is_set():
+                        results[name] = HookResult(name, "skipped", None, 0.0, "Skipped: stopped")
+                        if on_finished:
+                            on_finished(results[name])
+                        continue
+                    running[pool.submit(self._run_hook, name, hooks[name], cwd, stop)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    finished = [future.result()]
+                    if finished[0].status == "ok":
+                        for dependent in dependents[name]:
+                            if dependent in waiting:  # Not already skipped through another dependency
+                                waiting[dependent].discard(name)
+                    else:
+                        finished += self._skip_dependents(name, dependents, waiting)
+                    for result in finished:
+                        results[result.name] = result
+                        if on_finished:
+                            on_finished(result)
+        for name in waiting:  # Only reachable through a dependency cycle, which validation rejects
+            results[name] = HookResult(name, "skipped", None, 0.0, "Skipped: dependency cycle")
+        return list(results.values())
+
+    def _skip_dependents(self, name, dependents, waiting):
+        skipped = []
+        for dependent in dependents[name]:
+            if dependent in waiting:
+                del waiting[dependent]
+                skipped.append(HookResult(dependent, "skipped", None, 0.0, f"Skipped: '{name}' did not succeed"))
+                skipped += self._skip_dependents(dependent, dependents, waiting)
+        return skipped
+
+    def _run_hook(self, name, spec, cwd, stop=None):
+        command = spec["run"]
+        argv = shlex.split(command) if isinstance(command, str) else list(command)
+        timeout = spec.get("timeout", self.DEFAULT_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            # Own session, so a timeout also stops the processes the hook spawned
+            process = subprocess.Popen(
+                argv, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                start_new_session=os.name == "posix"
+            )
+        except OSError as e:
+            return HookResult(name, "failed", None, time.perf_counter() - started, str(e))
+        deadline = started + timeout
+        with process:
+            while True:
+                # In slices, to notice the stop event; communicate can be called again after a timeout
+                remaining = deadline - time.perf_counter()
+                try:
+                    output, _ = process.communicate(timeout=max(0, min(remaining, self.STOP_POLL)))
+                    break
+                except subprocess.TimeoutExpired:
+                    stopped = stop is not None and stop.is_set()
+                    if not stopped and time.perf_counter() < deadline:
+                        continue
+                    self._kill(process)
+                    output, _ = process.communicate()
+                    if stopped:
+                        log = output.decode("utf-8", "replace") + "\nStopped"
+                        return HookResult(name, "cancelled", None, time.perf_counter() - started, log)
+                    log = output.decode("utf-8", "replace") + f"\nTimed out after {timeout}s"
+                    return HookResult(name, "timeout", None, time.perf_counter() - started, log)
+        status = "ok" if process.returncode == 0 else "failed"
+        return HookResult(name, status, process.returncode, time.perf_counter() - started,
+                          output.decode("utf-8", "replace"))
+
+    def _kill(self, process):
+        if os.name == "posix":
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        else:
+            process.kill()
+
+
+class GitRepoWriter:
+    """Turn a project folder being created from a plan into a git repository, without running git.
+
+    Loose objects, the index, ``HEAD`` and the branch ref are written in pure
+    Python. Blob and tree objects come from the compiled plan, so a folder
+    repeated by a name pattern is hashed once, and each file is stat-ed as it
+    is created so the index matches the working tree straight away. The result
+    is one initial commit; empty folders are left out, as git does not track
+    them.
+    """
+    BRANCH = "main"
+    FALLBACK_IDENTITY = ("Blueprint Generator", "blueprint@localhost")
+
+    def __init__(self, project_path, message):
+        self.project_path = project_path
+        self.git_dir = os.path.join(project_path, ".git")
+        self.message = message
+        self._stats = {}
+        self._blobs = {}
+        self._trees = {}
+        self._written = set()
+
+    def init(self, plan):
+        """Create an empty repository for plan; refuses to touch an existing one.
+
+        A plan with a node named ``.git`` (in any case) is refused as well, as it
+        would be written into the repository itself, or be a path git won't track.
+        """
+        if os.path.exists(self.git_dir):
+            raise FileExistsError(f"Already a git repository: {self.project_path}")
+        if self._has_git_node(plan.root, set()):
+            raise ValueError("The template has a node named .git, so it cannot be created as a git repository")
+        for folder in ("objects/info", "objects/pack", "refs/heads", "refs/tags", "info"):
+            os.makedirs(os.path.join(self.git_dir, folder))
+        self._write_file("HEAD", f"ref: refs/heads/{self.BRANCH}\n".encode())
+        self._write_file("config", b"[core]\n\trepositoryformatversion = 0\n\tfilemode = true\n"
+                                   b"\tbare = false\n\tlogallrefupdates = true\n")
+        self._write_file("description", b"Unnamed repository; edit this file to name it.\n")
+
+    def _has_git_node(self, entries, seen):
+        if id(entries) in seen:
+            return False
+        seen.add(id(entries))
+        for names, child in entries:
+            pattern = names if isinstance(names, NamePattern) else None
+            if pattern.can_be(".git") if pattern is not None else any(name.lower() == ".git" for name in names):
+                return True
+            if isinstance(child, tuple) and self._has_git_node(child, seen):
+                return True
+        return False
+
+    def add_file(self, rel_path):
+        """Record the stat data of a file the plan has just created."""
+        self._stats[rel_path] = os.lstat(os.path.join(self.project_path, rel_path))
+
+    def commit(self, plan):
+        """Write the plan's trees, the index, the initial commit and the branch ref; returns the commit id."""
+        tree = self._tree(plan.root) or self._object(b"tree", b"")
+        name, email = self._identity()
+        offset = time.localtime().tm_gmtoff // 60
+        stamp = f"{int(time.time())} {'+' if offset >= 0 else '-'}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+        signature = f"{name} <{email}> {stamp}"
+        commit = self._object(
+            b"commit",
+            f"tree {tree.hex()}\nauthor {signature}\ncommitter {signature}\n\n{self.message}\n".encode()
+        )
+        self._write_index(plan)
+        self._write_file(f"refs/heads/{self.BRANCH}", commit.hex().encode() + b"\n")
+        return commit.hex()
+
+    def _tree(self, entries):
+        # Compiled folders are shared by every name a pattern expands to, so cache by identity
+        if id(entries) in self._trees:
+            return self._trees[id(entries)]
+        items = []
+        for names, child in entries:
+            if isinstance(child, tuple):
+                sub = self._tree(child)
+                if sub:
+                    items += [(name.encode("utf-8", "surrogateescape") + b"/", b"40000", sub) for name in names]
+            else:
+                blob = self._blob(child)
+                items += [(name.encode("utf-8", "surrogateescape"), b"100644", blob) for name in names]
+        items.sort()  # Git orders folders as if their names ended in '/'
+        sha = self._object(b"tree", b"".join(
+            mode + b" " + name.rstrip(b"/") + b"\0" + sha for name, mode, sha in items
+        )) if items else None
+        self._trees[id(entries)] = sha
+        return sha
+
+    def _blob(self, body):
+        body = body or b""
+        sha = self._blobs.get(body)
+        if sha is None:
+            if isinstance(body, AssetSource):
+                sha = self._blobs[body] = self._asset_object(body.path)
+            else:
+                sha = self._blobs[body] = self._object(b"blob", body)
+        return sha
+
+    def _asset_object(self, path):
+        """Hash and compress an asset into a blob a chunk at a time, so large files never sit in memory."""
+        header = b"blob %d\0" % os.stat(path).st_size
+        hasher = hashlib.sha1(header)
+        compressor = zlib.compressobj(1)
+        tmp_path = os.path.join(self.git_dir, "objects", f"tmp_blob_{os.getpid()}")
+        with open(path, "rb") as src, open(tmp_path, "wb") as out:
+            out.write(compressor.compress(header))
+            for chunk in iter(lambda: src.read(AssetCopier.CHUNK), b""):
+                hasher.update(chunk)
+                out.write(compressor.compress(chunk))
+            out.write(compressor.flush())
+        sha = hasher.digest()
+        folder = os.path.join(self.git_dir, "objects", sha[:1].hex())
+        os.makedirs(folder, exist_ok=True)
+        if sha in self._written:
+            os.remove(tmp_path)
+        else:
+            self._written.add(sha)
+            os.replace(tmp_path, os.path.join(folder, sha[1:].hex()))
+        return sha
+
+    def _object(self, kind, data):
+        raw = kind + b" " + str(len(data)).encode() + b"\0" + data
+        sha = hashlib.sha1(raw).digest()
+        if sha not in self._written:
+            self._written.add(sha)
+            folder = os.path.join(self.git_dir, "objects", sha[:1].hex())
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, sha[1:].hex()), "wb") as f:
+                f.write(zlib.compress(raw, 1))
+        return sha
+
+    def _write_index(self, plan):
+        entries = []
+        for rel_path, is_dir, body in plan:
+            st = self._stats.get(rel_path)
+            if is_dir or st is None:
+                continue
+            path = rel_path.replace(os.sep, "/").encode("utf-8", "surrogateescape")
+            mode = 0o100755 if st.st_mode & 0o111 else 0o100644
+            entry = struct.pack(
+                ">10I20sH",
+                int(st.st_ctime) & 0xFFFFFFFF, st.st_ctime_ns % 1_000_000_000,
+                int(st.st_mtime) & 0xFFFFFFFF, st.st_mtime_ns % 1_000_000_000,
+                st.st_dev & 0xFFFFFFFF, st.st_ino & 0xFFFFFFFF, mode,
+                st.st_uid & 0xFFFFFFFF, st.st_gid & 0xFFFFFFFF, st.st_size & 0xFFFFFFFF,
+                self._blob(body), min(len(path), 0xFFF)
+            ) + path
+            entries.append((path, entry + b"\0" * (8 - len(entry) % 8)))
+        entries.sort()
+        data = b"DIRC" + struct.pack(">II", 2, len(entries)) + b"".join(entry for _, entry in entries)
+        self._write_file("index", data + hashlib.sha1(data).digest())
+
+    def _identity(self):
+        name = os.environ.get("GIT_AUTHOR_NAME")
+        email = os.environ.get("GIT_AUTHOR_EMAIL")
+        if not (name and email) and shutil.which("git"):
+            # One lookup per repository, only for the configured identity
+            try:
+                name = name or subprocess.run(["git", "config", "user.name"], capture_output=True,
+                                              text=True, timeout=5).stdout.strip()
+                email = email or subprocess.run(["git", "config", "user.email"], capture_output=True,
+                                                text=True, timeout=5).stdout.strip()
+            except (OSError, subprocess.TimeoutExpired):
+                pass
+        return name or self.FALLBACK_IDENTITY[0], email or self.FALLBACK_IDENTITY[1]
+
+    def _write_file(self, rel_path, data):
+        with open(os.path.join(self.git_dir, rel_path), "wb") as f:
+            f.write(data)
+
+
+class TreeDiffer:
+    """Compare preset trees (or a preset and a directory on disk).
+
+    Trees are first reduced to Merkle digest trees, ``(digest, children)`` with
+    ``children`` None for files, so identical subtrees are skipped by comparing
+    a single digest. The root of a preset's tree also carries its directives,
+    ``(digest, children, directives)``: ``$options`` and ``$hooks`` as file-like
+    nodes and ``$if`` as a folder holding one subtree per condition. They are
+    compared only between two presets, so changes to them show up as paths
+    such as ``$hooks`` or ``$if/tests/tests``, and are left out against a
+    directory on disk. Changes are reported as dicts with an ``op`` of
+    ``added``, ``removed``, ``modified`` (file content) or ``type_changed``,
+    the slash-separated ``path``,
+    the ``old``/``new`` kinds and, for added or removed folders, the number of
+    ``nodes`` in that subtree. Name patterns are compared as written and only
+    expanded, one level at a time, where the two sides' names differ.
+    """
+
+    FILE_DIGEST = hashlib.sha1(b"file").digest()
+    UNREAD_DIGEST = hashlib.sha1(b"file?").digest()  # Non-empty file on disk whose content was not read
+
+    def digest_tree(self, structure):
+        """Build the digest tree of a preset, directives included; sibling order does not affect digests."""
+        directives = {}
+        for key, content in structure.items():
+            if key == "$if" and isinstance(content, dict):
+                directives[key] = self._dir_node({
+                    condition: self._folder_tree(overlay) for condition, overlay in content.items()
+                })
+            elif key.startswith("$") and key != "$stats":  # $stats is derived from the nodes
+                encoded = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+                directives[key] = (hashlib.sha1(b"directive\0" + encoded.encode("utf-8")).digest(), None)
+        return self._dir_node(self._folder_tree(structure)[1], directives)
+
+    def _folder_tree(self, structure):
+        children = {}
+        for name, content in node_items(structure):
+            if is_folder(content):  # Directory
+                children[name] = self._folder_tree(content)
+            elif isinstance(content, dict):  # Asset, identified by its source path
+                children[name] = (hashlib.sha1(b"asset\0" + content["$source"].encode("utf-8")).digest(), None)
+            else:  # File
+                children[name] = (self.file_digest(content), None)
+        return self._dir_node(children)
+
+    def _dir_node(self, children, directives=None):
+        hasher = hashlib.sha1(b"dir")
+        for name in sorted(children):
+            hasher.update(name.encode("utf-8", "surrogateescape") + b"\0" + children[name][0])
+        if directives is None:
+            return hasher.digest(), children
+        # A preset without directives keeps the digest it had before they were included
+        for name in sorted(directives):
+            hasher.update(b"\1" + name.encode("utf-8") + b"\0" + directives[name][0])
+        return hasher.digest(), children, directives
+
+    def file_digest(self, content):
+        if not content:
+            return self.FILE_DIGEST
+        return hashlib.sha1(b"file\0" + content.encode("utf-8")).digest()
+
+    def diff(self, old, new):
+        """Diff two structures or digest trees and return the list of changes."""
+        if isinstance(old, dict):
+            old = self.digest_tree(old)
+        if isinstance(new, dict):
+            new = self.digest_tree(new)
+        changes = []
+        if old[0] != new[0]:
+            if len(old) > 2 and len(new) > 2:  # Two presets
+                self._diff_children(old[2], new[2], "", changes)
+            self._diff_children(old[1], new[1], "", changes)
+        return changes
+
+    def _diff_children(self, old_children, new_children, prefix, changes):
+        if old_children.keys() != new_children.keys():
+            old_children, new_children = (
+                self._expand_patterns(old_children, new_children),
+                self._expand_patterns(new_children, old_children),
+            )
+        for name, old_node in old_children.items():
+            path = prefix + name
+            new_node = new_children.get(name)
+            if new_node is None:
+                changes.append(self._change("removed", path, old_node, None))
+            elif old_node[0] == new_node[0]:
+                continue  # Identical subtree
+            elif (old_node[1] is None) != (new_node[1] is None):
+                changes.append(self._change("type_changed", path, old_node, new_node))
+            elif old_node[1] is None:  # Both files
+                if self.UNREAD_DIGEST not in (old_node[0], new_node[0]):
+                    changes.append(self._change("modified", path, old_node, new_node))
+            else:
+                self._diff_children(old_node[1], new_node[1], path + "/", changes)
+        for name, new_node in new_children.items():
+            if name not in old_children:
+                changes.append(self._change("added", prefix + name, None, new_node))
+
+    def _expand_patterns(self, children, other):
+        """Expand pattern names missing on the other side; expanded names share one subtree."""
+        if not any(name not in other and NamePattern.parse(name) for name in children):
+            return children
+        expanded = {}
+        for name, node in children.items():
+            for concrete in ((name,) if name in other else NamePattern.names(name)):
+                expanded[concrete] = node
+        return expanded
+
+    def _change(self, op, path, old_node, new_node):
+        change = {"op": op, "path": path, "old": self._kind(old_node), "new": self._kind(new_node)}
+        node = new_node if op == "added" else old_node
+        if op in ("added", "removed") and node[1] is not None:
+            change["nodes"] = self._count(node)
+        return change
+
+    def _kind(self, node):
+        if node is None:
+            return None
+        return "file" if node[1] is None else "dir"
+
+    def _count(self, node):
+        if node[1] is None:
+            return 1
+        return 1 + sum(NamePattern.multiplicity(name) * self._count(child) for name, child in node[1].items())
+
+    def scan_directory(self, path):
+        """Read a directory on disk into a digest tree.
+
+        File contents are not read: non-empty files match any file content.
+        """
+        children = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    children[entry.name] = self.scan_directory(entry.path)
+                elif entry.stat(follow_symlinks=False).st_size:
+                    children[entry.name] = (self.UNREAD_DIGEST, None)
+                else:
+                    children[entry.name] = (self.FILE_DIGEST, None)
+        return self._dir_node(children)
+
+    def format_diff(self, changes):
+        """Render changes as a human-readable listing."""
+        if not changes:
+            return "✓ No differences"
+        symbols = {"added": "+", "removed": "-", "type_changed": "~"}
+        lines = []
+        for change in changes:
+            path = change["path"]
+            if change["op"] == "type_changed":
+                lines.append(f"~ {path}  ({change['old']} → {change['new']})")
+                continue
+            if change["op"] == "modified":
+                lines.append(f"* {path}  (content changed)")
+                continue
+            kind = change["new"] if change["op"] == "added" else change["old"]
+            suffix = "/" if kind == "dir" else ""
+            extra = f"  ({change['nodes']} nodes)" if change.get("nodes", 1) > 1 else ""
+            lines.append(f"{symbols[change['op']]} {path}{suffix}{extra}")
+        return "\n".join(lines)
+
+
+class ProjectDrift(namedtuple("ProjectDrift", "path preset missing extra mismatched scanned elapsed error")):
+    """How one existing project differs from its preset, as found by FleetAuditor.
+
+    ``missing`` and ``extra`` hold ``{"path", "kind"}`` dicts (missing
+    folders also give the ``nodes`` they would hold), ``mismatched`` holds
+    ``{"path", "expected", "found"}`` dicts. Paths are slash-separated and
+    relative to the project. An extra folder is reported once, without
+    looking inside it. ``error`` is set when the project, or one of its
+    folders, could not be read.
+    """
+    __slots__ = ()
+
+    @property
+    def drifted(self):
+        return bool(self.missing or self.extra or self.mismatched or self.error)
+
+    def summary(self):
+        if self.error:
+            return f"✗ {self.path} ({self.preset}): {self.error}"
+        if not self.drifted:
+            return f"✓ {self.path} ({self.preset})"
+        counts = [f"{len(nodes)} {label}" for label, nodes in
+                  (("missing", self.missing), ("extra", self.extra), ("mismatched", self.mismatched)) if nodes]
+        return f"✗ {self.path} ({self.preset}): {', '.join(counts)}"
+
+    def format_details(self):
+        lines = [self.summary()]
+        for node in self.missing:
+            extra = f"  ({node['nodes']} nodes)" if node.get("nodes", 1) > 1 else ""
+            lines.append(f"    - {node['path']}{'/' if node['kind'] == 'dir' else ''}{extra}")
+        for node in self.extra:
+            lines.append(f"    + {node['path']}{'/' if node['kind'] == 'dir' else ''}")
+        for node in self.mismatched:
+            lines.append(f"    ~ {node['path']}  ({node['expected']} → {node['found']})")
+        return "\n".join(lines)
+
+
+class FleetAuditor:
+    """Check many existing projects against the compiled plans of their presets, in parallel.
+
+    Each project is walked with ``os.scandir`` alongside its plan, so only
+    folders the preset describes are listed, file types come from the
+    directory entries without a ``stat`` call, and extra folders are not
+    descended into: a project costs one listing per folder of its preset,
+    however much code has grown inside it. Projects are spread over
+    BLUEPRINT_AUDIT_JOBS threads (default: 4 per CPU, at most 32), which
+    overlap the filesystem waits that dominate on cold caches and network
+    mounts. File contents are not compared. Names in ``ignore`` (by default
+    ``.git``) are skipped at every level.
+    """
+    DEFAULT_IGNORE = (".git",)
+    _ABSENT = object()
+
+    def __init__(self, workers=None, ignore=DEFAULT_IGNORE):
+        self.workers = workers or int(os.environ.get("BLUEPRINT_AUDIT_JOBS") or min(32, (os.cpu_count() or 1) * 4))
+        self.ignore = frozenset(ignore)
+
+    def audit(self, projects):
+        """Audit (path, preset label, PresetPlan) triples; yields a ProjectDrift as each project is done."""
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="audit") as pool:
+            pending = {pool.submit(self.audit_project, *project) for project in projects}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def audit_project(self, path, preset, plan):
+        started = time.perf_counter()
+        missing, extra, mismatched = [], [], []
+        scanned = 0
+        error = None
+        # Folders still to list: (plan entries, folder path, slash-separated prefix)
+        stack = [(plan.root, path, "")]
+        while stack:
+            entries, dir_path, prefix = stack.pop()
+            expected = {name: child for names, child in entries for name in names}
+            try:
+                with os.scandir(dir_path) as listing:
+                    for entry in listing:
+                        name = entry.name
+                        if name in self.ignore:
+                            continue
+                        if not name.isascii():
+                            name = unicodedata.normalize("NFC", name)  # macOS may store names decomposed
+                        scanned += 1
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        child = expected.pop(name, self._ABSENT)
+                        if child is self._ABSENT:
+                            extra.append({"path": prefix + name, "kind": "dir" if is_dir else "file"})
+                        elif isinstance(child, tuple) != is_dir:
+                            mismatched.append({"path": prefix + name, "expected": "file" if is_dir else "dir",
+                                               "found": "dir" if is_dir else "file"})
+                        elif is_dir:
+                            stack.append((child, entry.path, prefix + name + "/"))
+            except OSError as e:
+                if not prefix:
+                    error = e.strerror or str(e)
+                    break
+                error = error or f"Cannot read {prefix}: {e.strerror or e}"
+                continue
+            for name, child in expected.items():
+                node = {"path": prefix + name, "kind": "dir" if isinstance(child, tuple) else "file"}
+                if isinstance(child, tuple) and child:
+                    node["nodes"] = 1 + plan._count(child)
+                missing.append(node)
+        for nodes in (missing, extra, mismatched):
+            nodes.sort(key=lambda node: node["path"])
+        return ProjectDrift(path, preset, missing, extra, mismatched, scanned, time.perf_counter() - started, error)
+
+
+class PresetBundle:
+    """Compressed multi-preset bundle (``.bpbundle``), used like ``zipfile.ZipFile``.
+
+    The zip archive holds ``manifest.json`` (each preset's entry name, digest
+    and stats) and one deflated JSON entry per preset. Folder subtrees and
+    file bodies occurring more than once across the bundle are stored once,
+    under ``objects/<digest>.json`` and ``blobs/<digest>``, and referenced as
+    ``{"$ref": digest}`` and ``{"$blob": digest}``. Listing a bundle reads only
+    the manifest, and reading a preset decompresses only its own entry and the
+    shared objects it references.
+    """
+    FORMAT = "blueprint-bundle"
+    VERSION = 1
+    EXTENSION = ".bpbundle"
+    MIN_SHARED_NODES = 3  # Smaller repeated subtrees are cheaper inline than as a reference
+    MIN_SHARED_BYTES = 64
+
+    def __init__(self, path, mode="r"):
+        if mode not in ("r", "w"):
+            raise ValueError(f"Unsupported bundle mode: {mode!r}")
+        self.mode = mode
+        self.zip = zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED, compresslevel=9)
+        self._pending = {}
+        self._objects = {}
+        if mode == "w":
+            self.manifest = {"format": self.FORMAT, "version": self.VERSION, "presets": {}}
+            return
+        try:
+            self.manifest = json.loads(self.zip.read("manifest.json"))
+        except KeyError:
+            self.zip.close()
+            raise ValueError("Not a preset bundle: manifest.json is missing")
+        if self.manifest.get("format") != self.FORMAT or self.manifest.get("version", 0) > self.VERSION:
+            self.zip.close()
+            raise ValueError("Unsupported preset bundle format")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def names(self):
+        return list(self.manifest["presets"])
+
+    def info(self, name):
+        """Manifest entry of a preset: ``entry``, ``digest`` and, when known, ``stats``."""
+        return self.manifest["presets"][name]
+
+    def node_count(self, name):
+        """Item count recorded in the manifest, or None when it is missing or malformed."""
+        stats = self.info(name).get("stats")
+        nodes = stats.get("nodes") if isinstance(stats, dict) else None
+        return nodes if isinstance(nodes, int) and not isinstance(nodes, bool) and nodes >= 0 else None
+
+    def read(self, name):
+        """Decode one preset, resolving the shared subtrees and file bodies it references."""
+        return self._resolve(json.loads(self.zip.read(self.info(name)["entry"])))
+
+    def add(self, name, structure, stats=None):
+        """Queue a preset for writing; shared content is only known once the bundle is closed."""
+        self._pending[name] = (structure, stats)
+
+    def close(self):
+        if self.mode == "w" and self.zip.fp is not None:
+            self._write_pending()
+        self.zip.close()
+
+    def _resolve(self, node):
+        resolved = {}
+        for name, content in node.items():
+            if isinstance(content, dict) and not name.startswith("$"):
+                if "$ref" in content:
+                    content = self._object(content["$ref"])
+                elif "$blob" in content:
+                    content = self.zip.read(f"blobs/{content['$blob']}").decode("utf-8")
+                else:
+                    content = self._resolve(content)
+            resolved[name] = content
+        return resolved
+
+    def _object(self, key):
+        resolved = self._objects.get(key)
+        if resolved is None:
+            resolved = self._objects[key] = self._resolve(json.loads(self.zip.read(f"objects/{key}.json")))
+        return resolved
+
+    def _write_pending(self):
+        differ = TreeDiffer()
+        trees = {name: differ.digest_tree(structure) for name, (structure, _) in self._pending.items()}
+        counts = Counter()
+        for name, (structure, _) in self._pending.items():
+            self._count_shared(structure, trees[name], counts)
+        sizes = {}
+        seen = set()
+        for name, (structure, _) in self._pending.items():
+            self._count_files(structure, trees[name], counts, sizes, seen)
+        written = set()
+        for index, (name, (structure, stats)) in enumerate(self._pending.items()):
+            entry = f"presets/{index}.json"
+            encoded = self._encode(structure, trees[name], counts, written, sizes)
+            # Directives other than $stats (kept in the manifest) travel with the preset
+            encoded.update((key, value) for key, value in structure.items() if key.startswith("$") and key != "$stats")
+            self._write_json(entry, encoded)
+            info = {"entry": entry, "digest": trees[name][0].hex()}
+            if stats:
+                info["stats"] = stats
+            self.manifest["presets"][name] = info
+        self._write_json("manifest.json", self.manifest)
+        self._pending = {}
+
+    def _count_shared(self, structure, tree, counts):
+        # Only the first occurrence of a subtree is descended into: later ones may become references
+        for name, content in node_items(structure):
+            if is_folder(content):
+                digest, children = tree[1][name]
+                counts[digest] += 1
+                if counts[digest] == 1:
+                    self._count_shared(content, (digest, children), counts)
+
+    def _count_files(self, structure, tree, counts, sizes, seen):
+        # Files count once per copy that will be encoded: in every occurrence of an inlined
+        # folder, but only once inside a folder that becomes a reference
+        for name, content in node_items(structure):
+            node = tree[1][name]
+            if is_folder(content):
+                if self._shared(node, counts, sizes):
+                    if node[0] in seen:
+                        continue
+                    seen.add(node[0])
+                self._count_files(content, node, counts, sizes, seen)
+            elif content:
+                counts[node[0]] += 1
+
+    def _shared(self, node, counts, sizes):
+        return counts[node[0]] > 1 and self._size(node, sizes) >= self.MIN_SHARED_NODES
+
+    def _encode(self, structure, tree, counts, written, sizes):
+        encoded = {}
+        for name, content in node_items(structure):
+            node = tree[1][name]
+            key = node[0].hex()
+            if is_folder(content):
+                if self._shared(node, counts, sizes):
+                    if key not in written:
+                        written.add(key)
+                        self._write_json(f"objects/{key}.json", self._encode(content, node, counts, written, sizes))
+                    content = {"$ref": key}
+                else:
+                    content = self._encode(content, node, counts, written, sizes)
+            elif isinstance(content, str) and counts[node[0]] > 1 and len(content) >= self.MIN_SHARED_BYTES:
+                if key not in written:
+                    written.add(key)
+                    self.zip.writestr(f"blobs/{key}", content.encode("utf-8"))
+                content = {"$blob": key}
+            encoded[name] = content
+        return encoded
+
+    def _size(self, node, sizes):
+        size = sizes.get(node[0])
+        if size is None:
+            size = sizes[node[0]] = sum(1 + (self._size(child, sizes) if child[1] else 0) for child in node[1].values())
+        return size
+
+    def _write_json(self, entry, data):
+        self.zip.writestr(entry, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+class PresetStore(Mapping):
+    """Read-only mapping over a binary preset file (``.bpstore``), decoding presets on access.
+
+    Layout, little-endian: a header (``b"BPST"``, version, preset count, table
+    offset), one contiguous record per preset, then a table of (name, offset,
+    length). Opening maps the file and reads only the header and table, so
+    start-up cost does not grow with the size of the presets, and a preset is
+    decoded by seeking to its record. A record is a node list: a ``u32`` count,
+    then per node its kind (``u8``), name (``u16`` length + UTF-8) and payload:
+    nothing for empty files, ``u32`` length + UTF-8 for text files and JSON
+    directives, and a nested node list for folders.
+    """
+    FILENAME = "presets.bpstore"
+    EXTENSION = ".bpstore"
+    MAGIC = b"BPST"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIQ")
+    NODE = struct.Struct("<BH")
+    LENGTH = struct.Struct("<I")
+    ENTRY = struct.Struct("<QI")
+    NAME = struct.Struct("<H")
+    FILE, TEXT, FOLDER, DIRECTIVE = range(4)
+
+    def __init__(self, path, trusted=False):
+        self.path = path
+        self.trusted = trusted  # Only for stores this app wrote from validated presets
+        self._lock = threading.Lock()  # Held while reading, so unmap never pulls the map from under a reader
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count, pos = self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC or version > self.VERSION:
+                raise ValueError(f"Not a preset store: {path}")
+            self._entries = {}
+            for _ in range(count):
+                (size,) = self.NAME.unpack_from(self._map, pos)
+                name = str(self._map[pos + 2:pos + 2 + size], "utf-8", "surrogateescape")
+                self._entries[name] = self.ENTRY.unpack_from(self._map, pos + 2 + size)
+                pos += 2 + size + self.ENTRY.size
+        except (ValueError, struct.error) as e:
+            self._map.close()
+            raise ValueError(f"Corrupt preset store {path}: {e}")
+
+    def __getitem__(self, name):
+        offset, length = self._entries[name]
+        try:
+            with self._lock:
+                structure, end = self._decode(self._map, offset)
+        except (ValueError, struct.error, RecursionError) as e:  # Includes UnicodeDecodeError and bad JSON
+            raise ValueError(f"Corrupt record for '{name}' in {self.path}: {e}")
+        if end != offset + length:
+            raise ValueError(f"Corrupt record for '{name}' in {self.path}: its length does not match")
+        return structure
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def raw(self, name):
+        """The encoded record of a preset, as stored."""
+        offset, length = self._entries[name]
+        with self._lock:
+            return self._map[offset:offset + length]
+
+    def unmap(self):
+        """Copy the file into memory and release its mapping, so the file can be replaced.
+
+        Windows refuses to replace a file that is still mapped.
+        """
+        with self._lock:
+            if isinstance(self._map, mmap.mmap):
+                data = self._map[:]
+                self._map.close()
+                self._map = data
+
+    def close(self):
+        with self._lock:
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+
+    @classmethod
+    def encode(cls, structure):
+        parts = []
+        cls._encode_level(structure, parts)
+        return b"".join(parts)
+
+    @classmethod
+    def write(cls, path, records, release=()):
+        """Write (name, encoded record) pairs to path, replacing it atomically.
+
+        The stores in ``release`` still map path; they are unmapped just before it is replaced.
+        """
+        table = []
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(bytes(cls.HEADER.size))
+            offset = cls.HEADER.size
+            for name, record in records:
+                f.write(record)
+                table.append((name, offset, len(record)))
+                offset += len(record)
+            for name, start, length in table:
+                name_bytes = name.encode("utf-8", "surrogateescape")
+                f.write(cls.NAME.pack(len(name_bytes)) + name_bytes + cls.ENTRY.pack(start, length))
+            f.seek(0)
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, 0, len(table), offset))
+        for store in release:
+            store.unmap()
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _encode_level(cls, structure, parts):
+        parts.append(cls.LENGTH.pack(len(structure)))
+        for name, content in structure.items():
+            name_bytes = name.encode("utf-8", "surrogateescape")
+            payload = None
+            if name.startswith("$"):
+                kind, payload = cls.DIRECTIVE, json.dumps(content, separators=(",", ":")).encode("utf-8")
+            elif isinstance(content, dict):
+                kind = cls.FOLDER
+            elif isinstance(content, str):
+                kind, payload = cls.TEXT, content.encode("utf-8")
+            else:
+                kind = cls.FILE
+            parts.append(cls.NODE.pack(kind, len(name_bytes)))
+            parts.append(name_bytes)
+            if kind == cls.FOLDER:
+                cls._encode_level(content, parts)
+            elif payload is not None:
+                parts.append(cls.LENGTH.pack(len(payload)))
+                parts.append(payload)
+
+    def _decode(self, buf, pos):
+        (count,) = self.LENGTH.unpack_from(buf, pos)
+        pos += 4
+        level = {}
+        for _ in range(count):
+            kind, size = self.NODE.unpack_from(buf, pos)
+            pos += 3
+            name = str(buf[pos:pos + size], "utf-8", "surrogateescape")
+            pos += size
+            if kind == self.FOLDER:
+                level[name], pos = self._decode(buf, pos)
+            elif kind == self.FILE:
+                level[name] = None
+            else:
+                (size,) = self.LENGTH.unpack_from(buf, pos)
+                text = str(buf[pos + 4:pos + 4 + size], "utf-8")
+                pos += 4 + size
+                level[name] = json.loads(text) if kind == self.DIRECTIVE else text
+        return level, pos
+
+
+class PresetLibrary(MutableMapping):
+    """The loaded presets, by name; entries backed by a PresetStore are decoded on first access.
+
+    Records of stores that are not ``trusted`` are checked with ``validator``
+    as they are decoded. A record that is corrupt or invalid is dropped from
+    the library, reported to ``on_invalid(name, problems)`` and raises
+    PresetValidationError.
+    """
+    _UNDECODED = object()
+
+    def __init__(self, presets=None, validator=None, on_invalid=None):
+        self._presets = dict(presets or {})
+        self._stores = {}
+        self.validator = validator
+        self.on_invalid = on_invalid
+
+    def add_stored(self, name, store):
+        """Add or override a preset with its record in store, without decoding it yet."""
+        self._presets[name] = self._UNDECODED
+        self._stores[name] = store
+
+    def __getitem__(self, name):
+        structure = self._presets[name]
+        if structure is self._UNDECODED:
+            structure = self._decode(name)
+        return structure
+
+    def _decode(self, name):
+        store = self._stores[name]
+        problems = []
+        try:
+            structure = store[name]
+            if not store.trusted and self.validator is not None:
+                structure, problems = self.validator.check(structure)
+        except ValueError as e:
+            problems = [("", str(e))]
+        if problems:
+            self._presets.pop(name, None)
+            self._stores.pop(name, None)
+            if self.on_invalid is not None:
+                self.on_invalid(name, problems)
+            raise PresetValidationError(problems)
+        self._presets[name] = structure
+        self._stores.pop(name, None)
+        return structure
+
+    def __setitem__(self, name, structure):
+        self._presets[name] = structure
+        self._stores.pop(name, None)
+
+    def __delitem__(self, name):
+        del self._presets[name]
+        self._stores.pop(name, None)
+
+    def __iter__(self):
+        return iter(list(self._presets))  # Decoding may drop an invalid entry mid-iteration
+
+    def __len__(self):
+        return len(self._presets)
+
+    def __contains__(self, name):
+        return name in self._presets
+
+    def stores(self):
+        """The stores still backing undecoded entries."""
+        return list({id(store): store for store in self._stores.values()}.values())
+
+    def rebind(self, store):
+        """Read still undecoded entries that store holds from it, after their file was rewritten.
+
+        Returns the stores no longer used by any entry, for the caller to close.
+        """
+        replaced = {}
+        for name in self._stores.keys() & store.keys():
+            replaced[id(self._stores[name])] = self._stores[name]
+            self._stores[name] = store
+        for other in self._stores.values():
+            replaced.pop(id(other), None)
+        replaced.pop(id(store), None)
+        return list(replaced.values())
+
+    def record(self, name):
+        """The encoded record of a preset, copied as stored if it was never decoded."""
+        if self._presets[name] is self._UNDECODED:
+            return self._stores[name].raw(name)
+        return PresetStore.encode(self._presets[name])
+
+    def records(self, names):
+        """(name, encoded record) pairs for PresetStore.write, copying records never decoded as stored."""
+        for name in names:
+            yield name, self.record(name)
+
+    def same_entry(self, name, other):
+        """Whether other holds the same preset under name, comparing records rather than decoding them."""
+        if self._presets[name] is not self._UNDECODED and other._presets[name] is not other._UNDECODED:
+            return self._presets[name] == other._presets[name]
+        return self.record(name) == other.record(name)
+
+    def adopt(self, name, other):
+        """Take other's entry for name as it is, without decoding it."""
+        self._presets[name] = other._presets[name]
+        if name in other._stores:
+            self._stores[name] = other._stores[name]
+        else:
+            self._stores.pop(name, None)
+
+
+class PresetSearchIndex:
+    """Search index over preset names, descriptions and the file/folder names they contain.
+
+    Every preset contributes a set of lowercase terms. Terms map to the presets
+    using them, and a trigram index over the (much smaller) term vocabulary
+    finds the terms containing a query. Queries shorter than a trigram are
+    prefix matches on preset names, answered by bisecting a sorted name list.
+    Presets are added and removed one at a time, so the index never needs a
+    full rebuild after the first one.
+    """
+
+    def __init__(self):
+        self.preset_terms = {}
+        self.term_presets = {}
+        self.trigram_terms = {}
+        self.lowered_names = {}
+        self.name_owners = {}
+        self.sorted_names = []
+
+    def add(self, preset_name, structure, description=""):
+        """Index a preset, replacing any previous entry of the same name."""
+        self.remove(preset_name)
+        lowered = self.lowered_names[preset_name] = preset_name.lower()
+        self.name_owners.setdefault(lowered, set()).add(preset_name)
+        bisect.insort(self.sorted_names, (lowered, preset_name))
+        terms = {lowered, description.lower()}
+        self._collect_names(structure, terms)
+        terms.discard("")
+        self.preset_terms[preset_name] = terms
+        for term in terms:
+            presets = self.term_presets.get(term)
+            if presets is None:
+                presets = self.term_presets[term] = set()
+                for trigram in self._trigrams(term):
+                    self.trigram_terms.setdefault(trigram, set()).add(term)
+            presets.add(preset_name)
+
+    def remove(self, preset_name):
+        lowered = self.lowered_names.pop(preset_name, None)
+        if lowered is None:
+            return
+        del self.sorted_names[bisect.bisect_left(self.sorted_names, (lowered, preset_name))]
+        owners = self.name_owners[lowered]
+        owners.discard(preset_name)
+        if not owners:
+            del self.name_owners[lowered]
+        for term in self.preset_terms.pop(preset_name):
+            presets = self.term_presets[term]
+            presets.discard(preset_name)
+            if presets:
+                continue
+            del self.term_presets[term]
+            for trigram in self._trigrams(term):
+                terms = self.trigram_terms[trigram]
+                terms.discard(term)
+                if not terms:
+                    del self.trigram_terms[trigram]
+
+    def search(self, query, limit=None):
+        """Return matching preset names: name prefix matches, other name matches, then the rest."""
+        query = query.strip().lower()
+        if not query:
+            return list(self.preset_terms)
+        if len(query) < 3:
+            return self._prefix_search(query, limit)
+        postings = sorted((self.trigram_terms.get(t, set()) for t in self._trigrams(query)), key=len)
+        terms = [term for term in set.intersection(*postings) if query in term]
+        prefixed, contained = [], []
+        for term in terms:
+            if term in self.name_owners:
+                (prefixed if term.startswith(query) else contained).append(term)
+        if limit:
+            prefixed = heapq.nsmallest(limit, prefixed)
+            contained = heapq.nsmallest(limit - len(prefixed), contained)
+        else:
+            prefixed.sort()
+            contained.sort()
+        by_name = [name for term in prefixed + contained for name in sorted(self.name_owners[term])]
+        if limit and len(by_name) >= limit:
+            return by_name[:limit]
+        others = set().union(*(self.term_presets[term] for term in terms)).difference(by_name)
+        if limit:
+            return by_name + heapq.nsmallest(limit - len(by_name), others, key=self.lowered_names.__getitem__)
+        return by_name + sorted(others, key=self.lowered_names.__getitem__)
+
+    def _prefix_search(self, prefix, limit):
+        start = bisect.bisect_left(self.sorted_names, (prefix,))
+        results = []
+        for lowered, name in itertools.islice(self.sorted_names, start, None):
+            if not lowered.startswith(prefix) or (limit and len(results) >= limit):
+                break
+            results.append(name)
+        return results
+
+    def _collect_names(self, structure, terms):
+        for name, content in node_items(structure):
+            terms.add(name.lower())
+            if is_folder(content):
+                self._collect_names(content, terms)
+
+    def _trigrams(self, text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class _BoundedPoolMixIn:
+    """Hand accepted connections to a fixed-size worker pool instead of one thread each."""
+    daemon = None
+
+    def process_request(self, request, client_address):
+        self.daemon.pool.submit(self._process_in_pool, request, client_address)
+
+    def _process_in_pool(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+class _UnixPresetServer(_BoundedPoolMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+class _HTTPPresetServer(_BoundedPoolMixIn, HTTPServer):
+    pass
+
+
+class _SocketRequestHandler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line.
+
+    A connection idle for IDLE_TIMEOUT seconds is closed, so idle clients
+    can't hold on to the daemon's workers.
+    """
+    timeout = IDLE_TIMEOUT = 10
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {"ok": False, "error": f"Invalid JSON: {str(e)}"}
+                else:
+                    response = self.server.daemon.handle(request)
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+        except (socket.timeout, OSError):  # Idle past IDLE_TIMEOUT (socket.timeout before 3.10), or the client left
+            pass
+
+
+class _HTTPRequestHandler(BaseHTTPRequestHandler):
+    """Map GET/POST routes onto daemon operations.
+
+    Every request needs the daemon's session token as ``Authorization: Bearer
+    <token>`` and a localhost Host header, and may not come from another
+    Origin, so web pages (including DNS-rebound ones) can't drive it. POST
+    bodies must be JSON objects sent as ``application/json``.
+    """
+    timeout = _SocketRequestHandler.IDLE_TIMEOUT
+    LOCAL_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+
+    def _allowed(self):
+        port = self.server.server_address[1]
+        hosts = {f"{host}:{port}" for host in self.LOCAL_HOSTS}
+        if self.headers.get("Host") not in hosts:
+            self._send(403, {"ok": False, "error": "Requests must be addressed to localhost"})
+            return False
+        origin = self.headers.get("Origin")
+        if origin is not None and origin not in {f"http://{host}" for host in hosts}:
+            self._send(403, {"ok": False, "error": f"Requests from {origin} are not allowed"})
+            return False
+        scheme, _, token = (self.headers.get("Authorization") or "").partition(" ")
+        if scheme != "Bearer" or not hmac.compare_digest(token.strip().encode(), self.server.daemon.token.encode()):
+            self._send(401, {"ok": False, "error": "Missing or wrong daemon token"})
+            return False
+        return True
+
+    def do_GET(self):
+        if not self._allowed():
+            return
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if parts == ["presets"]:
+            self._respond({"op": "list"})
+        elif len(parts) == 2 and parts[0] == "presets":
+            self._respond({"op": "show", "preset": parts[1]})
+        elif parts == ["stats"]:
+            self._respond({"op": "stats"})
+        else:
+            self._send(404, {"ok": False, "error": f"Unknown route: {self.path}"})
+
+    def do_POST(self):
+        if not self._allowed():
+            return
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if self.headers.get_content_type() != "application/json":
+            self._send(415, {"ok": False, "error": "POST bodies must be sent as application/json"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, UnicodeDecodeError) as e:
+            self._send(400, {"ok": False, "error": f"Invalid JSON: {str(e)}"})
+            return
+        if not isinstance(request, dict):
+            self._send(400, {"ok": False, "error": "The request must be a JSON object"})
+            return
+        if len(parts) != 1 or parts[0] not in ("create", "apply"):
+            self._send(404, {"ok": False, "error": f"Unknown route: {self.path}"})
+            return
+        request["op"] = parts[0]
+        self._respond(request)
+
+    def _respond(self, request):
+        response = self.server.daemon.handle(request)
+        self._send(200 if response.get("ok") else 400, response)
+
+    def _send(self, status, response):
+        body = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Request stats are kept by the daemon instead
+
+
+def mount_point(path):
+    """The mount point holding path, or the nearest existing folder above it."""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            return path
+        path = parent
+    while not os.path.ismount(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+class IOGovernor:
+    """I/O limits for project creation on one mount, shared by every creation writing to it.
+
+    BLUEPRINT_IO_LIMITS holds JSON, or the path of a JSON file, mapping a
+    path to its limits; they apply to the whole mount holding that path, and
+    ``"*"`` gives defaults for every other mount::
+
+        {"/home": {"ops": 300, "inflight": 4, "bytes": "20M"}, "*": {"inflight": 16}}
+
+    ``ops`` caps metadata operations (creating a folder or file, opening a
+    folder) per second and ``bytes`` the bytes written per second; both are
+    token buckets holding BURST_SECONDS of their rate. ``inflight`` caps
+    operations and copy chunks under way at once across all threads: the
+    job queue's workers, parallel subtrees, asset copies and daemon requests.
+    Each creation waits through an IOThrottle, which adds up the time it
+    spent held back.
+    """
+    BURST_SECONDS = 0.1
+    _governors = {}
+    _config = None
+    _lock = threading.Lock()
+
+    def __init__(self, mount, ops=None, inflight=None, bytes=None):
+        self.mount = mount
+        self.ops = ops
+        self.inflight = inflight
+        self.bytes = bytes
+        self.slots = threading.BoundedSemaphore(inflight) if inflight else None
+        self._buckets = {}  # "ops"/"bytes" -> [tokens, last refill]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_size(value):
+        """Bytes from a number or a string such as "512K", "20M" or "1.5G"."""
+        if isinstance(value, (int, float)):
+            return value
+        text = str(value).strip().upper().rstrip("B")
+        scale = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}.get(text[-1:], 1)
+        return float(text.rstrip("KMG")) * scale
+
+    @classmethod
+    def load_config(cls):
+        """Limits per mount (``"*"`` for the default) from BLUEPRINT_IO_LIMITS, parsed once."""
+        if cls._config is None:
+            config = {}
+            setting = os.environ.get("BLUEPRINT_IO_LIMITS", "").strip()
+            try:
+                if setting and not setting.startswith("{"):
+                    with open(os.path.expanduser(setting), 'r') as f:
+                        setting = f.read()
+                for path, limits in (json.loads(setting) if setting else {}).items():
+                    key = path if path == "*" else mount_point(os.path.expanduser(path))
+                    config[key] = {
+                        "ops": float(limits["ops"]) if limits.get("ops") else None,
+                        "inflight": int(limits["inflight"]) if limits.get("inflight") else None,
+                        "bytes": cls.parse_size(limits["bytes"]) if limits.get("bytes") else None,
+                    }
+            except (OSError, ValueError, TypeError, AttributeError, KeyError) as e:
+                print(f"Ignoring BLUEPRINT_IO_LIMITS: {e}", file=sys.stderr)
+                config = {}
+            cls._config = config
+        return cls._config
+
+    @classmethod
+    def for_path(cls, path):
+        """The governor of the mount holding path, or None when it has no limits."""
+        config = cls.load_config()
+        if not config:
+            return None
+        mount = mount_point(path)
+        limits = config.get(mount) or config.get("*")
+        if not limits or not any(limits.values()):
+            return None
+        with cls._lock:
+            if mount not in cls._governors:
+                cls._governors[mount] = cls(mount, **limits)
+            return cls._governors[mount]
+
+    @classmethod
+    def throttle_for(cls, path):
+        """A new IOThrottle for one creation below path, or None when its mount has no limits."""
+        governor = cls.for_path(path)
+        return IOThrottle(governor) if governor is not None else None
+
+    def reserve(self, kind, amount):
+        """Take amount from a bucket, going into debt if needed; returns how long to wait first."""
+        rate = self.ops if kind == "ops" else self.bytes
+        if not rate:
+            return 0.0
+        capacity = max(rate * self.BURST_SECONDS, 1.0)
+        with self._lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(kind, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate) - amount
+            self._buckets[kind] = (tokens, now)
+        return -tokens / rate if tokens < 0 else 0.0
+
+
+class IOThrottle:
+    """One creation's view of an IOGovernor; ``throttled`` is the seconds it spent held back."""
+
+    def __init__(self, governor):
+        self.governor = governor
+        self.throttled = 0.0
+        self._lock = threading.Lock()  # Asset copies report from their own threads
+
+    def _waited(self, seconds):
+        with self._lock:
+            self.throttled += seconds
+
+    @contextlib.contextmanager
+    def op(self):
+        """Hold one metadata operation to the ops and inflight limits."""
+        delay = self.governor.reserve("ops", 1)
+        if delay:
+            time.sleep(delay)
+            self._waited(delay)
+        with self.slot():
+            yield
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Hold an inflight slot, e.g. for one chunk of a copy."""
+        slots = self.governor.slots
+        if slots is None:
+            yield
+            return
+        if not slots.acquire(blocking=False):
+            started = time.monotonic()
+            slots.acquire()
+            self._waited(time.monotonic() - started)
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def chunk(self, largest):
+        """The size to copy in at a time: small enough to pace smoothly under the bytes limit."""
+        rate = self.governor.bytes
+        return min(largest, max(int(rate * self.governor.BURST_SECONDS), 64 << 10)) if rate else largest
+
+    def transfer(self, count):
+        """Account for count bytes written, waiting if they exceed the bytes limit."""
+        delay = self.governor.reserve("bytes", count)
+        if delay:
+            time.sleep(delay)
+            self._waited(delay)
+
+class HistoryRun(namedtuple("HistoryRun", "started preset preset_hash destination mount nodes bytes duration outcome error "
+                                         "throttled")):
+    """One project creation recorded by RunHistory; ``started`` is a Unix timestamp.
+
+    ``throttled`` is the part of ``duration`` spent waiting on BLUEPRINT_IO_LIMITS (see IOGovernor).
+    """
+    __slots__ = ()
+
+    @property
+    def throughput(self):
+        """Nodes created per second, or None when unknown."""
+        if self.nodes and self.duration:
+            return self.nodes / self.duration
+        return None
+
+class RunHistory:
+    """SQLite log of every project creation, with the preset, destination, size, timing and outcome.
+
+    Indexed on time, preset, destination and mount so that the recent list,
+    filtered searches and throughput trends stay fast over tens of thousands
+    of runs. The database is in WAL mode, so the app, the CLI and the daemon
+    can write to it at the same time.
+    """
+    FILENAME = "history.sqlite3"
+    SCHEMA_VERSION = 2
+    COLUMNS = ", ".join(HistoryRun._fields)
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            started REAL NOT NULL,
+            preset TEXT NOT NULL,
+            preset_hash TEXT,
+            destination TEXT NOT NULL,
+            mount TEXT,
+            nodes INTEGER,
+            bytes INTEGER,
+            duration REAL,
+            outcome TEXT NOT NULL,
+            error TEXT,
+            throttled REAL
+        );
+        CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+        CREATE INDEX IF NOT EXISTS runs_preset ON runs (preset, started);
+        CREATE INDEX IF NOT EXISTS runs_destination ON runs (destination, started);
+        CREATE INDEX IF NOT EXISTS runs_mount ON runs (mount, preset, started);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = self._connect(path)
+        except (OSError, sqlite3.Error) as e:
+            # History is a convenience; never let it stop a project from being created
+            print(f"Run history unavailable ({e}); keeping it in memory for this session", file=sys.stderr)
+            self._db = self._connect(":memory:")
+
+    def _connect(self, path):
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        if version < self.SCHEMA_VERSION:
+            if version == 1:
+                try:
+                    db.execute("ALTER TABLE runs ADD COLUMN throttled REAL")
+                except sqlite3.OperationalError:
+                    pass  # Another process upgraded it first
+            db.executescript(self.SCHEMA)
+            db.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        return db
+
+    def record(self, preset, destination, nodes=None, written=None, duration=None, outcome="ok",
+               error="", preset_hash=None, started=None, throttled=None):
+        destination = os.path.abspath(destination)
+        row = (started or time.time(), preset, preset_hash, destination, mount_point(destination),
+               nodes, written, duration, outcome, error, throttled)
+        try:
+            with self._lock:
+                self._db.execute(f"INSERT INTO runs ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+        except sqlite3.Error as e:
+            print(f"Could not record run in {self.path}: {e}", file=sys.stderr)
+
+    def recent_destinations(self, limit=10):
+        """The latest successful (destination, preset) pairs, newest first, one per destination.
+
+        Walks the time index backwards and stops as soon as ``limit`` distinct
+        destinations are found, so the cost does not grow with the history.
+        """
+        recent = {}
+        with self._lock:
+            cursor = self._db.execute(
+                "SELECT destination, preset FROM runs WHERE outcome = 'ok' ORDER BY started DESC"
+            )
+            for destination, preset in cursor:
+                recent.setdefault(destination, preset)
+                if len(recent) >= limit:
+                    break
+            cursor.close()
+        return list(recent.items())
+
+    def search(self, text="", preset=None, outcome=None, mount=None, since=None, limit=200):
+        """Runs matching all given filters, newest first; ``text`` matches the destination or preset."""
+        clauses, params = [], []
+        if text:
+            pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(destination LIKE ? ESCAPE '\\' OR preset LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        for column, value in (("preset", preset), ("outcome", outcome), ("mount", mount)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since:
+            clauses.append("started >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {self.COLUMNS} FROM runs {where} ORDER BY started DESC LIMIT ?", params + [limit]
+            ).fetchall()
+        return [HistoryRun(*row) for row in rows]
+
+    def presets(self):
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT DISTINCT preset FROM runs ORDER BY preset")]
+
+    def throughput(self, preset, days=30):
+        """Daily (day, mount, runs, nodes per second) figures for a preset's successful runs.
+
+        Nodes per second is total nodes over total time for the day, per mount,
+        so a slow network share shows up apart from local disks.
+        """
+        with self._lock:
+            return self._db.execute(
+                "SELECT date(started, 'unixepoch', 'localtime') AS day, mount, COUNT(*), "
+                "SUM(nodes) / SUM(duration) FROM runs "
+                "WHERE preset = ? AND outcome = 'ok' AND started >= ? AND duration > 0 "
+                "GROUP BY day, mount ORDER BY day, mount",
+                (preset, time.time() - days * 86400),
+            ).fetchall()
+
+    def format_trend(self, preset, days=30, width=30):
+        """Text chart of throughput(), one bar per day and mount."""
+        rows = self.throughput(preset, days)
+        if not rows:
+            return f"No successful runs of '{preset}' in the last {days} days."
+        best = max(rate for _, _, _, rate in rows)
+        lines = [f"Throughput of '{preset}' (nodes/s), last {days} days:"]
+        for day, mount, runs, rate in rows:
+            bar = "█" * max(1, round(rate / best * width))
+            lines.append(f"{day}  {mount:<20} {bar} {rate:,.0f}  ({runs} run{'s' if runs != 1 else ''})")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class PresetVersion(namedtuple("PresetVersion", "version saved kind digest nodes size")):
+    """One saved version of a preset in PresetHistory; ``kind`` is snapshot, delta or deleted and ``size`` the stored bytes."""
+    __slots__ = ()
+
+class PresetHistory:
+    """Every saved version of every preset, in SQLite, stored as structural deltas with periodic snapshots.
+
+    A version is usually stored as a compressed delta against the one
+    before it: names removed (``-``), nodes added or replaced (``+``),
+    folders changed (``~``, recursively) and the key order (``=``) when that
+    changed. A full snapshot is stored instead for the first version, after
+    a deletion, every SNAPSHOT_EVERY versions, or when the delta would be
+    more than SNAPSHOT_RATIO of the last snapshot's size, so reconstructing
+    any version reads one snapshot and fewer than SNAPSHOT_EVERY deltas with
+    a single indexed query. Listing reads only the small columns before the
+    stored data. History is append-only: restoring a version saves it again
+    as the newest one.
+    """
+    FILENAME = "preset_versions.sqlite3"
+    SCHEMA_VERSION = 1
+    SNAPSHOT_EVERY = 16
+    SNAPSHOT_RATIO = 0.5
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS versions (
+            preset TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            saved REAL NOT NULL,
+            kind TEXT NOT NULL,
+            digest TEXT,
+            nodes INTEGER,
+            size INTEGER NOT NULL,
+            data BLOB,
+            PRIMARY KEY (preset, version)
+        );
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._latest = {}  # Preset -> (version, structure) of its newest version, to diff the next save against
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = self._connect(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Preset history unavailable ({e}); keeping it in memory for this session", file=sys.stderr)
+            self._db = self._connect(":memory:")
+
+    def _connect(self, path):
+        db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        if db.execute("PRAGMA user_version").fetchone()[0] < self.SCHEMA_VERSION:
+            db.executescript(self.SCHEMA)
+            db.execute(f"PRAGMA user_version={self.SCHEMA_VERSION}")
+        return db
+
+    @staticmethod
+    def digest(structure):
+        """Digest of a preset's content and key order."""
+        return hashlib.sha1(json.dumps(structure, separators=(",", ":"), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    @classmethod
+    def delta(cls, old, new):
+        """The structural delta that turns the dict old into new."""
+        delta = {}
+        removed = [name for name in old if name not in new]
+        replaced, changed = {}, {}
+        for name, content in new.items():
+            if name not in old:
+                replaced[name] = content
+            elif not cls._same(old[name], content):
+                if isinstance(content, dict) and isinstance(old[name], dict):
+                    changed[name] = cls.delta(old[name], content)
+                else:
+                    replaced[name] = content
+        if removed:
+            delta["-"] = removed
+        if replaced:
+            delta["+"] = replaced
+        if changed:
+            delta["~"] = changed
+        gone = set(removed)
+        order = [name for name in old if name not in gone] + [name for name in new if name not in old]
+        if order != list(new):
+            delta["="] = list(new)
+        return delta
+
+    @classmethod
+    def _same(cls, old, new):
+        """Equality that also compares key order, which dict equality ignores."""
+        return old == new and cls._same_order(old, new)
+
+    @classmethod
+    def _same_order(cls, old, new):
+        if not isinstance(old, dict):
+            return True
+        return list(old) == list(new) and all(
+            cls._same_order(content, new[name]) for name, content in old.items() if isinstance(content, dict)
+        )
+
+    @classmethod
+    def apply(cls, old, delta):
+        """The dict delta() was computed for; old is not modified and unchanged folders are shared."""
+        gone = set(delta.get("-", ()))
+        result = {name: content for name, content in old.items() if name not in gone}
+        for name, change in delta.get("~", {}).items():
+            result[name] = cls.apply(result[name], change)
+        result.update(delta.get("+", {}))
+        if "=" in delta:
+            result = {name: result[name] for name in delta["="]}
+        return result
+
+    @staticmethod
+    def _encode(value):
+        return zlib.compress(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"), 6)
+
+    @staticmethod
+    def _decode(data):
+        return json.loads(zlib.decompress(data))
+
+    def record(self, preset, structure, nodes=None, saved=None):
+        """Save a new version of a preset unless it equals the newest one; returns its number or None."""
+        structure = {key: content for key, content in structure.items() if key != "$stats"}
+        digest = self.digest(structure)
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")  # Other processes may save versions too
+                try:
+                    version = self._record(preset, structure, digest, nodes, saved)
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        except sqlite3.Error as e:
+            print(f"Could not record a version of '{preset}' in {self.path}: {e}", file=sys.stderr)
+            return None
+        if version is not None:
+            self._latest[preset] = (version, structure)
+        return version
+
+    def _record(self, preset, structure, digest, nodes, saved):
+        latest = self._db.execute(
+            "SELECT version, kind, digest FROM versions WHERE preset = ? ORDER BY version DESC LIMIT 1", (preset,)
+        ).fetchone()
+        if latest is not None and latest[1] != "deleted" and latest[2] == digest:
+            return None
+        kind, data = "snapshot", self._encode(structure)
+        if latest is not None and latest[1] != "deleted":
+            snapshot_version, snapshot_size = self._db.execute(
+                "SELECT version, size FROM versions WHERE preset = ? AND kind = 'snapshot' "
+                "ORDER BY version DESC LIMIT 1", (preset,)
+            ).fetchone()
+            if latest[0] - snapshot_version < self.SNAPSHOT_EVERY - 1:
+                cached = self._latest.get(preset)
+                previous = cached[1] if cached and cached[0] == latest[0] else self._reconstruct(preset, latest[0])
+                delta = self._encode(self.delta(previous, structure))
+                if len(delta) <= snapshot_size * self.SNAPSHOT_RATIO:
+                    kind, data = "delta", delta
+        version = latest[0] + 1 if latest else 1
+        self._db.execute(
+            "INSERT INTO versions (preset, version, saved, kind, digest, nodes, size, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (preset, version, saved or time.time(), kind, digest, nodes, len(data), data)
+        )
+        return version
+
+    def record_deletion(self, preset):
+        """Note that a preset was deleted; its earlier versions stay available."""
+        try:
+            with self._lock:
+                latest = self._db.execute(
+                    "SELECT version, kind FROM versions WHERE preset = ? ORDER BY version DESC LIMIT 1", (preset,)
+                ).fetchone()
+                if latest is None or latest[1] == "deleted":
+                    return None
+                self._db.execute(
+                    "INSERT INTO versions (preset, version, saved, kind, size) VALUES (?, ?, ?, 'deleted', 0)",
+                    (preset, latest[0] + 1, time.time())
+                )
+        except sqlite3.Error as e:
+            print(f"Could not record the deletion of '{preset}' in {self.path}: {e}", file=sys.stderr)
+            return None
+        self._latest.pop(preset, None)
+        return latest[0] + 1
+
+    def latest_version(self, preset):
+        """Number of the newest version of a preset, or None if it has no history."""
+        with self._lock:
+            return self._db.execute("SELECT MAX(version) FROM versions WHERE preset = ?", (preset,)).fetchone()[0]
+
+    def versions(self, preset):
+        """PresetVersions of a preset, newest first, without reading any stored structure."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT version, saved, kind, digest, nodes, size FROM versions WHERE preset = ? "
+                "ORDER BY version DESC", (preset,)
+            ).fetchall()
+        return [PresetVersion(*row) for row in rows]
+
+    def presets(self):
+        """(preset, number of versions, newest kind) for every preset with a history."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT preset, COUNT(*), (SELECT kind FROM versions AS newest WHERE newest.preset = versions.preset "
+                "ORDER BY version DESC LIMIT 1) FROM versions GROUP BY preset ORDER BY preset"
+            ).fetchall()
+
+    def version(self, preset, version):
+        """The structure of one version of a preset; raises KeyError if there is no such version."""
+        cached = self._latest.get(preset)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            return self._reconstruct(preset, version)
+
+    def _reconstruct(self, preset, version):
+        rows = self._db.execute(
+            "SELECT version, kind, digest, data FROM versions WHERE preset = ? AND version <= ? AND version >= "
+            "(SELECT MAX(version) FROM versions WHERE preset = ? AND kind = 'snapshot' AND version <= ?) "
+            "ORDER BY version", (preset, version, preset, version)
+        ).fetchall()
+        if not rows or rows[-1][0] != version or rows[-1][1] == "deleted":
+            raise KeyError(f"No version {version} of '{preset}'")
+        structure = None
+        for _, kind, _, data in rows:
+            change = self._decode(data)
+            structure = change if kind == "snapshot" else self.apply(structure, change)
+        if self.digest(structure) != rows[-1][2]:
+            raise ValueError(f"Version {version} of '{preset}' is damaged in {self.path}")
+        return structure
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+class PresetDaemon:
+    """Long-running server that keeps a ProjectStructureCreator and its compiled presets warm.
+
+    Requests are JSON objects with an ``op`` of ``create``, ``apply``, ``list``,
+    ``show`` or ``stats``. They are served over a Unix domain socket (one JSON
+    document per line) or a localhost HTTP endpoint, and run on a bounded
+    worker pool.
+    """
+
+    LATENCY_WINDOW = 1000
+    TOKEN_NAME = "daemon-token"
+
+    def __init__(self, creator=None, workers=4):
+        self.creator = creator or ProjectStructureCreator()
+        self.token = secrets.token_urlsafe(32)
+        self.token_path = os.path.join(ProjectStructureCreator.user_dir(), self.TOKEN_NAME)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="preset-daemon")
+        self.started_at = time.time()
+        self.servers = []
+        self._stats_lock = threading.Lock()
+        self._counts = {}
+        self._errors = 0
+        self._latencies = deque(maxlen=self.LATENCY_WINDOW)
+        self._ops = {
+            "create": self.op_create,
+            "apply": self.op_apply,
+            "list": self.op_list,
+            "show": self.op_show,
+            "stats": self.op_stats,
+        }
+        # Compile every preset up front so the first request is as fast as the rest
+        for preset_name in list(self.creator.presets):
+            self.creator.compile_preset(preset_name)
+
+    def handle(self, request):
+        """Dispatch one request and record its latency."""
+        started = time.perf_counter()
+        op = request.get("op") if isinstance(request, dict) else None
+        handler = self._ops.get(op)
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("The request must be a JSON object")
+            if handler is None:
+                raise ValueError(f"Unknown operation: {op!r}")
+            response = {"ok": True}
+            response.update(handler(request))
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            self._counts[op] = self._counts.get(op, 0) + 1
+            if not response["ok"]:
+                self._errors += 1
+            self._latencies.append(elapsed)
+        return response
+
+    def _project_path(self, request):
+        project_path = request.get("path")
+        if not project_path or not os.path.isabs(project_path):
+            raise ValueError("'path' must be an absolute path")
+        return project_path
+
+    def op_create(self, request):
+        preset_name = request.get("preset")
+        if preset_name not in self.creator.presets:
+            raise KeyError(f"Template not found: {preset_name!r}")
+        project_path = self._project_path(request)
+        options = request.get("options")
+        if options is not None and not isinstance(options, dict):
+            raise ValueError("'options' must be an object of option values")
+        plan = self.creator.compile_preset(preset_name, options)
+        started = time.perf_counter()
+        try:
+            throttled = self.creator.create_from_plan(plan, project_path, self.creator.plan_workers(preset_name))
+        except Exception as e:
+            self.creator.log_run(preset_name, project_path, duration=time.perf_counter() - started,
+                                 outcome="failed", error=str(e))
+            raise
+        self.creator.log_run(preset_name, project_path, len(plan), duration=time.perf_counter() - started,
+                             throttled=throttled)
+        return {"path": project_path, "created": len(plan), "throttled": round(throttled, 3)}
+
+    def op_apply(self, request):
+        structure = request.get("structure")
+        if not isinstance(structure, dict):
+            raise ValueError("'structure' must be a preset structure object")
+        structure = self.creator.validator.validate(structure)
+        if "$if" in structure:
+            defaults = {name: option["default"] for name, option in structure.get("$options", {}).items()}
+            structure = PresetVariant.resolve(structure, defaults)
+        project_path = self._project_path(request)
+        plan = PresetPlan(structure)
+        throttled = self.creator.create_from_plan(plan, project_path)
+        return {"path": project_path, "created": len(plan), "throttled": round(throttled, 3)}
+
+    def op_list(self, request):
+        return {"presets": list(self.creator.presets.keys())}
+
+    def op_show(self, request):
+        preset_name = request.get("preset")
+        if preset_name not in self.creator.presets:
+            raise KeyError(f"Template not found: {preset_name!r}")
+        return {
+            "preset": preset_name,
+            "structure": self.creator.presets[preset_name],
+            "stats": self.creator.preset_stats(preset_name),
+        }
+
+    def op_stats(self, request):
+        return {"stats": self.stats()}
+
+    def stats(self):
+        """Request counts and latency figures (in milliseconds) over the recent window."""
+        with self._stats_lock:
+            counts = dict(self._counts)
+            errors = self._errors
+            latencies = sorted(self._latencies)
+        stats = {
+            "uptime": round(time.time() - self.started_at, 3),
+            "requests": sum(counts.values()),
+            "errors": errors,
+            "by_op": counts,
+        }
+        if latencies:
+            def percentile(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+            stats["latency_ms"] = {
+                "min": round(latencies[0] * 1000, 3),
+                "mean": round(sum(latencies) / len(latencies) * 1000, 3),
+                "p50": percentile(0.50),
+                "p95": percentile(0.95),
+                "max": round(latencies[-1] * 1000, 3),
+            }
+        return stats
+
+    def listen_unix(self, socket_path):
+        """Start accepting requests on a Unix domain socket only the current user can use.
+
+        A stale socket left at socket_path is replaced, but any other file is left alone.
+        """
+        try:
+            if stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+        umask = os.umask(0o177)
+        try:
+            server = _UnixPresetServer(socket_path, _SocketRequestHandler)
+        finally:
+            os.umask(umask)
+        os.chmod(socket_path, 0o600)
+        return self._start(server)
+
+    def listen_http(self, port, host="127.0.0.1"):
+        """Start accepting requests on a localhost HTTP endpoint.
+
+        Clients authenticate with this session's token, which is written to
+        TOKEN_NAME in the user folder, readable only by the current user.
+        """
+        server = _HTTPPresetServer((host, port), _HTTPRequestHandler)
+        os.makedirs(os.path.dirname(self.token_path), exist_ok=True)
+        fd = os.open(self.token_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            if hasattr(os, "fchmod"):  # The file may have existed with looser permissions
+                os.fchmod(fd, 0o600)
+            f.write(self.token + "\n")
+        return self._start(server)
+
+    def _start(self, server):
+        server.daemon = self
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.servers.append(server)
+        return server
+
+    def shutdown(self):
+        for server in self.servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server, _UnixPresetServer) and os.path.exists(server.server_address):
+                os.unlink(server.server_address)
+            if isinstance(server, _HTTPPresetServer):
+                with contextlib.suppress(OSError):
+                    os.unlink(self.token_path)
+        self.servers = []
+        self.pool.shutdown(wait=True)
+
+
+def daemon_request(socket_path, request):
+    """Send one request to a daemon listening on a Unix socket and return its response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as reader:
+            return json.loads(reader.readline())
+
+
+class StallWatchdog(QObject):
+    """Opt-in monitor of GUI event-loop stalls, enabled with BLUEPRINT_STALL_MS=<threshold in ms>.
+
+    A timer on the GUI thread stamps a heartbeat every HEARTBEAT_MS and a
+    watcher thread checks its age. While the heartbeat is older than the
+    threshold, the watcher samples the main thread's Python stack with
+    ``sys._current_frames()``. When the loop runs again, the stall is logged
+    with its duration, the most frequently sampled stack and the triggering
+    action: the outermost application frame on that stack, which is the slot
+    or event handler Qt called (e.g. ``MainWindow.on_preset_changed``).
+    Stalls are appended to LOG_NAME in the user folder from the watcher
+    thread, and summarized by format_report.
+    """
+    HEARTBEAT_MS = 20
+    LOG_NAME = "stalls.jsonl"
+    MAX_LOG_BYTES = 4 << 20  # Then the log starts over, keeping the previous one as .1
+    STACK_DEPTH = 40
+
+    def __init__(self, threshold_ms, log_path=None, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.log_path = log_path
+        self.stalls = []
+        self._main_thread = threading.main_thread().ident
+        self._beat = time.monotonic()
+        self._looping = False  # Set by the first heartbeat, once the event loop runs
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.HEARTBEAT_MS)
+        self.timer.timeout.connect(self._heartbeat)
+        self._thread = threading.Thread(target=self._watch, name="stall-watchdog", daemon=True)
+
+    @classmethod
+    def from_environment(cls, parent=None):
+        """A watchdog configured by BLUEPRINT_STALL_MS, or None when it is not set."""
+        threshold = os.environ.get("BLUEPRINT_STALL_MS")
+        if not threshold:
+            return None
+        try:
+            threshold = float(threshold)
+        except ValueError:
+            print(f"Ignoring BLUEPRINT_STALL_MS={threshold!r}: not a number of milliseconds")
+            return None
+        return cls(threshold, os.path.join(ProjectStructureCreator.user_dir(), cls.LOG_NAME), parent)
+
+    def start(self):
+        self._beat = time.monotonic()
+        self.timer.start()
+        self._thread.start()
+
+    def stop(self):
+        self.timer.stop()
+        self._stop.set()
+        self._thread.join(1)
+
+    def _heartbeat(self):
+        self._beat = time.monotonic()
+        self._looping = True
+
+    def _watch(self):
+        slack = self.threshold + self.HEARTBEAT_MS / 1000
+        poll = max(self.threshold / 4, 0.005)
+        stalled_since = None
+        samples = Counter()
+        looping = False
+        while not self._stop.wait(poll):
+            beat = self._beat
+            if time.monotonic() - beat > slack:
+                if stalled_since != beat:
+                    stalled_since, samples, looping = beat, Counter(), self._looping
+                sample = self._sample()
+                if sample:
+                    samples[sample] += 1
+            elif stalled_since is not None:
+                # Blocked from about one interval after the last beat before the stall until the first after it
+                duration = self._beat - stalled_since - self.HEARTBEAT_MS / 1000
+                if samples and duration > self.threshold:
+                    self._record(duration, samples.most_common(1)[0][0], looping)
+                stalled_since = None
+
+    def _sample(self):
+        """The main thread's stack, outermost frame first, as (file, line, qualified name) tuples."""
+        frame = sys._current_frames().get(self._main_thread)
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, frame.f_lineno, getattr(code, "co_qualname", code.co_name)))
+            frame = frame.f_back
+        stack.reverse()
+        keep = self._action_index(stack) + 1  # Deep stacks keep their action and innermost frames
+        return tuple(stack[:keep] + stack[keep:][-self.STACK_DEPTH:])
+
+    @staticmethod
+    def _action_index(stack):
+        modules = [index for index, (_, _, name) in enumerate(stack) if name == "<module>"]
+        return modules[-1] + 1 if modules and modules[-1] + 1 < len(stack) else len(stack) - 1
+
+    @classmethod
+    def action(cls, stack, looping=True):
+        """The frame below the module level: the handler the event loop was running.
+
+        Without one, the time went to startup or, once the loop runs, to Qt itself (e.g. layout or painting).
+        """
+        name = stack[cls._action_index(stack)][2]
+        if name == "<module>":
+            return "<Qt event loop>" if looping else "<startup>"
+        return name
+
+    def _record(self, duration, stack, looping):
+        stall = {
+            "at": time.time(),
+            "action": self.action(stack, looping),
+            "ms": round(duration * 1000, 1),
+            "stack": [f"{os.path.basename(path)}:{line} {name}" for path, line, name in stack],
+        }
+        with self._lock:
+            self.stalls.append(stall)
+        if self.log_path:
+            try:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.MAX_LOG_BYTES:
+                    os.replace(self.log_path, self.log_path + ".1")
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(stall) + "\n")
+            except OSError as e:
+                print(f"Could not log a GUI stall: {e}")
+
+    @classmethod
+    def read_log(cls, path):
+        """The stalls recorded in a log file, skipping damaged lines."""
+        stalls = []
+        for log in (path + ".1", path):
+            try:
+                with open(log, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            stalls.append(json.loads(line))
+                        except ValueError:
+                            pass
+            except FileNotFoundError:
+                pass
+        return stalls
+
+    @classmethod
+    def format_report(cls, stalls, limit=10):
+        """The actions that blocked the GUI longest in total, with the stack of each one's worst stall."""
+        if not stalls:
+            return "No GUI stalls recorded"
+        by_action = {}
+        for stall in stalls:
+            by_action.setdefault(stall["action"], []).append(stall)
+        ranked = sorted(by_action.items(), key=lambda item: -sum(stall["ms"] for stall in item[1]))
+        lines = [f"{len(stalls)} GUI stall(s), {sum(stall['ms'] for stall in stalls) / 1000:.1f}s blocked in total",
+                 f"{'Action':<40} {'Stalls':>6} {'Total ms':>10} {'Worst ms':>9} {'Mean ms':>8}"]
+        for action, action_stalls in ranked[:limit]:
+            total = sum(stall["ms"] for stall in action_stalls)
+            worst = max(action_stalls, key=lambda stall: stall["ms"])
+            lines.append(f"{action:<40} {len(action_stalls):>6} {total:>10,.0f} {worst['ms']:>9,.0f} "
+                         f"{total / len(action_stalls):>8,.0f}")
+            lines.extend(f"    {frame}" for frame in worst["stack"][-4:])
+        return "\n".join(lines)
+
+
+class PresetLoader(QObject):
+    """Read the preset layers on a background thread, so the main window shows before they are loaded.
+
+    The thread only reads and validates each layer (see
+    ProjectStructureCreator.read_layer). A timer on the GUI thread merges
+    the layers read so far into the creator's presets, in order, and
+    reports what each added, changed or removed with layer_loaded;
+    ``finished`` follows the last layer.
+    """
+    layer_loaded = pyqtSignal(list, list, list)
+    finished = pyqtSignal()
+
+    UPDATE_MS = 50
+
+    def __init__(self, creator, parent=None):
+        super().__init__(parent)
+        self.creator = creator
+        self.loading = True  # Until the last layer is merged
+        self._read = deque()  # (layer, path, read, invalid), then None once every layer is read
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.UPDATE_MS)
+        self.timer.timeout.connect(self.flush)
+        self._thread = threading.Thread(target=self._read_layers, name="preset-loader", daemon=True)
+
+    def start(self):
+        self.timer.start()
+        self._thread.start()
+
+    def _read_layers(self):
+        try:
+            for layer, path in self.creator.preset_layers():
+                invalid = {}
+                try:
+                    read = self.creator.read_layer(layer, path, invalid)
+                except Exception as e:
+                    print(f"Error loading presets from {path}: {str(e)}")
+                    read = None
+                self._read.append((layer, path, read, invalid))
+        finally:
+            self._read.append(None)
+
+    def flush(self):
+        """Merge the layers read since the last tick; runs on the GUI thread."""
+        while self._read:
+            entry = self._read.popleft()
+            if entry is None:
+                self.timer.stop()
+                self.loading = False
+                self.finished.emit()
+                return
+            added, changed, removed = self.creator.apply_layer(*entry)
+            if added or changed or removed:
+                self.layer_loaded.emit(added, changed, removed)
+
+
+class PresetWatcher(QObject):
+    """Watch the preset sources and report which presets changed after an edit.
+
+    Uses QFileSystemWatcher, which is inotify-backed on Linux. Paths that cannot
+    be watched natively, or every path when BLUEPRINT_POLL_PRESETS=1 is set (for
+    network filesystems where inotify sees no remote writes), are polled by
+    mtime and size instead.
+    """
+    presets_changed = pyqtSignal(list, list, list)
+
+    DEBOUNCE_MS = 250
+    POLL_MS = 2000
+
+    def __init__(self, creator, parent=None):
+        super().__init__(parent)
+        self.creator = creator
+        self.force_polling = os.environ.get("BLUEPRINT_POLL_PRESETS") == "1"
+        self._signatures = {}
+        self._polled = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._schedule_reload)
+        self.watcher.directoryChanged.connect(self._schedule_reload)
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.setInterval(self.DEBOUNCE_MS)
+        self.debounce_timer.timeout.connect(self._reload_if_changed)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setInterval(self.POLL_MS)
+        self.poll_timer.timeout.connect(self._reload_if_changed)
+        shared = self.creator.shared_source_paths()
+        for path in self.creator.preset_source_paths():
+            self.watch(path, poll=path in shared)
+
+    def watch(self, path, poll=False):
+        """Start watching a preset file (or directory of preset files); ``poll`` skips native watching."""
+        path = os.path.abspath(path)
+        self._signatures[path] = self._signature(path)
+        if not (self.force_polling or poll) and self._add_native(path):
+            return
+        self._polled.add(path)
+        if not self.poll_timer.isActive():
+            self.poll_timer.start()
+
+    def _add_native(self, path):
+        # Watch the parent directory as well so atomic replaces (write + rename) are seen
+        parent_dir = os.path.dirname(path)
+        if not os.path.isdir(parent_dir):
+            return False
+        if parent_dir not in self.watcher.directories() and not self.watcher.addPath(parent_dir):
+            return False
+        if os.path.exists(path) and path not in self.watcher.files() + self.watcher.directories():
+            self.watcher.addPath(path)
+        return True
+
+    def _signature(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _schedule_reload(self, path=None):
+        self.debounce_timer.start()
+
+    def _reload_if_changed(self):
+        dirty = False
+        for path, old_signature in self._signatures.items():
+            signature = self._signature(path)
+            if signature != old_signature:
+                self._signatures[path] = signature
+                dirty = True
+                if path not in self._polled:
+                    self._add_native(path)  # Re-arm after the file was replaced
+        if not dirty:
+            return
+        added, changed, removed = self.creator.reload_presets()
+        if added or changed or removed:
+            self.presets_changed.emit(added, changed, removed)
+
+
 class PresetEditorWindow(QMainWindow):
     def __init__(self, parent):
         super().__init__(parent)
         self.setWindowTitle("Custom Preset Builder")
+        self.setObjectName("presetEditor")
         self.setGeometry(150, 150, 1000, 700)
-        self.setup_styles()
         self.setup_ui()
 
-    def setup_styles(self):
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #0f0f23, stop:1 #1a1a2e);
-            }
-            QLabel {
-                color: #e0e0e0;
-                font-size: 14px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-weight: 500;
-            }
-            QLineEdit {
-                background-color: #16213e;
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                padding: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-size: 14px;
-            }
-            QLineEdit:focus {
-                border-color: #4a90e2;
-                background-color: #1a2751;
-            }
-            QTreeWidget {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #16213e, stop:1 #0e1b2e);
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-size: 14px;
-                selection-background-color: #4a90e2;
-                outline: none;
-            }
-            QTreeWidget::item {
-                padding: 8px;
-                border-radius: 6px;
-                margin: 2px;
-            }
-            QTreeWidget::item:selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4a90e2, stop:1 #357abd);
-                color: white;
-            }
-            QTreeWidget::item:hover {
-                background-color: #2a3f5f;
-            }
-            QMenu {
-                background-color: #1a2751;
-                color: #e0e0e0;
-                border: 1px solid #4a90e2;
-                border-radius: 8px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                padding: 5px;
-            }
-            QMenu::item {
-                padding: 8px 20px;
-                border-radius: 6px;
-            }
-            QMenu::item:selected {
-                background-color: #4a90e2;
-                color: white;
-            }
-            QGroupBox {
-                color: #e0e0e0;
-                font-weight: bold;
-                font-size: 16px;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                margin: 10px 0;
-                padding-top: 20px;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 10px 0 10px;
-            }
-        """)
-
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -833,15 +5148,7 @@ class PresetEditorWindow(QMainWindow):
 
         # Title
         title = QLabel("🏗️ Preset Builder")
-        title.setStyleSheet("""
-            font-size: 24px;
-            font-weight: bold;
-            color: #4a90e2;
-            padding: 10px;
-            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 rgba(74, 144, 226, 0.1), stop:1 rgba(74, 144, 226, 0.05));
-            border-radius: 12px;
-        """)
+        title.setProperty("role", "title")
         left_layout.addWidget(title)
 
         # Preset name group
@@ -865,14 +5172,7 @@ class PresetEditorWindow(QMainWindow):
 • This is a simulation - no actual files are created
 • Click 'Save Preset' to store your custom structure
         """)
-        instructions.setStyleSheet("""
-            background-color: rgba(74, 144, 226, 0.1);
-            padding: 15px;
-            border-radius: 10px;
-            color: #b0b0b0;
-            font-size: 13px;
-            line-height: 1.4;
-        """)
+        instructions.setProperty("role", "instructions")
         instructions.setWordWrap(True)
         left_layout.addWidget(instructions)
 
@@ -887,7 +5187,7 @@ class PresetEditorWindow(QMainWindow):
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         tree_label = QLabel("📂 Project Structure Preview")
-        tree_label.setStyleSheet("font-size: 18px; font-weight: bold; color: #4a90e2; padding: 10px 0;")
+        tree_label.setProperty("role", "heading")
         right_layout.addWidget(tree_label)
 
         # Tree widget with drag-and-drop enabled
@@ -904,11 +5204,17 @@ class PresetEditorWindow(QMainWindow):
         self.tree.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.tree.customContextMenuRequested.connect(self.show_context_menu)
 
-        # Create root item
+        self.reset()
+        main_layout.addWidget(right_panel, 2)
+
+    def reset(self):
+        """Start a new preset; the window is reused between openings."""
+        self.preset_name.clear()
+        self.preset_description.clear()
+        self.tree.clear()
         root = QTreeWidgetItem(self.tree, ["📁 Project Root"])
         root.setFlags(root.flags() & ~Qt.ItemFlag.ItemIsSelectable & ~Qt.ItemFlag.ItemIsDropEnabled)
         root.setExpanded(True)
-        main_layout.addWidget(right_panel, 2)
 
     def show_context_menu(self, pos):
         item = self.tree.itemAt(pos)
@@ -974,12 +5280,20 @@ class PresetEditorWindow(QMainWindow):
             reply = QMessageBox.question(
                 self,
                 "Preset Exists",
-                f"A preset named '{name}' already exists. Do you want to overwrite it?",
+                f"A preset named '{name}' already exists. Do you want to overwrite it? "
+                "The current version stays in its history.",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply != QMessageBox.StandardButton.Yes:
                 return
-        self.parent().creator.add_preset(name, structure)
+        try:
+            self.parent().creator.add_preset(name, structure)
+        except PresetValidationError as e:
+            QMessageBox.warning(self, "Invalid Structure", f"Please fix these items before saving:\n\n{str(e)}")
+            return
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Preset '{name}' could not be saved to disk:\n{str(e)}")
+            return
         self.parent().refresh_presets()
         QMessageBox.information(
             self,
@@ -992,54 +5306,11 @@ class PresetManagerWindow(QMainWindow):
     def __init__(self, parent):
         super().__init__(parent)
         self.setWindowTitle("Preset Manager")
+        self.setObjectName("presetManager")
         self.setGeometry(200, 200, 800, 600)
-        self.setup_styles()
         self.setup_ui()
         self.refresh_presets()
 
-    def setup_styles(self):
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #0f0f23, stop:1 #1a1a2e);
-            }
-            QLabel {
-                color: #e0e0e0;
-                font-size: 14px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QListWidget {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #16213e, stop:1 #0e1b2e);
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-size: 14px;
-                padding: 10px;
-            }
-            QListWidget::item {
-                padding: 10px;
-                border-radius: 8px;
-                margin: 2px;
-            }
-            QListWidget::item:selected {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #4a90e2, stop:1 #357abd);
-            }
-            QListWidget::item:hover {
-                background-color: #2a3f5f;
-            }
-            QTextEdit {
-                background-color: #16213e;
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                padding: 10px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-        """)
-
     def setup_ui(self):
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -1052,9 +5323,14 @@ class PresetManagerWindow(QMainWindow):
         left_panel.setMaximumWidth(300)
         left_layout = QVBoxLayout(left_panel)
         title = QLabel("📋 Available Presets")
-        title.setStyleSheet("font-size: 18px; font-weight: bold; color: #4a90e2; padding: 10px 0;")
+        title.setProperty("role", "heading")
         left_layout.addWidget(title)
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Search presets...")
+        self.search_input.textChanged.connect(self.refresh_presets)
+        left_layout.addWidget(self.search_input)
         self.preset_list = QListWidget()
+        self.preset_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
         left_layout.addWidget(self.preset_list)
 
         # Buttons
@@ -1063,18 +5339,28 @@ class PresetManagerWindow(QMainWindow):
         self.delete_btn.clicked.connect(self.delete_preset)
         self.delete_btn.setEnabled(False)
         button_layout.addWidget(self.delete_btn)
-        self.export_btn = AnimatedButton("📤 Export")
+        self.export_btn = AnimatedButton("📤 Export", tooltip="Ctrl/Shift-click to export several presets as one bundle")
         self.export_btn.clicked.connect(self.export_preset)
         self.export_btn.setEnabled(False)
         button_layout.addWidget(self.export_btn)
         left_layout.addLayout(button_layout)
+        self.compare_btn = AnimatedButton("🔀 Compare", tooltip="Compare with another preset or a project folder")
+        self.compare_btn.clicked.connect(self.compare_preset)
+        self.compare_btn.setEnabled(False)
+        self.history_btn = AnimatedButton("🕘 History", tooltip="Browse, compare and restore saved versions")
+        self.history_btn.clicked.connect(self.show_preset_history)
+        self.history_btn.setEnabled(False)
+        history_layout = QHBoxLayout()
+        history_layout.addWidget(self.compare_btn)
+        history_layout.addWidget(self.history_btn)
+        left_layout.addLayout(history_layout)
         layout.addWidget(left_panel)
 
         # Right panel - preset preview
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         preview_title = QLabel("👁️ Preset Preview")
-        preview_title.setStyleSheet("font-size: 18px; font-weight: bold; color: #4a90e2; padding: 10px 0;")
+        preview_title.setProperty("role", "heading")
         right_layout.addWidget(preview_title)
         self.preview_text = QTextEdit()
         self.preview_text.setReadOnly(True)
@@ -1087,34 +5373,61 @@ class PresetManagerWindow(QMainWindow):
 
     def refresh_presets(self):
         self.preset_list.clear()
-        for preset_name in self.parent().creator.presets.keys():
+        for preset_name in self.parent().creator.search_presets(self.search_input.text()):
             self.preset_list.addItem(f"📁 {preset_name}")
 
+    def apply_preset_changes(self, added, changed, removed):
+        """Update list entries for the given preset names only."""
+        if self.search_input.text().strip():
+            self.refresh_presets()  # Matches may have changed
+            return
+        for name in removed:
+            for item in self.preset_list.findItems(f"📁 {name}", Qt.MatchFlag.MatchExactly):
+                self.preset_list.takeItem(self.preset_list.row(item))
+        for name in added:
+            self.preset_list.addItem(f"📁 {name}")
+        current = self.preset_list.currentItem()
+        if current and current.text()[2:] in changed:
+            self.show_preset_preview(current.text()[2:])
+
     def on_preset_selected(self, current, previous):
         if current:
             preset_name = current.text()[2:]  # Remove emoji
             self.delete_btn.setEnabled(True)
             self.export_btn.setEnabled(True)
+            self.compare_btn.setEnabled(True)
+            self.history_btn.setEnabled(True)
             self.show_preset_preview(preset_name)
         else:
             self.delete_btn.setEnabled(False)
             self.export_btn.setEnabled(False)
+            self.compare_btn.setEnabled(False)
+            self.history_btn.setEnabled(False)
             self.preview_text.clear()
 
     def show_preset_preview(self, preset_name):
-        if preset_name in self.parent().creator.presets:
-            structure = self.parent().creator.presets[preset_name]
+        creator = self.parent().creator
+        if preset_name in creator.presets:
+            structure = creator.preset_variant(preset_name)
             preview = self.format_structure(structure)
-            self.preview_text.setPlainText(preview)
+            stats = creator.format_stats(creator.preset_stats(preset_name))
+            options = creator.format_options(preset_name)
+            if options:
+                stats += f"\n{options} (previewed with the defaults)"
+            self.preview_text.setPlainText(f"{stats}\n\n{preview}")
 
     def format_structure(self, structure, indent=0):
         result = []
-        for name, content in structure.items():
+        for name, content in node_items(structure):
             prefix = " " * indent
-            if content is None:  # File
-                result.append(f"{prefix}📄 {name}")
+            pattern = NamePattern.parse(name)
+            repeat = f"  (×{len(pattern):,})" if pattern and len(pattern) != 1 else ""
+            if not isinstance(content, dict):  # File
+                result.append(f"{prefix}📄 {name}{repeat}")
+            elif not is_folder(content):  # Asset
+                result.append(f"{prefix}📦 {name}{repeat}  ← {content['$source']}")
             else:  # Directory
-                result.append(f"{prefix}📁 {name}/")
+                result.append(f"{prefix}📁 {name}/{repeat}")
                 if content:
                     result.append(self.format_structure(content, indent + 1))
         return "\n".join(result)
@@ -1130,144 +5443,573 @@ class PresetManagerWindow(QMainWindow):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                self.parent().creator.delete_preset(preset_name)
-                self.parent().refresh_presets()
-                self.refresh_presets()
+                try:
+                    self.parent().creator.delete_preset(preset_name)
+                except OSError as e:
+                    QMessageBox.critical(self, "Error", f"The deletion could not be saved to disk:\n{str(e)}")
+                    return
+                finally:
+                    self.parent().refresh_presets()
+                    self.refresh_presets()
                 QMessageBox.information(self, "Success", f"Preset '{preset_name}' deleted successfully!")
 
     def export_preset(self):
-        current_item = self.preset_list.currentItem()
-        if current_item:
-            preset_name = current_item.text()[2:]
+        preset_names = [item.text()[2:] for item in self.preset_list.selectedItems()]
+        if not preset_names:
+            return
+        bundle_filter = f"Preset Bundles (*{PresetBundle.EXTENSION})"
+        store_filter = f"Preset Stores (*{PresetStore.EXTENSION})"
+        if len(preset_names) == 1:
             file_path, _ = QFileDialog.getSaveFileName(
                 self,
                 "Export Preset",
-                f"{preset_name}.json",
-                "JSON Files (*.json)"
+                f"{preset_names[0]}.json",
+                f"JSON Files (*.json);;{bundle_filter};;{store_filter}"
+            )
+        else:
+            file_path, _ = QFileDialog.getSaveFileName(
+                self,
+                f"Export {len(preset_names)} Presets",
+                f"presets{PresetBundle.EXTENSION}",
+                f"{bundle_filter};;{store_filter}"
+            )
+            if file_path and not file_path.endswith((PresetBundle.EXTENSION, PresetStore.EXTENSION)):
+                file_path += PresetBundle.EXTENSION
+        if file_path:
+            creator = self.parent().creator
+            try:
+                if file_path.endswith(PresetBundle.EXTENSION):
+                    creator.export_bundle(file_path, preset_names)
+                elif file_path.endswith(PresetStore.EXTENSION):
+                    PresetStore.write(
+                        file_path, ((name, PresetStore.encode(creator.presets[name])) for name in preset_names)
+                    )
+                else:
+                    preset_data = {preset_names[0]: creator.presets[preset_names[0]]}
+                    with open(file_path, 'w') as f:
+                        json.dump(preset_data, f, indent=2)
+                QMessageBox.information(self, "Success", f"{len(preset_names)} preset(s) exported to {file_path}")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Failed to export preset: {str(e)}")
+
+    def compare_preset(self):
+        current_item = self.preset_list.currentItem()
+        if not current_item:
+            return
+        preset_name = current_item.text()[2:]
+        creator = self.parent().creator
+        directory_choice = "📂 A project folder on disk..."
+        others = [name for name in creator.presets if name != preset_name]
+        target, ok = QInputDialog.getItem(
+            self, "Compare Preset", f"Compare '{preset_name}' with:", [directory_choice] + others, 0, False
+        )
+        if not ok:
+            return
+        differ = TreeDiffer()
+        if target == directory_choice:
+            target = QFileDialog.getExistingDirectory(self, "Select Project Directory")
+            if not target:
+                return
+            try:
+                other_tree = differ.scan_directory(target)
+            except OSError as e:
+                QMessageBox.critical(self, "Error", f"Failed to read folder: {str(e)}")
+                return
+        else:
+            other_tree = creator.preset_digest_tree(target)
+        changes = differ.diff(creator.preset_digest_tree(preset_name), other_tree)
+        self.show_diff(preset_name, target, changes)
+
+    def show_preset_history(self):
+        """List the saved versions of the selected preset, to preview, compare or restore one."""
+
+        current_item = self.preset_list.currentItem()
+        if not current_item:
+            return
+        preset_name = current_item.text()[2:]
+        creator = self.parent().creator
+        history = creator.preset_history()
+        versions = history.versions(preset_name)
+        if not versions:
+            QMessageBox.information(self, "Preset History", f"'{preset_name}' has no saved versions yet.")
+            return
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"History of {preset_name}")
+        dialog.setGeometry(250, 250, 800, 550)
+        layout = QVBoxLayout(dialog)
+        version_list = QTreeWidget()
+        version_list.setRootIsDecorated(False)
+        version_list.setHeaderLabels(["Version", "Saved", "Nodes", "Stored as"])
+        for version in versions:
+            item = QTreeWidgetItem([
+                str(version.version),
+                datetime.fromtimestamp(version.saved).strftime("%Y-%m-%d %H:%M:%S"),
+                f"{version.nodes:,}" if version.nodes is not None else "—",
+                "deleted" if version.kind == "deleted" else f"{version.kind} · {format_size(version.size)}",
+            ])
+            item.setData(0, Qt.ItemDataRole.UserRole, version.version)
+            version_list.addTopLevelItem(item)
+        layout.addWidget(version_list)
+        preview = QTextEdit()
+        preview.setReadOnly(True)
+        layout.addWidget(preview)
+        button_layout = QHBoxLayout()
+        compare_button = AnimatedButton("🔀 Compare with Current")
+        restore_button = AnimatedButton("↩️ Restore")
+        restore_button.setProperty("role", "primary")
+        button_layout.addWidget(compare_button)
+        button_layout.addWidget(restore_button)
+        layout.addLayout(button_layout)
+
+        def selected_structure():
+            item = version_list.currentItem()
+            if item is None or item.text(3) == "deleted":
+                return None, None
+            version = item.data(0, Qt.ItemDataRole.UserRole)
+            try:
+                return version, history.version(preset_name, version)
+            except (KeyError, ValueError) as e:
+                QMessageBox.critical(dialog, "Error", str(e))
+                return None, None
+
+        def on_selected():
+            version, structure = selected_structure()
+            compare_button.setEnabled(structure is not None and preset_name in creator.presets)
+            restore_button.setEnabled(structure is not None)
+            preview.setPlainText(self.format_structure(structure) if structure is not None else "Deleted")
+
+        def compare():
+            version, structure = selected_structure()
+            if structure is not None:
+                differ = TreeDiffer()
+                changes = differ.diff(differ.digest_tree(structure), creator.preset_digest_tree(preset_name))
+                self.show_diff(f"{preset_name} v{version}", f"{preset_name} (current)", changes)
+
+        def restore():
+            version, structure = selected_structure()
+            if structure is None:
+                return
+            reply = QMessageBox.question(
+                dialog, "Restore Version",
+                f"Replace the current '{preset_name}' with version {version}? "
+                "The current one stays in the history.",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+            try:
+                creator.restore_preset_version(preset_name, version)
+            except (KeyError, ValueError, OSError) as e:
+                QMessageBox.critical(dialog, "Error", f"Failed to restore version {version}: {e}")
+                return
+            self.parent().refresh_presets()
+            self.show_preset_preview(preset_name)
+            dialog.accept()
+            QMessageBox.information(self, "Success", f"Restored version {version} of '{preset_name}'.")
+
+        version_list.currentItemChanged.connect(lambda current, previous: on_selected())
+        compare_button.clicked.connect(compare)
+        restore_button.clicked.connect(restore)
+        version_list.setCurrentItem(version_list.topLevelItem(0))
+        on_selected()
+        dialog.exec()
+
+    def show_diff(self, old_label, new_label, changes):
+        """Show a diff in a dialog, with an option to save it as JSON."""
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Preset Comparison")
+        dialog.setGeometry(250, 250, 700, 500)
+        layout = QVBoxLayout(dialog)
+        counts = {op: sum(1 for c in changes if c["op"] == op) for op in ("added", "removed", "type_changed")}
+        layout.addWidget(QLabel(
+            f"{old_label} → {new_label}: {counts['added']} added, "
+            f"{counts['removed']} removed, {counts['type_changed']} type changed"
+        ))
+        diff_text = QTextEdit()
+        diff_text.setReadOnly(True)
+        diff_text.setPlainText(TreeDiffer().format_diff(changes))
+        layout.addWidget(diff_text)
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Close)
+        button_box.rejected.connect(dialog.reject)
+
+        def save_json():
+            file_path, _ = QFileDialog.getSaveFileName(dialog, "Save Comparison", "diff.json", "JSON Files (*.json)")
             if file_path:
                 try:
-                    preset_data = {preset_name: self.parent().creator.presets[preset_name]}
                     with open(file_path, 'w') as f:
-                        json.dump(preset_data, f, indent=2)
-                    QMessageBox.information(self, "Success", f"Preset exported to {file_path}")
+                        json.dump({"old": old_label, "new": new_label, "changes": changes}, f, indent=2)
                 except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to export preset: {str(e)}")
+                    QMessageBox.critical(dialog, "Error", f"Failed to save comparison: {str(e)}")
+
+        button_box.accepted.connect(save_json)
+        layout.addWidget(button_box)
+        dialog.exec()
+
+# One stylesheet for the whole application, parsed once at startup. Windows are
+# scoped by object name and widget state is selected with dynamic properties,
+# so changing state never hands Qt a new stylesheet to parse.
+APP_STYLESHEET = """
+    QMainWindow {
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+            stop:0 #0f0f23, stop:1 #1a1a2e);
+    }
+    QLabel {
+        color: #e0e0e0;
+        font-size: 14px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-weight: 500;
+    }
+    #presetManager QLabel {
+        font-weight: normal;
+    }
+    QLabel[role="title"] {
+        font-size: 24px;
+        font-weight: bold;
+        color: #4a90e2;
+        padding: 10px;
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 rgba(74, 144, 226, 0.1), stop:1 rgba(74, 144, 226, 0.05));
+        border-radius: 12px;
+    }
+    #mainWindow QLabel[role="title"] {
+        font-size: 32px;
+        padding: 20px;
+        background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+            stop:0 rgba(74, 144, 226, 0.15), stop:1 rgba(74, 144, 226, 0.05));
+        border-radius: 15px;
+        border: 1px solid rgba(74, 144, 226, 0.3);
+    }
+    QLabel[role="heading"] {
+        font-size: 18px;
+        font-weight: bold;
+        color: #4a90e2;
+        padding: 10px 0;
+    }
+    #mainWindow QLabel[role="heading"] {
+        font-size: 20px;
+    }
+    QLabel[role="version"] {
+        font-size: 14px;
+        color: #888;
+        padding: 10px;
+    }
+    QLabel[role="instructions"] {
+        background-color: rgba(74, 144, 226, 0.1);
+        padding: 15px;
+        border-radius: 10px;
+        color: #b0b0b0;
+        font-size: 13px;
+    }
+    QLabel[role="stats"] {
+        color: #888;
+        font-size: 12px;
+        padding: 0 0 5px 0;
+    }
+    QLabel[role="hint"] {
+        color: #888;
+        font-size: 12px;
+        padding: 5px;
+    }
+    QLabel[role="hint"][status="valid"] { color: #27ae60; }
+    QLabel[role="hint"][status="warning"] { color: #f39c12; }
+    QLabel[role="hint"][status="info"] { color: #3498db; }
+    QLabel[role="hint"][status="error"] { color: #e74c3c; }
+    QLineEdit {
+        background-color: #16213e;
+        color: #e0e0e0;
+        border: 2px solid #0e3460;
+        border-radius: 10px;
+        padding: 12px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-size: 14px;
+    }
+    QLineEdit:focus {
+        border-color: #4a90e2;
+        background-color: #1a2751;
+    }
+    #mainWindow QLineEdit {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #16213e, stop:1 #0e1b2e);
+    }
+    #mainWindow QLineEdit:focus {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #1a2751, stop:1 #16213e);
+    }
+    #presetManager QLineEdit {
+        padding: 10px;
+    }
+    #presetManager QLineEdit:focus {
+        background-color: #16213e;
+    }
+    #mainWindow QComboBox {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #2a3f5f, stop:1 #1a2f4f);
+        color: #e0e0e0;
+        border: 2px solid #0e3460;
+        border-radius: 10px;
+        padding: 12px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-size: 14px;
+        min-width: 200px;
+    }
+    #mainWindow QComboBox::drop-down {
+        border: none;
+        width: 30px;
+    }
+    #mainWindow QComboBox::down-arrow {
+        image: none;
+        border-left: 5px solid transparent;
+        border-right: 5px solid transparent;
+        border-top: 8px solid #4a90e2;
+        margin-right: 10px;
+    }
+    #mainWindow QComboBox:hover {
+        border-color: #4a90e2;
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #3a4f6f, stop:1 #2a3f5f);
+    }
+    #mainWindow QComboBox QAbstractItemView {
+        background-color: #1a2751;
+        color: #e0e0e0;
+        selection-background-color: #4a90e2;
+        border: 1px solid #4a90e2;
+        border-radius: 8px;
+    }
+    QGroupBox {
+        color: #e0e0e0;
+        font-weight: bold;
+        font-size: 16px;
+        border: 2px solid #0e3460;
+        border-radius: 10px;
+        margin: 10px 0;
+        padding-top: 20px;
+    }
+    QGroupBox::title {
+        subcontrol-origin: margin;
+        left: 10px;
+        padding: 0 10px 0 10px;
+    }
+    #mainWindow QGroupBox {
+        border-radius: 12px;
+        margin: 15px 0;
+        padding-top: 25px;
+        background: rgba(22, 33, 62, 0.3);
+    }
+    #mainWindow QGroupBox::title {
+        left: 15px;
+        color: #4a90e2;
+    }
+    QTextEdit {
+        background-color: #16213e;
+        color: #e0e0e0;
+        border: 2px solid #0e3460;
+        border-radius: 10px;
+        padding: 10px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+    }
+    #mainWindow QTextEdit {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #16213e, stop:1 #0e1b2e);
+        padding: 15px;
+        font-family: 'Consolas', 'Monaco', monospace;
+        font-size: 13px;
+    }
+    QTreeWidget {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #16213e, stop:1 #0e1b2e);
+        color: #e0e0e0;
+        border: 2px solid #0e3460;
+        border-radius: 12px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-size: 14px;
+        selection-background-color: #4a90e2;
+        outline: none;
+    }
+    QTreeWidget::item {
+        padding: 8px;
+        border-radius: 6px;
+        margin: 2px;
+    }
+    QTreeWidget::item:selected {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #4a90e2, stop:1 #357abd);
+        color: white;
+    }
+    QTreeWidget::item:hover {
+        background-color: #2a3f5f;
+    }
+    QListWidget {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #16213e, stop:1 #0e1b2e);
+        color: #e0e0e0;
+        border: 2px solid #0e3460;
+        border-radius: 12px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        font-size: 14px;
+        padding: 10px;
+    }
+    QListWidget::item {
+        padding: 10px;
+        border-radius: 8px;
+        margin: 2px;
+    }
+    QListWidget::item:selected {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #4a90e2, stop:1 #357abd);
+    }
+    QListWidget::item:hover {
+        background-color: #2a3f5f;
+    }
+    #presetEditor QMenu {
+        background-color: #1a2751;
+        color: #e0e0e0;
+        border: 1px solid #4a90e2;
+        border-radius: 8px;
+        font-family: 'Segoe UI', Arial, sans-serif;
+        padding: 5px;
+    }
+    #presetEditor QMenu::item {
+        padding: 8px 20px;
+        border-radius: 6px;
+    }
+    #presetEditor QMenu::item:selected {
+        background-color: #4a90e2;
+        color: white;
+    }
+    AnimatedButton {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #4a90e2, stop:1 #357abd);
+        color: white;
+        border: none;
+        border-radius: 12px;
+        padding: 12px 24px;
+        font-size: 14px;
+        font-weight: bold;
+        font-family: 'Segoe UI', Arial, sans-serif;
+    }
+    AnimatedButton:hover {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #5ba0f2, stop:1 #4080cd);
+        border: 2px solid #ffffff40;
+    }
+    AnimatedButton:pressed {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #3a80d2, stop:1 #2570ad);
+        padding: 13px 23px 11px 25px;
+    }
+    AnimatedButton[role="primary"] {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #27ae60, stop:1 #229954);
+        padding: 15px 24px;
+        font-size: 16px;
+    }
+    AnimatedButton[role="primary"]:hover {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #2ecc71, stop:1 #27ae60);
+        border: none;
+    }
+    AnimatedButton[role="primary"]:pressed {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #239b56, stop:1 #1e8449);
+        padding: 15px 24px;
+    }
+    AnimatedButton:disabled {
+        background: #555;
+        color: #999;
+    }
+    QProgressBar {
+        border: 2px solid #0e3460;
+        border-radius: 8px;
+        text-align: center;
+        background: #16213e;
+        color: #e0e0e0;
+        font-weight: bold;
+    }
+    QProgressBar::chunk {
+        background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
+            stop:0 #27ae60, stop:1 #229954);
+        border-radius: 6px;
+    }
+    QStatusBar {
+        background: #16213e;
+        color: #e0e0e0;
+        border-top: 1px solid #0e3460;
+        padding: 5px;
+    }
+    QStatusBar[status="success"] {
+        background: #27ae60;
+        color: white;
+        border-top: 1px solid #229954;
+    }
+    QStatusBar[status="error"] {
+        background: #e74c3c;
+        color: white;
+        border-top: 1px solid #c0392b;
+    }
+"""
+
+def set_style_state(widget, state):
+    """Switch the ``status`` property APP_STYLESHEET selects on, re-polishing only on change."""
+    if widget.property("status") == state:
+        return
+    widget.setProperty("status", state)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
 
 class MainWindow(QMainWindow):
+    SEARCH_LIMIT = 200
+    RECENT_LIMIT = 10
+    HISTORY_LIMIT = 500
+
     def __init__(self):
         super().__init__()
+        built_from = time.perf_counter()
         self.setWindowTitle("Blueprint Generator")
+        self.setObjectName("mainWindow")
         self.setGeometry(100, 100, 1200, 800)
         self.setAcceptDrops(True)  # Enable drag & drop
         
-        # Initialize components
-        self.creator = ProjectStructureCreator()
+        # Initialize components; the preset layers are read in the background (see start_loading_presets)
+        self.creator = ProjectStructureCreator(load=False)
         self.settings = QSettings('ProjectCreatorPro', 'Settings')
-        self.recent_projects = self.load_recent_projects()
-        self.creation_thread = None
+        self.history = self.creator.run_history()
+        self.import_recent_projects()
+        self.jobs = JobQueue(self.creator, self)
+        self.jobs.jobs_updated.connect(self.on_jobs_updated)
+        self.jobs.job_finished.connect(self.on_job_finished)
+        self.job_items = {}  # Job id -> row in the jobs panel
+        self.preview_cache = {}  # Preset name -> {options key: preview text}
+        self.option_widgets = {}
+        self.option_choices = {}  # Options picked per preset during this session
+        self.preset_editor = None  # Secondary windows are built on first use
+        self.preset_manager = None
+        self.preset_watcher = None
+        self.pending_preset = None  # last_preset, until the layer defining it is loaded
+        self.preset_loader = PresetLoader(self.creator, self)
+        self.preset_loader.layer_loaded.connect(self.on_preset_layer_loaded)
+        self.preset_loader.finished.connect(self.on_presets_loaded)
         
         # Setup UI and features
-        self.setup_styles()
         self.setup_ui()
         self.setup_keyboard_shortcuts()
         self.setup_status_bar()
         self.load_user_preferences()
+        self.preset_loader.start()
         
         # Auto-save timer
         self.auto_save_timer = QTimer()
         self.auto_save_timer.timeout.connect(self.save_user_preferences)
         self.auto_save_timer.start(30000)  # Save every 30 seconds
+        self.startup_times = {"window": (time.perf_counter() - built_from) * 1000}
 
-    def setup_styles(self):
-        self.setStyleSheet("""
-            QMainWindow {
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
-                    stop:0 #0f0f23, stop:1 #1a1a2e);
-            }
-            QLabel {
-                color: #e0e0e0;
-                font-size: 14px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-weight: 500;
-            }
-            QComboBox {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2a3f5f, stop:1 #1a2f4f);
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                padding: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-size: 14px;
-                min-width: 200px;
-            }
-            QComboBox::drop-down {
-                border: none;
-                width: 30px;
-            }
-            QComboBox::down-arrow {
-                image: none;
-                border-left: 5px solid transparent;
-                border-right: 5px solid transparent;
-                border-top: 8px solid #4a90e2;
-                margin-right: 10px;
-            }
-            QComboBox:hover {
-                border-color: #4a90e2;
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #3a4f6f, stop:1 #2a3f5f);
-            }
-            QComboBox QAbstractItemView {
-                background-color: #1a2751;
-                color: #e0e0e0;
-                selection-background-color: #4a90e2;
-                border: 1px solid #4a90e2;
-                border-radius: 8px;
-            }
-            QLineEdit {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #16213e, stop:1 #0e1b2e);
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                padding: 12px;
-                font-family: 'Segoe UI', Arial, sans-serif;
-                font-size: 14px;
-            }
-            QLineEdit:focus {
-                border-color: #4a90e2;
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #1a2751, stop:1 #16213e);
-            }
-            QGroupBox {
-                color: #e0e0e0;
-                font-weight: bold;
-                font-size: 16px;
-                border: 2px solid #0e3460;
-                border-radius: 12px;
-                margin: 15px 0;
-                padding-top: 25px;
-                background: rgba(22, 33, 62, 0.3);
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 15px;
-                padding: 0 10px 0 10px;
-                color: #4a90e2;
-            }
-            QTextEdit {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #16213e, stop:1 #0e1b2e);
-                color: #e0e0e0;
-                border: 2px solid #0e3460;
-                border-radius: 10px;
-                padding: 15px;
-                font-family: 'Consolas', 'Monaco', monospace;
-                font-size: 13px;
-                line-height: 1.4;
-            }
-        """)
+    def report_startup_time(self):
+        """Record time to the first event loop turn; printed when BLUEPRINT_STARTUP_TIMING is set."""
+        self.startup_times["interactive"] = (time.perf_counter() - STARTED_AT) * 1000
+        if os.environ.get("BLUEPRINT_STARTUP_TIMING"):
+            print(f"Startup: main window built in {self.startup_times['window']:.0f} ms, "
+                  f"interactive {self.startup_times['interactive']:.0f} ms after imports")
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -1279,20 +6021,11 @@ class MainWindow(QMainWindow):
         # Header
         header_layout = QHBoxLayout()
         title = QLabel("🚀 Blueprint Generator")
-        title.setStyleSheet("""
-            font-size: 32px;
-            font-weight: bold;
-            color: #4a90e2;
-            padding: 20px;
-            background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
-                stop:0 rgba(74, 144, 226, 0.15), stop:1 rgba(74, 144, 226, 0.05));
-            border-radius: 15px;
-            border: 1px solid rgba(74, 144, 226, 0.3);
-        """)
+        title.setProperty("role", "title")
         header_layout.addWidget(title)
         header_layout.addStretch()
         version = QLabel("v2.0")
-        version.setStyleSheet("font-size: 14px; color: #888; padding: 10px;")
+        version.setProperty("role", "version")
         header_layout.addWidget(version)
         main_layout.addLayout(header_layout)
 
@@ -1310,8 +6043,13 @@ class MainWindow(QMainWindow):
         preset_group = QGroupBox("📁 Project Template")
         preset_layout = QVBoxLayout(preset_group)
         preset_layout.addWidget(QLabel("Choose a template:"))
+        self.preset_search = QLineEdit()
+        self.preset_search.setPlaceholderText("🔍 Search templates, descriptions or file names...")
+        self.preset_search.textChanged.connect(self.filter_presets)
+        preset_layout.addWidget(self.preset_search)
         self.preset_combo = QComboBox()
         self.preset_combo.currentTextChanged.connect(self.on_preset_changed)
+        self.preset_combo.activated.connect(self.forget_pending_preset)
         preset_layout.addWidget(self.preset_combo)
         self.template_description = QTextEdit()
         self.template_description.setMaximumHeight(100)
@@ -1321,6 +6059,12 @@ class MainWindow(QMainWindow):
         preset_layout.addWidget(self.template_description)
         left_layout.addWidget(preset_group)
 
+        # Options of the selected template, rebuilt when it changes
+        self.options_group = QGroupBox("🧩 Options")
+        self.options_layout = QVBoxLayout(self.options_group)
+        self.options_group.setVisible(False)
+        left_layout.addWidget(self.options_group)
+
         # Path selection group
         path_group = QGroupBox("📂 Destination")
         path_layout = QVBoxLayout(path_group)
@@ -1338,41 +6082,26 @@ class MainWindow(QMainWindow):
         
         # Path validation indicator
         self.path_status = QLabel("")
-        self.path_status.setStyleSheet("color: #888; font-size: 12px; padding: 5px;")
+        self.path_status.setProperty("role", "hint")
         path_layout.addWidget(self.path_status)
+        self.git_init_checkbox = QCheckBox("Initialize a git repository with the scaffold committed")
+        self.git_init_checkbox.setToolTip("Writes .git and an initial commit while the files are created")
+        path_layout.addWidget(self.git_init_checkbox)
         left_layout.addWidget(path_group)
 
         # Action buttons
         button_group = QGroupBox("⚡ Actions")
         button_layout = QVBoxLayout(button_group)
         self.create_button = AnimatedButton("🎯 Create Project Structure", tooltip="Create project structure (Ctrl+Enter)")
-        self.create_button.setStyleSheet("""
-            QPushButton {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #27ae60, stop:1 #229954);
-                color: white;
-                border: none;
-                border-radius: 12px;
-                padding: 15px 24px;
-                font-size: 16px;
-                font-weight: bold;
-                font-family: 'Segoe UI', Arial, sans-serif;
-            }
-            QPushButton:hover {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #2ecc71, stop:1 #27ae60);
-            }
-            QPushButton:pressed {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #239b56, stop:1 #1e8449);
-            }
-        """)
+        self.create_button.setProperty("role", "primary")
         self.create_button.clicked.connect(self.create_project)
         button_layout.addWidget(self.create_button)
         
         # Recent projects button
-        recent_button = AnimatedButton("📋 Recent Projects", tooltip="Quick access to recent projects (Ctrl+R)")
-        recent_button.clicked.connect(self.show_recent_projects)
+        recent_button = AnimatedButton("📋 Recent Projects", tooltip="Quick access to recent projects; full run history with Ctrl+R")
+        self.recent_menu = QMenu(self)
+        self.recent_menu.aboutToShow.connect(self.update_recent_projects_menu)
+        recent_button.setMenu(self.recent_menu)
         button_layout.addWidget(recent_button)
         
         secondary_layout = QHBoxLayout()
@@ -1394,77 +6123,210 @@ class MainWindow(QMainWindow):
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
         preview_title = QLabel("👁️ Structure Preview")
-        preview_title.setStyleSheet("font-size: 20px; font-weight: bold; color: #4a90e2; padding: 10px 0;")
+        preview_title.setProperty("role", "heading")
         right_layout.addWidget(preview_title)
+        self.stats_label = QLabel("")
+        self.stats_label.setProperty("role", "stats")
+        right_layout.addWidget(self.stats_label)
         self.preview_area = QTextEdit()
         self.preview_area.setReadOnly(True)
         self.preview_area.setPlaceholderText("Select a template to see the project structure preview...")
         right_layout.addWidget(self.preview_area)
+
+        # Jobs panel, shown once something was queued
+        self.jobs_group = QGroupBox("🧵 Jobs")
+        jobs_layout = QVBoxLayout(self.jobs_group)
+        self.job_list = QTreeWidget()
+        self.job_list.setRootIsDecorated(False)
+        self.job_list.setHeaderLabels(["Template", "Destination", "Progress", "Status"])
+        self.job_list.setMaximumHeight(180)
+        self.job_list.itemSelectionChanged.connect(self.update_job_buttons)
+        self.job_list.itemDoubleClicked.connect(lambda item: self.show_job_result(self.selected_job()))
+        jobs_layout.addWidget(self.job_list)
+        job_buttons = QHBoxLayout()
+        self.cancel_job_button = AnimatedButton("⏹ Cancel", tooltip="Stop the selected job before its next node")
+        self.cancel_job_button.clicked.connect(self.cancel_job)
+        job_buttons.addWidget(self.cancel_job_button)
+        self.retry_job_button = AnimatedButton("🔁 Retry", tooltip="Queue the selected failed or cancelled job again")
+        self.retry_job_button.clicked.connect(self.retry_job)
+        job_buttons.addWidget(self.retry_job_button)
+        clear_jobs_button = AnimatedButton("🧹 Clear Finished", tooltip="Remove finished jobs from the list")
+        clear_jobs_button.clicked.connect(self.clear_finished_jobs)
+        job_buttons.addWidget(clear_jobs_button)
+        jobs_layout.addLayout(job_buttons)
+        self.jobs_group.setVisible(False)
+        self.update_job_buttons()
+        right_layout.addWidget(self.jobs_group)
         splitter.addWidget(right_panel)
         splitter.setSizes([450, 750])
 
-        # Progress bar (initially hidden)
+        # Overall progress of the running jobs (initially hidden)
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
-        self.progress_bar.setStyleSheet("""
-            QProgressBar {
-                border: 2px solid #0e3460;
-                border-radius: 8px;
-                text-align: center;
-                background: #16213e;
-                color: #e0e0e0;
-                font-weight: bold;
-            }
-            QProgressBar::chunk {
-                background: qlineargradient(x1:0, y1:0, x2:0, y2:1,
-                    stop:0 #27ae60, stop:1 #229954);
-                border-radius: 6px;
-            }
-        """)
         main_layout.addWidget(self.progress_bar)
         
         # Initialize
         self.refresh_presets()
-        self.update_recent_projects_menu()
 
     def refresh_presets(self):
         current = self.preset_combo.currentText()
+        self.preview_cache.clear()
         self.preset_combo.clear()
-        presets = list(self.creator.presets.keys())
+        presets = self.creator.search_presets(self.preset_search.text())
         self.preset_combo.addItems(presets)
         if current and current in presets:
             self.preset_combo.setCurrentText(current)
         elif presets:
             self.preset_combo.setCurrentIndex(0)
 
+    def on_presets_reloaded(self, added, changed, removed):
+        """Apply an incremental preset reload to the combo, previews and manager."""
+        self.apply_preset_changes(added, changed, removed)
+        self.show_status_message(
+            f"Presets reloaded: {len(added)} added, {len(changed)} changed, {len(removed)} removed"
+        )
+
+    def on_preset_layer_loaded(self, added, changed, removed):
+        """Show the presets of a layer as soon as it is loaded, selecting last_preset once it is there."""
+        self.apply_preset_changes(added, changed, removed)
+        if self.pending_preset in self.creator.presets:
+            index = self.preset_combo.findText(self.pending_preset)
+            if index >= 0:
+                self.preset_combo.setCurrentIndex(index)
+                self.pending_preset = None
+        self.show_status_message(f"Loading templates... {len(self.creator.presets)} so far", 0)
+
+    def on_presets_loaded(self):
+        """Every preset layer is loaded: report problems and start watching the preset files."""
+        self.pending_preset = None
+        self.report_invalid_presets()
+        # Pick up preset edits made outside the app
+        self.preset_watcher = PresetWatcher(self.creator, self)
+        self.preset_watcher.presets_changed.connect(self.on_presets_reloaded)
+
+    def forget_pending_preset(self, _index=None):
+        """The user picked a template while loading; keep it rather than restoring last_preset."""
+        self.pending_preset = None
+
+    def presets_ready(self):
+        """Whether every preset layer is loaded; otherwise says so in the status bar."""
+        if self.preset_loader.loading:
+            self.show_status_message("Templates are still loading, please try again in a moment")
+            return False
+        return True
+
+    def apply_preset_changes(self, added, changed, removed):
+        """Apply added, changed and removed presets to the combo, previews and manager."""
+        for name in changed + removed:
+            self.preview_cache.pop(name, None)
+        current = self.preset_combo.currentText()
+        if self.preset_search.text().strip():
+            self.filter_presets(self.preset_search.text())
+            if current in changed:
+                self.on_preset_changed(current)
+            return
+        self.preset_combo.blockSignals(True)
+        for name in removed:
+            index = self.preset_combo.findText(name)
+            if index >= 0:
+                self.preset_combo.removeItem(index)
+        self.preset_combo.addItems(added)
+        self.preset_combo.blockSignals(False)
+        if self.preset_combo.currentText() != current or current in changed:
+            self.on_preset_changed(self.preset_combo.currentText())
+        if self.preset_manager is not None:
+            self.preset_manager.apply_preset_changes(added, changed, removed)
+
+    def filter_presets(self, query):
+        """Show only the templates matching the search query."""
+        current = self.preset_combo.currentText()
+        matches = self.creator.search_presets(query, limit=self.SEARCH_LIMIT)
+        self.preset_combo.blockSignals(True)
+        self.preset_combo.clear()
+        self.preset_combo.addItems(matches)
+        self.preset_combo.setCurrentIndex(max(self.preset_combo.findText(current), 0))
+        self.preset_combo.blockSignals(False)
+        if not matches:
+            self.show_status_message(f"No templates match '{query.strip()}'")
+        elif self.preset_combo.currentText() != current:
+            self.on_preset_changed(self.preset_combo.currentText())
+
     def on_preset_changed(self, preset_name):
         if preset_name and preset_name in self.creator.presets:
-            structure = self.creator.presets[preset_name]
-            preview = self.format_structure_preview(structure)
-            self.preview_area.setPlainText(preview)
-            descriptions = {
-                "react-app": "Modern React application with TypeScript support, testing setup, and build tools.",
-                "nextjs-app": "Next.js application with app router, TypeScript, and Tailwind CSS setup.",
-                "express-api": "Express.js REST API with middleware, authentication, and database integration.",
-                "django-app": "Django web application with apps structure, settings management, and deployment files.",
-                "fastapi-app": "FastAPI application with async support, automatic API documentation, and testing.",
-                "vue-app": "Vue.js application with router, state management, and component structure.",
-                "data-science-project": "Data science project with notebooks, data pipelines, and model organization.",
-                "flutter-app": "Flutter mobile application with proper architecture and platform-specific code.",
-                "go-microservice": "Go microservice with clean architecture, API documentation, and deployment files.",
-                "mobile-app-rn": "React Native mobile app with navigation, services, and cross-platform support."
-            }
-            description = descriptions.get(preset_name, "Custom project template structure.")
-            self.template_description.setPlainText(description)
+            try:
+                self.build_options_panel(preset_name)
+                self.show_preview(preset_name)
+            except PresetValidationError:  # A stored preset found invalid as it was first read
+                self.preview_area.clear()
+                self.show_status_message(f"Skipped invalid preset '{preset_name}'", 10000, error=True)
+                return
+            self.template_description.setPlainText(self.creator.describe(preset_name))
+
+    def show_preview(self, preset_name):
+        """Preview the variant of a preset picked in the options panel."""
+        options = self.selected_options()
+        key = self.creator.options_key(preset_name, options)
+        previews = self.preview_cache.setdefault(preset_name, {})
+        preview = previews.get(key)
+        if preview is None:
+            structure = self.creator.preset_variant(preset_name, options)
+            preview = previews[key] = self.format_structure_preview(structure)
+        self.preview_area.setPlainText(preview)
+        self.stats_label.setText(self.creator.format_stats(self.creator.preset_stats(preset_name, options)))
+
+    def build_options_panel(self, preset_name):
+        """Show a checkbox or drop-down for each option of the template, or hide the panel if it has none."""
+        while self.options_layout.count():
+            widget = self.options_layout.takeAt(0).widget()
+            if widget is not None:
+                widget.deleteLater()
+        self.option_widgets = {}
+        declared = self.creator.preset_options(preset_name)
+        self.options_group.setVisible(bool(declared))
+        chosen = self.option_choices.get(preset_name, {})
+        for name, option in declared.items():
+            value = chosen.get(name, option["default"])
+            if "choices" in option:
+                row = QWidget()
+                row_layout = QHBoxLayout(row)
+                row_layout.setContentsMargins(0, 0, 0, 0)
+                row_layout.addWidget(QLabel(f"{name}:"))
+                widget = QComboBox()
+                widget.addItems(option["choices"])
+                widget.setCurrentText(value)
+                widget.currentTextChanged.connect(lambda _: self.on_option_changed(preset_name))
+                row_layout.addWidget(widget, 1)
+                self.options_layout.addWidget(row)
+            else:
+                widget = QCheckBox(name)
+                widget.setChecked(value)
+                widget.toggled.connect(lambda _: self.on_option_changed(preset_name))
+                self.options_layout.addWidget(widget)
+            widget.setToolTip(option.get("description", ""))
+            self.option_widgets[name] = widget
+
+    def selected_options(self):
+        return {
+            name: widget.currentText() if isinstance(widget, QComboBox) else widget.isChecked()
+            for name, widget in self.option_widgets.items()
+        }
+
+    def on_option_changed(self, preset_name):
+        self.option_choices[preset_name] = self.selected_options()
+        self.show_preview(preset_name)
 
     def format_structure_preview(self, structure, indent=0):
         result = []
-        for name, content in structure.items():
+        for name, content in node_items(structure):
             prefix = " " * indent
-            if content is None:  # File
-                result.append(f"{prefix}📄 {name}")
+            pattern = NamePattern.parse(name)
+            repeat = f"  (×{len(pattern):,})" if pattern and len(pattern) != 1 else ""
+            if not isinstance(content, dict):  # File
+                result.append(f"{prefix}📄 {name}{repeat}")
+            elif not is_folder(content):  # Asset
+                result.append(f"{prefix}📦 {name}{repeat}  ← {content['$source']}")
             else:  # Directory
-                result.append(f"{prefix}📁 {name}/")
+                result.append(f"{prefix}📁 {name}/{repeat}")
                 if content:
                     result.append(self.format_structure_preview(content, indent + 1))
         return "\n".join(result)
@@ -1483,6 +6345,8 @@ class MainWindow(QMainWindow):
             self.show_status_message("Please select a project template!", error=True)
             QMessageBox.warning(self, "No Template Selected", "Please select a project template!")
             return
+        if not self.presets_ready():  # A layer still to come may override this template
+            return
         if not project_path:
             self.show_status_message("Please select a destination folder!", error=True)
             QMessageBox.warning(self, "No Destination", "Please select a destination folder!")
@@ -1506,74 +6370,198 @@ class MainWindow(QMainWindow):
             if reply != QMessageBox.StandardButton.Yes:
                 return
         
-        # Start project creation with progress feedback
-        self.create_button.setEnabled(False)
+        if self.git_init_checkbox.isChecked() and os.path.exists(os.path.join(project_path, ".git")):
+            self.show_status_message("Destination is already a git repository!", error=True)
+            QMessageBox.warning(self, "Git Repository Exists",
+                                "The destination already contains a git repository. "
+                                "Untick the git option or choose another folder.")
+            return
+
+        hooks = self.creator.preset_hooks(preset_name)
+        run_hooks = False
+        if hooks:
+            commands = "\n".join(
+                f"• {name}: {spec['run'] if isinstance(spec['run'], str) else shlex.join(spec['run'])}"
+                for name, spec in hooks.items()
+            )
+            reply = QMessageBox.question(
+                self,
+                "Post-Create Hooks",
+                f"This template runs {len(hooks)} command(s) in the new project:\n\n{commands}\n\nRun them?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            run_hooks = reply == QMessageBox.StandardButton.Yes
+
+        job = self.jobs.submit(
+            preset_name, project_path, self.selected_options(), self.git_init_checkbox.isChecked(), run_hooks
+        )
+        self.jobs_group.setVisible(True)
         self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        self.show_status_message("Creating project structure...")
-        
-        # Create project in background thread
-        self.creation_thread = ProjectCreationThread(self.creator, preset_name, project_path)
-        self.creation_thread.progress_updated.connect(self.update_progress)
-        self.creation_thread.creation_finished.connect(self.on_creation_finished)
-        self.creation_thread.start()
-    
-    def update_progress(self, value, message):
-        """Update progress bar and status message."""
-        self.progress_bar.setValue(value)
-        self.show_status_message(message)
-    
-    def on_creation_finished(self, success, message):
-        """Handle project creation completion."""
-        self.progress_bar.setVisible(False)
-        self.create_button.setEnabled(True)
-        
-        if success:
-            project_path = self.path_input.text().strip()
-            self.add_to_recent_projects(project_path)
-            self.show_status_message("Project created successfully!", success=True)
-            
-            # Success message with options
-            msg = QMessageBox(self)
-            msg.setWindowTitle("Success! 🎉")
-            msg.setText(f"Project structure created successfully at:\n{project_path}")
-            msg.setInformativeText("What would you like to do next?")
-            open_folder_btn = msg.addButton("📁 Open Folder", QMessageBox.ButtonRole.ActionRole)
-            create_another_btn = msg.addButton("🔄 Create Another", QMessageBox.ButtonRole.ActionRole)
-            msg.addButton(QMessageBox.StandardButton.Ok)
-            
-            msg.exec()
-            
-            if msg.clickedButton() == open_folder_btn:
-                self.open_project_folder(project_path)
-            elif msg.clickedButton() == create_another_btn:
-                self.path_input.clear()
-                self.preset_combo.setCurrentIndex(0)
+        waiting = len(self.jobs.active()) - self.jobs.workers
+        if waiting > 0:
+            self.show_status_message(f"Queued {preset_name}; {waiting} job(s) waiting for a worker")
+        else:
+            self.show_status_message(f"Creating {preset_name} project structure...")
+        return job
+
+    def selected_job(self):
+        item = self.job_list.currentItem()
+        return self.jobs.jobs.get(item.data(0, Qt.ItemDataRole.UserRole)) if item else None
+
+    def update_job_buttons(self):
+        job = self.selected_job()
+        self.cancel_job_button.setEnabled(job is not None and not job.finished and job.cancellable)
+        self.retry_job_button.setEnabled(job is not None and job.state in ("failed", "cancelled"))
+
+    def cancel_job(self):
+        job = self.selected_job()
+        if job and self.jobs.cancel(job):
+            self.show_status_message(f"Cancelling {job.preset_name}...")
+
+    def retry_job(self):
+        job = self.selected_job()
+        if job and self.jobs.retry(job):
+            self.progress_bar.setVisible(True)
+            self.show_status_message(f"Retrying {job.preset_name}...")
+
+    def clear_finished_jobs(self):
+        for job_id in self.jobs.remove_finished():
+            item = self.job_items.pop(job_id)
+            self.job_list.takeTopLevelItem(self.job_list.indexOfTopLevelItem(item))
+        self.jobs_group.setVisible(bool(self.job_items))
+
+    def on_jobs_updated(self, jobs):
+        """Refresh the rows of the jobs that changed since the last update."""
+        symbols = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "⏹"}
+        for job in jobs:
+            item = self.job_items.get(job.id)
+            if item is None:
+                item = QTreeWidgetItem([job.preset_name, job.project_path, "", ""])
+                item.setData(0, Qt.ItemDataRole.UserRole, job.id)
+                item.setToolTip(1, job.project_path)
+                self.job_list.addTopLevelItem(item)
+                bar = QProgressBar()
+                bar.setMaximumHeight(16)
+                self.job_list.setItemWidget(item, 2, bar)
+                self.job_items[job.id] = item
+            self.job_list.itemWidget(item, 2).setValue(job.progress)
+            item.setText(3, f"{symbols[job.state]} {job.message}")
+            item.setToolTip(3, job.message)
+        active = self.jobs.active()
+        if active:
+            self.progress_bar.setValue(sum(job.progress for job in active) // len(active))
         else:
-            self.show_status_message("Failed to create project!", error=True)
-            QMessageBox.critical(self, "Error", message)
+            self.progress_bar.setVisible(False)
+        self.update_job_buttons()
+
+    def on_job_finished(self, job):
+        """Report a finished job; the full result dialog only appears once nothing else is running."""
+        name = os.path.basename(os.path.normpath(job.project_path)) or job.project_path
+        if job.state == "done":
+            failed = [result for result in job.hook_results if result.status != "ok"]
+            if failed:
+                self.show_status_message(f"{name} created; {len(failed)} hook(s) did not succeed", error=True)
+            else:
+                self.show_status_message(f"{name} created successfully!", success=True)
+        elif job.state == "failed":
+            self.show_status_message(f"Failed to create {name}!", error=True)
+        else:
+            self.show_status_message(f"Cancelled {name}")
+        if not self.jobs.active() and job.state != "cancelled":
+            self.show_job_result(job)
+
+    def show_job_result(self, job):
+        """The outcome of a finished job, with its hook results."""
+        if job is None or not job.finished:
+            return
+        if job.state == "failed":
+            QMessageBox.critical(self, "Error", job.message)
+            return
+        if job.state == "cancelled":
+            QMessageBox.information(self, "Cancelled", f"Creating {job.project_path} was cancelled.")
+            return
+        hook_results = job.hook_results
+
+        # Success message with options
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Success! 🎉")
+        msg.setText(f"Project structure created successfully at:\n{job.project_path}")
+        if hook_results:
+            msg.setInformativeText(
+                f"Post-create hooks:\n{self.creator.format_hook_results(hook_results)}\n\n"
+                "What would you like to do next?"
+            )
+            msg.setDetailedText("\n\n".join(
+                f"── {result.name} ({result.status}) ──\n{result.log.strip()}" for result in hook_results
+            ))
+        else:
+            msg.setInformativeText("What would you like to do next?")
+        open_folder_btn = msg.addButton("📁 Open Folder", QMessageBox.ButtonRole.ActionRole)
+        create_another_btn = msg.addButton("🔄 Create Another", QMessageBox.ButtonRole.ActionRole)
+        msg.addButton(QMessageBox.StandardButton.Ok)
+
+        msg.exec()
+
+        if msg.clickedButton() == open_folder_btn:
+            self.open_project_folder(job.project_path)
+        elif msg.clickedButton() == create_another_btn:
+            self.path_input.clear()
+            self.preset_combo.setCurrentIndex(0)
 
     def open_preset_editor(self):
-        self.preset_editor = PresetEditorWindow(self)
+        if not self.presets_ready():
+            return
+        if self.preset_editor is None:
+            self.preset_editor = PresetEditorWindow(self)
+        elif not self.preset_editor.isVisible():
+            self.preset_editor.reset()
         self.preset_editor.show()
+        self.preset_editor.raise_()
+        self.preset_editor.activateWindow()
 
     def open_preset_manager(self):
-        self.preset_manager = PresetManagerWindow(self)
+        if not self.presets_ready():
+            return
+        if self.preset_manager is None:
+            self.preset_manager = PresetManagerWindow(self)
+        elif not self.preset_manager.isVisible():
+            self.preset_manager.refresh_presets()
         self.preset_manager.show()
+        self.preset_manager.raise_()
+        self.preset_manager.activateWindow()
 
     def import_preset(self):
+        if not self.presets_ready():
+            return
         file_path, _ = QFileDialog.getOpenFileName(
             self,
             "Import Preset",
             "",
-            "JSON Files (*.json)"
+            f"Presets (*.json *{PresetBundle.EXTENSION} *{PresetStore.EXTENSION});;JSON Files (*.json);;"
+            f"Preset Bundles (*{PresetBundle.EXTENSION});;Preset Stores (*{PresetStore.EXTENSION})"
         )
         if file_path:
+            source = None
             try:
-                with open(file_path, 'r') as f:
-                    preset_data = json.load(f)
+                if file_path.endswith(PresetBundle.EXTENSION):
+                    source = PresetBundle(file_path)
+                    names = self.choose_bundle_presets(source)
+                    if names is None:
+                        return
+                    load = source.read
+                elif file_path.endswith(PresetStore.EXTENSION):
+                    # Imported stores are untrusted: add_preset validates every preset read
+                    source = PresetStore(file_path)
+                    names = list(source)
+                    load = source.__getitem__
+                else:
+                    with open(file_path, 'r') as f:
+                        preset_data = json.load(f)
+                    names = list(preset_data)
+                    load = preset_data.get
                 imported_count = 0
-                for name, structure in preset_data.items():
+                rejected = []
+                for name in names:
                     if name in self.creator.presets:
                         reply = QMessageBox.question(
                             self,
@@ -1583,16 +6571,63 @@ class MainWindow(QMainWindow):
                         )
                         if reply != QMessageBox.StandardButton.Yes:
                             continue
-                    self.creator.add_preset(name, structure)
+                    try:
+                        self.creator.add_preset(name, load(name), save=False)
+                    except PresetValidationError as e:
+                        rejected.append(f"{name}:\n{str(e)}")
+                        continue
                     imported_count += 1
+                if imported_count:
+                    self.creator.save_presets()
                 self.refresh_presets()
-                QMessageBox.information(
-                    self,
-                    "Import Complete",
-                    f"Successfully imported {imported_count} preset(s)!"
-                )
+                if rejected:
+                    QMessageBox.warning(
+                        self,
+                        "Import Complete",
+                        f"Imported {imported_count} preset(s). Skipped {len(rejected)} invalid preset(s):\n\n"
+                        + "\n\n".join(rejected)
+                    )
+                else:
+                    QMessageBox.information(
+                        self,
+                        "Import Complete",
+                        f"Successfully imported {imported_count} preset(s)!"
+                    )
             except Exception as e:
                 QMessageBox.critical(self, "Import Error", f"Failed to import preset:\n{str(e)}")
+            finally:
+                if source is not None:
+                    source.close()
+
+    def choose_bundle_presets(self, bundle):
+        """Let the user tick which presets of a bundle to import; only the manifest has been read."""
+
+        dialog = QDialog(self)
+        dialog.setWindowTitle("Import from Bundle")
+        dialog.setGeometry(300, 300, 450, 500)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"Select the presets to import ({len(bundle.names())} in bundle):"))
+        preset_list = QListWidget()
+        for name in bundle.names():
+            nodes = bundle.node_count(name)
+            label = f"{name}  ({nodes:,} items)" if nodes is not None else name
+            item = QListWidgetItem(label)
+            item.setData(Qt.ItemDataRole.UserRole, name)
+            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable)
+            item.setCheckState(Qt.CheckState.Checked)
+            preset_list.addItem(item)
+        layout.addWidget(preset_list)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return None
+        return [
+            preset_list.item(row).data(Qt.ItemDataRole.UserRole)
+            for row in range(preset_list.count())
+            if preset_list.item(row).checkState() == Qt.CheckState.Checked
+        ]
     
     def setup_keyboard_shortcuts(self):
         """Setup keyboard shortcuts for better UX."""
@@ -1627,65 +6662,44 @@ class MainWindow(QMainWindow):
     def setup_status_bar(self):
         """Setup status bar for feedback."""
         self.status_bar = QStatusBar()
+        self.status_serial = 0
         self.setStatusBar(self.status_bar)
-        self.status_bar.setStyleSheet("""
-            QStatusBar {
-                background: #16213e;
-                color: #e0e0e0;
-                border-top: 1px solid #0e3460;
-                padding: 5px;
-            }
-        """)
-        self.show_status_message("Ready to create project structures")
+        self.show_status_message("Loading templates...", 0)
+
+    def report_invalid_presets(self):
+        """Report the presets left out for invalid items, or that the app is ready."""
+        if self.creator.invalid_presets:
+            for name, problems in self.creator.invalid_presets.items():
+                # The status bar only has room for the names; the problems go to the terminal's error stream
+                print(f"Skipped invalid preset '{name}':\n{PresetValidationError(problems)}", file=sys.stderr)
+            names = ", ".join(self.creator.invalid_presets)
+            self.show_status_message(f"Skipped presets with invalid items: {names}", 10000, error=True)
+        else:
+            self.show_status_message("Ready to create project structures")
     
     def show_status_message(self, message, timeout=3000, success=False, error=False):
         """Show status message with optional styling."""
-        if success:
-            self.status_bar.setStyleSheet("""
-                QStatusBar {
-                    background: #27ae60;
-                    color: white;
-                    border-top: 1px solid #229954;
-                    padding: 5px;
-                }
-            """)
-        elif error:
-            self.status_bar.setStyleSheet("""
-                QStatusBar {
-                    background: #e74c3c;
-                    color: white;
-                    border-top: 1px solid #c0392b;
-                    padding: 5px;
-                }
-            """)
-        else:
-            self.status_bar.setStyleSheet("""
-                QStatusBar {
-                    background: #16213e;
-                    color: #e0e0e0;
-                    border-top: 1px solid #0e3460;
-                    padding: 5px;
-                }
-            """)
-        
+        state = "success" if success else "error" if error else ""
+        set_style_state(self.status_bar, state)
         self.status_bar.showMessage(message, timeout)
         
-        # Reset style after timeout
-        if success or error:
-            QTimer.singleShot(timeout, lambda: self.status_bar.setStyleSheet("""
-                QStatusBar {
-                    background: #16213e;
-                    color: #e0e0e0;
-                    border-top: 1px solid #0e3460;
-                    padding: 5px;
-                }
-            """))
+        # Reset style after timeout, unless a newer message took over
+        if state:
+            self.status_serial += 1
+            serial = self.status_serial
+            QTimer.singleShot(timeout, lambda: self.reset_status_style(serial))
+    
+    def reset_status_style(self, serial):
+        """Return the status bar to the default style if no newer message was shown."""
+        if serial == self.status_serial:
+            set_style_state(self.status_bar, "")
     
     def validate_input(self):
         """Validate path input in real-time."""
         path = self.path_input.text().strip()
         if not path:
             self.path_status.setText("")
+            set_style_state(self.path_status, "")
             self.create_button.setEnabled(True)
             return
         
@@ -1694,25 +6708,25 @@ class MainWindow(QMainWindow):
             if os.path.exists(abs_path):
                 if os.path.isdir(abs_path):
                     self.path_status.setText("✓ Valid directory")
-                    self.path_status.setStyleSheet("color: #27ae60; font-size: 12px; padding: 5px;")
+                    set_style_state(self.path_status, "valid")
                     self.create_button.setEnabled(True)
                 else:
                     self.path_status.setText("⚠ Path exists but is not a directory")
-                    self.path_status.setStyleSheet("color: #f39c12; font-size: 12px; padding: 5px;")
+                    set_style_state(self.path_status, "warning")
                     self.create_button.setEnabled(False)
             else:
                 parent_dir = os.path.dirname(abs_path)
                 if os.path.exists(parent_dir) and os.path.isdir(parent_dir):
                     self.path_status.setText("ℹ Directory will be created")
-                    self.path_status.setStyleSheet("color: #3498db; font-size: 12px; padding: 5px;")
+                    set_style_state(self.path_status, "info")
                     self.create_button.setEnabled(True)
                 else:
                     self.path_status.setText("✗ Invalid path")
-                    self.path_status.setStyleSheet("color: #e74c3c; font-size: 12px; padding: 5px;")
+                    set_style_state(self.path_status, "error")
                     self.create_button.setEnabled(False)
         except Exception:
             self.path_status.setText("✗ Invalid path format")
-            self.path_status.setStyleSheet("color: #e74c3c; font-size: 12px; padding: 5px;")
+            set_style_state(self.path_status, "error")
             self.create_button.setEnabled(False)
     
     def dragEnterEvent(self, event: QDragEnterEvent):
@@ -1731,66 +6745,131 @@ class MainWindow(QMainWindow):
             else:
                 self.show_status_message("Please drop a folder, not a file", error=True)
     
-    def load_recent_projects(self):
-        """Load recent projects from settings."""
-        return self.settings.value('recent_projects', [])
-    
-    def add_to_recent_projects(self, path):
-        """Add project to recent projects list."""
-        if path in self.recent_projects:
-            self.recent_projects.remove(path)
-        self.recent_projects.insert(0, path)
-        self.recent_projects = self.recent_projects[:10]  # Keep only 10 recent
-        self.settings.setValue('recent_projects', self.recent_projects)
-        self.update_recent_projects_menu()
+    def import_recent_projects(self):
+        """Move the recent projects list kept by older versions into the run history."""
+        legacy = self.settings.value('recent_projects')
+        if not legacy:
+            return
+        if isinstance(legacy, str):
+            legacy = [legacy]
+        now = time.time()
+        # The legacy list is newest first: stamp its entries a second apart, going back in time, so it keeps its order
+        for age, path in enumerate(legacy):
+            self.history.record("", path, started=now - age - 1)
+        self.settings.remove('recent_projects')
     
     def update_recent_projects_menu(self):
-        """Update recent projects menu (placeholder for now)."""
-        pass  # Could be expanded to show in a menu
+        """Rebuild the recent projects menu from the run history; called each time it opens."""
+        self.recent_menu.clear()
+        recent = self.history.recent_destinations(self.RECENT_LIMIT)
+        for destination, preset in recent:
+            if os.path.exists(destination):
+                label = f"📁 {destination}"
+            else:
+                label = f"⚠ {destination} (not found)"
+            if preset:
+                label += f"  ({preset})"
+            action = self.recent_menu.addAction(label)
+            action.triggered.connect(functools.partial(self.open_recent_project, destination))
+        if not recent:
+            self.recent_menu.addAction("No recent projects").setEnabled(False)
+        self.recent_menu.addSeparator()
+        self.recent_menu.addAction("🕘 Run History...", self.show_recent_projects)
+    
+    def open_recent_project(self, path):
+        if os.path.exists(path):
+            self.open_project_folder(path)
+        else:
+            QMessageBox.warning(self, "Path Not Found", f"The path no longer exists:\n{path}")
     
     def show_recent_projects(self):
-        """Show recent projects dialog."""
-        if not self.recent_projects:
-            QMessageBox.information(self, "Recent Projects", "No recent projects found.")
-            return
-        
-        from PyQt6.QtWidgets import QDialog, QListWidget, QDialogButtonBox
+        """Show the run history with search, filters and a per-template throughput trend."""
         
         dialog = QDialog(self)
-        dialog.setWindowTitle("Recent Projects")
-        dialog.setGeometry(200, 200, 500, 300)
+        dialog.setWindowTitle("Run History")
+        dialog.setGeometry(200, 200, 950, 600)
         layout = QVBoxLayout(dialog)
         
-        list_widget = QListWidget()
-        for project in self.recent_projects:
-            if os.path.exists(project):
-                list_widget.addItem(f"📁 {project}")
+        filter_layout = QHBoxLayout()
+        search_input = QLineEdit()
+        search_input.setPlaceholderText("🔍 Search destinations or templates...")
+        filter_layout.addWidget(search_input)
+        preset_filter = QComboBox()
+        preset_filter.addItem("All templates", "")
+        for preset_name in self.history.presets():
+            if preset_name:
+                preset_filter.addItem(preset_name, preset_name)
+        filter_layout.addWidget(preset_filter)
+        outcome_filter = QComboBox()
+        for label, outcome in (("All outcomes", ""), ("Succeeded", "ok"), ("Failed", "failed"), ("Cancelled", "cancelled")):
+            outcome_filter.addItem(label, outcome)
+        filter_layout.addWidget(outcome_filter)
+        layout.addLayout(filter_layout)
+        
+        run_list = QTreeWidget()
+        run_list.setRootIsDecorated(False)
+        run_list.setHeaderLabels(["When", "Template", "Destination", "Nodes", "Time", "Nodes/s", "Outcome"])
+        layout.addWidget(run_list)
+        summary = QLabel("")
+        summary.setProperty("role", "stats")
+        layout.addWidget(summary)
+        trend = QTextEdit()
+        trend.setReadOnly(True)
+        trend.setMaximumHeight(180)
+        layout.addWidget(trend)
+        
+        def refresh():
+            run_list.clear()
+            runs = self.history.search(
+                search_input.text().strip(), preset_filter.currentData(), outcome_filter.currentData(),
+                limit=self.HISTORY_LIMIT,
+            )
+            for run in runs:
+                item = QTreeWidgetItem([
+                    datetime.fromtimestamp(run.started).strftime("%Y-%m-%d %H:%M"),
+                    run.preset or "—",
+                    run.destination,
+                    f"{run.nodes:,}" if run.nodes is not None else "—",
+                    f"{run.duration * 1000:,.0f} ms" if run.duration is not None else "—",
+                    f"{run.throughput:,.0f}" if run.throughput else "—",
+                    run.outcome,
+                ])
+                item.setData(0, Qt.ItemDataRole.UserRole, run.destination)
+                item.setToolTip(2, f"{run.destination}\nMount: {run.mount}")
+                if run.throttled:
+                    item.setToolTip(4, f"{run.throttled * 1000:,.0f} ms held back by I/O limits")
+                if run.error:
+                    item.setToolTip(6, run.error)
+                run_list.addTopLevelItem(item)
+            more = " (most recent only; refine the search to see older runs)" if len(runs) == self.HISTORY_LIMIT else ""
+            summary.setText(f"{len(runs)} run(s){more}. Double-click a run to open its folder.")
+            preset_name = preset_filter.currentData()
+            if preset_name:
+                trend.setPlainText(self.history.format_trend(preset_name))
             else:
-                list_widget.addItem(f"⚠ {project} (not found)")
+                trend.setPlainText("Pick a template to see its throughput trend per day and mount.")
         
-        layout.addWidget(QLabel("Select a recent project to open:"))
-        layout.addWidget(list_widget)
+        # Re-query once typing pauses rather than on every keystroke
+        search_timer = QTimer(dialog)
+        search_timer.setSingleShot(True)
+        search_timer.setInterval(150)
+        search_timer.timeout.connect(refresh)
+        search_input.textChanged.connect(lambda _: search_timer.start())
+        preset_filter.currentIndexChanged.connect(lambda _: refresh())
+        outcome_filter.currentIndexChanged.connect(lambda _: refresh())
+        run_list.itemDoubleClicked.connect(
+            lambda item, _: self.open_recent_project(item.data(0, Qt.ItemDataRole.UserRole))
+        )
         
-        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
-        button_box.accepted.connect(dialog.accept)
+        button_box = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
         button_box.rejected.connect(dialog.reject)
         layout.addWidget(button_box)
-        
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            current_item = list_widget.currentItem()
-            if current_item:
-                path = current_item.text().replace("📁 ", "").replace("⚠ ", "").split(" (not found)")[0]
-                if os.path.exists(path):
-                    self.open_project_folder(path)
-                else:
-                    QMessageBox.warning(self, "Path Not Found", f"The path no longer exists:\n{path}")
+        refresh()
+        dialog.exec()
     
     def open_project_folder(self, path):
         """Open project folder in system file manager."""
         try:
-            import subprocess
-            import platform
-            
             system = platform.system()
             if system == "Windows":
                 subprocess.run(["explorer", path])
@@ -1810,48 +6889,385 @@ class MainWindow(QMainWindow):
         if geometry:
             self.restoreGeometry(geometry)
         
-        # Restore last selected preset
+        # Restore last selected preset, or once its layer is loaded
         last_preset = self.settings.value('last_preset')
         if last_preset:
             index = self.preset_combo.findText(last_preset)
             if index >= 0:
                 self.preset_combo.setCurrentIndex(index)
+            elif self.preset_loader.loading:
+                self.pending_preset = last_preset
         
         # Restore last path
         last_path = self.settings.value('last_path')
         if last_path and os.path.exists(last_path):
             self.path_input.setText(last_path)
+        self.git_init_checkbox.setChecked(self.settings.value('git_init', False, type=bool))
     
     def save_user_preferences(self):
         """Save user preferences to settings."""
         self.settings.setValue('geometry', self.saveGeometry())
-        self.settings.setValue('last_preset', self.preset_combo.currentText())
+        self.settings.setValue('last_preset', self.pending_preset or self.preset_combo.currentText())
         self.settings.setValue('last_path', os.path.dirname(self.path_input.text()) if self.path_input.text() else '')
+        self.settings.setValue('git_init', self.git_init_checkbox.isChecked())
     
     def closeEvent(self, event):
         """Handle application close event."""
         self.save_user_preferences()
-        if self.creation_thread and self.creation_thread.isRunning():
+        active = self.jobs.active()
+        if active:
             reply = QMessageBox.question(
                 self,
                 "Project Creation in Progress",
-                "A project is currently being created. Are you sure you want to exit?",
+                f"{len(active)} project(s) are still queued or being created. Cancel them and exit?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.No:
                 event.ignore()
                 return
-            self.creation_thread.terminate()
+        self.jobs.shutdown()
         event.accept()
 
+def _load_diff_side(creator, differ, spec):
+    """Resolve a diff argument to a structure or digest tree."""
+    if os.path.isdir(spec):
+        return differ.scan_directory(spec)
+    if spec in creator.presets:
+        return creator.preset_digest_tree(spec)
+    file_path, _, preset_name = spec.partition("#")
+    with open(file_path, 'r') as f:
+        data = json.load(f)
+    if preset_name:
+        return data[preset_name]
+    if len(data) == 1:
+        return next(iter(data.values()))
+    raise SystemExit(f"{file_path} holds {len(data)} presets; pick one with {file_path}#<preset>")
+
+def read_fleet_manifest(lines):
+    """(path, preset, option assignments) per project from ``preset<TAB>path[<TAB>name=value ...]`` lines.
+
+    Without tabs a line is ``preset path``. Blank lines and lines starting
+    with ``#`` are skipped.
+    """
+    projects = []
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip("\n")
+        if not line.strip() or line.lstrip().startswith("#"):
+            continue
+        fields = line.split("\t") if "\t" in line else line.strip().split(None, 1)
+        if len(fields) < 2 or not fields[0].strip() or not fields[1].strip():
+            raise ValueError(f"Line {number}: expected 'preset<TAB>path', got {line!r}")
+        assignments = fields[2].split() if len(fields) > 2 else []
+        projects.append((os.path.expanduser(fields[1].strip()), fields[0].strip(), assignments))
+    return projects
+
+def run_cli(argv):
+    """Run a headless command; returns the process exit code."""
+    parser = argparse.ArgumentParser(prog="main.py", description="Blueprint Generator command line")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    daemon_parser = commands.add_parser("daemon", help="Serve create/list/show/apply requests from a warm process")
+    daemon_parser.add_argument("--socket", help="Unix domain socket path to listen on")
+    daemon_parser.add_argument("--http", type=int, metavar="PORT", help="Localhost HTTP port to listen on")
+    daemon_parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent requests (default: 4)")
+
+    request_parser = commands.add_parser("request", help="Send a JSON request to a running daemon")
+    request_parser.add_argument("--socket", required=True, help="Unix domain socket of the daemon")
+    request_parser.add_argument("payload", help="JSON request, e.g. '{\"op\": \"list\"}'")
+
+    diff_parser = commands.add_parser("diff", help="Compare two presets, preset files or directories")
+    diff_parser.add_argument("old", help="Preset name, directory, or JSON file (file.json#preset to pick one)")
+    diff_parser.add_argument("new", help="Preset name, directory, or JSON file (file.json#preset to pick one)")
+    diff_parser.add_argument("--json", action="store_true", help="Print machine-readable JSON")
+
+    create_parser = commands.add_parser("create", help="Create a project, streaming each created path")
+    create_parser.add_argument("preset", help="Template name")
+    create_parser.add_argument("path", help="Destination folder")
+    create_parser.add_argument("--jsonl", action="store_true", help="Print one JSON record per created node")
+    create_parser.add_argument("--git", action="store_true", help="Also make the project a git repository with one commit")
+    create_parser.add_argument("--hooks", action="store_true", help="Run the template's post-create hooks afterwards")
+    create_parser.add_argument("--hook-jobs", type=int, help="Hooks to run at once (default: BLUEPRINT_HOOK_JOBS or 4)")
+    create_parser.add_argument("-o", "--option", action="append", default=[], metavar="NAME=VALUE",
+                               help="Set a template option, e.g. -o ci=gitlab -o tests=no (repeatable)")
+    create_parser.add_argument("--from", dest="source", metavar="FILE",
+                               help="Read the template from this presets JSON file, creating nodes while it is parsed")
+
+    audit_parser = commands.add_parser("audit", help="Check many existing projects for drift from their templates")
+    audit_parser.add_argument("manifest", help="File of 'preset<TAB>path[<TAB>name=value ...]' lines, or - for stdin")
+    audit_parser.add_argument("--jobs", type=int, help="Projects to scan at once (default: BLUEPRINT_AUDIT_JOBS or 4 per CPU)")
+    audit_parser.add_argument("--ignore", action="append", metavar="NAME",
+                              help="Skip entries with this name at any level (repeatable; default: .git)")
+    audit_parser.add_argument("--json", action="store_true", help="Print one JSON report per project")
+    audit_parser.add_argument("--details", action="store_true", help="List every missing, extra and mismatched node")
+
+    versions_parser = commands.add_parser("versions", help="List, show or restore saved versions of a template")
+    versions_parser.add_argument("preset", nargs="?", help="Template name (default: list templates with a history)")
+    versions_parser.add_argument("--show", type=int, metavar="N", help="Print version N as JSON")
+    versions_parser.add_argument("--restore", type=int, metavar="N", help="Make version N the current one")
+
+    stalls_parser = commands.add_parser("stalls", help="Report the actions that froze the GUI longest (BLUEPRINT_STALL_MS)")
+    stalls_parser.add_argument("--limit", type=int, default=10, help="Actions to list (default: 10)")
+
+    bench_parser = commands.add_parser("bench", help="Compare materialization backends")
+    bench_parser.add_argument("preset", nargs="?", default="react-app", help="Template to create (default: react-app)")
+    bench_parser.add_argument("--repeat", type=int, default=3, help="Runs per backend; the best is reported")
+    bench_parser.add_argument("--dir", help="Folder to benchmark in, e.g. on a network mount")
+
+    bundle_parser = commands.add_parser("bundle", help="Export, list or import compressed preset bundles")
+    bundle_parser.add_argument("action", choices=("export", "list", "import"))
+    bundle_parser.add_argument("file", help=f"Bundle file ({PresetBundle.EXTENSION})")
+    bundle_parser.add_argument("presets", nargs="*", help="Presets to export or import (default: all)")
+
+    convert_parser = commands.add_parser("convert", help="Convert a presets file between JSON and the binary store")
+    convert_parser.add_argument("source", help=f"presets .json or {PresetStore.EXTENSION} file")
+    convert_parser.add_argument("target", help=f"Output .json or {PresetStore.EXTENSION} file")
+
+    history_parser = commands.add_parser("history", help="Search past project creations or show a throughput trend")
+    history_parser.add_argument("search", nargs="?", default="", help="Text to find in destinations or template names")
+    history_parser.add_argument("--preset", help="Only runs of this template")
+    history_parser.add_argument("--outcome", choices=("ok", "failed", "cancelled"), help="Only runs with this outcome")
+    history_parser.add_argument("--mount", help="Only runs on this mount point")
+    history_parser.add_argument("--limit", type=int, default=20, help="Runs to list (default: 20)")
+    history_parser.add_argument("--trend", action="store_true", help="Show daily nodes/s per mount for --preset instead")
+    history_parser.add_argument("--days", type=int, default=30, help="Days covered by --trend (default: 30)")
+
+    args = parser.parse_args(argv)
+    if args.command == "history":
+        history = ProjectStructureCreator().run_history()
+        if args.trend:
+            if not args.preset:
+                parser.error("--trend needs --preset")
+            print(history.format_trend(args.preset, args.days))
+            return 0
+        for run in history.search(args.search, args.preset, args.outcome, args.mount, limit=args.limit):
+            when = datetime.fromtimestamp(run.started).strftime("%Y-%m-%d %H:%M:%S")
+            rate = f"{run.throughput:,.0f} nodes/s" if run.throughput else "-"
+            throttled = f"  (throttled {run.throttled:.1f}s)" if run.throttled else ""
+            print(f"{when}  {run.outcome:<9} {run.preset or '-':<20} {run.nodes if run.nodes is not None else '-':>7}  "
+                  f"{rate:>15}  {run.destination}{throttled}")
+        return 0
+    if args.command == "convert":
+        if args.source.endswith(PresetStore.EXTENSION):
+            source = PresetStore(args.source)
+        else:
+            with open(args.source, 'r') as f:
+                source = json.load(f)
+        validator = PresetValidator()
+        presets = {}
+        for name in source:
+            structure, problems = validator.check(source[name])
+            if problems:
+                print(f"Skipped {name}: {PresetValidationError(problems)}", file=sys.stderr)
+                continue
+            presets[name] = structure
+        if args.target.endswith(PresetStore.EXTENSION):
+            PresetStore.write(args.target, ((name, PresetStore.encode(structure)) for name, structure in presets.items()))
+        else:
+            with open(args.target, 'w') as f:
+                json.dump(presets, f, indent=2)
+        print(f"Converted {len(presets)} preset(s) to {args.target}")
+        return 0 if len(presets) == len(source) else 1
+    if args.command == "bundle":
+        creator = ProjectStructureCreator()
+        if args.action == "export":
+            missing = [name for name in args.presets if name not in creator.presets]
+            if missing:
+                print(f"Template not found: {', '.join(missing)}", file=sys.stderr)
+                return 1
+            creator.export_bundle(args.file, args.presets or list(creator.presets))
+            print(f"Exported {len(args.presets or creator.presets)} preset(s) to {args.file}")
+            return 0
+        with PresetBundle(args.file) as bundle:
+            if args.action == "list":
+                for name in bundle.names():
+                    nodes = bundle.node_count(name)
+                    print(f"{name}\t{'?' if nodes is None else nodes} items")
+                return 0
+            status = 0
+            for name in args.presets or bundle.names():
+                try:
+                    creator.add_preset(name, bundle.read(name), save=False)
+                    print(f"Imported {name}")
+                except (KeyError, PresetValidationError) as e:
+                    print(f"Skipped {name}: {e}", file=sys.stderr)
+                    status = 1
+            try:
+                creator.save_presets()
+            except OSError as e:
+                print(f"Error saving presets: {e}", file=sys.stderr)
+                return 1
+            return status
+    if args.command == "versions":
+        creator = ProjectStructureCreator()
+        history = creator.preset_history()
+        if not args.preset:
+            for name, count, kind in history.presets():
+                print(f"{name}\t{count} version(s){' (deleted)' if kind == 'deleted' else ''}")
+            return 0
+        try:
+            if args.show is not None:
+                print(json.dumps(history.version(args.preset, args.show), indent=2))
+                return 0
+            if args.restore is not None:
+                creator.restore_preset_version(args.preset, args.restore)
+                print(f"Restored version {args.restore} of {args.preset}")
+                return 0
+        except (KeyError, ValueError) as e:
+            print(e.args[0] if isinstance(e, KeyError) else e, file=sys.stderr)
+            return 1
+        versions = history.versions(args.preset)
+        if not versions:
+            print(f"No saved versions of {args.preset}", file=sys.stderr)
+            return 1
+        for version in versions:
+            when = datetime.fromtimestamp(version.saved).strftime("%Y-%m-%d %H:%M:%S")
+            nodes = f"{version.nodes:,}" if version.nodes is not None else "-"
+            stored = "deleted" if version.kind == "deleted" else f"{version.kind} {format_size(version.size)}"
+            print(f"v{version.version:<5} {when}  {nodes:>9} nodes  {stored}")
+        return 0
+    if args.command == "stalls":
+        log_path = os.path.join(ProjectStructureCreator.user_dir(), StallWatchdog.LOG_NAME)
+        print(StallWatchdog.format_report(StallWatchdog.read_log(log_path), args.limit))
+        return 0
+    if args.command == "audit":
+        try:
+            if args.manifest == "-":
+                entries = read_fleet_manifest(sys.stdin)
+            else:
+                with open(args.manifest, 'r', encoding='utf-8') as f:
+                    entries = read_fleet_manifest(f)
+        except (OSError, ValueError) as e:
+            print(e, file=sys.stderr)
+            return 1
+        creator = ProjectStructureCreator()
+        auditor = FleetAuditor(args.jobs, args.ignore or FleetAuditor.DEFAULT_IGNORE)
+        projects, reports = [], []
+        for path, preset_name, assignments in entries:
+            label = " ".join([preset_name] + assignments)
+            try:
+                if preset_name not in creator.presets:
+                    raise ValueError("Template not found")
+                plan = creator.compile_preset(preset_name, creator.parse_options(preset_name, assignments))
+            except ValueError as e:
+                reports.append(ProjectDrift(path, label, [], [], [], 0, 0.0, str(e)))
+                continue
+            projects.append((path, label, plan))
+        started = time.perf_counter()
+        drifted = scanned = 0
+        for report in itertools.chain(reports, auditor.audit(projects)):
+            drifted += report.drifted
+            scanned += report.scanned
+            if args.json:
+                print(json.dumps(dict(report._asdict(), drifted=report.drifted)), flush=True)
+            else:
+                print(report.format_details() if args.details else report.summary(), flush=True)
+        elapsed = time.perf_counter() - started
+        print(f"Audited {len(entries)} project(s), {scanned:,} entries, in {elapsed:.2f}s "
+              f"({len(entries) / max(elapsed, 1e-9):,.0f} projects/s) with {auditor.workers} workers: "
+              f"{drifted} drifted", file=sys.stderr)
+        return 1 if drifted else 0
+    if args.command == "bench":
+        creator = ProjectStructureCreator()
+        if args.preset not in creator.presets:
+            print(f"Template not found: {args.preset}", file=sys.stderr)
+            return 1
+        plan = creator.compile_preset(args.preset)
+        results = benchmark_backends(plan, args.repeat, args.dir)
+        baseline = results["path"]
+        for name, seconds in results.items():
+            print(f"{name:>6}: {seconds * 1000:9.1f} ms  {len(plan) / seconds:10.0f} nodes/s  "
+                  f"{baseline / seconds:5.2f}x")
+        return 0
+    if args.command == "create":
+        creator = ProjectStructureCreator()
+        if args.source:
+            if args.git or args.hooks or args.option:
+                parser.error("--from cannot be combined with --git, --hooks or -o")
+            record = None
+            try:
+                for record in creator.iter_create_streamed(args.source, args.path, args.preset):
+                    print(json.dumps(record._asdict()) if args.jsonl else record.path, flush=True)
+            except (OSError, KeyError, ValueError) as e:
+                print(e, file=sys.stderr)
+                return 1
+            if record is not None and record.throttled:
+                print(f"Held back {record.throttled:.2f}s by BLUEPRINT_IO_LIMITS", file=sys.stderr)
+            return 0
+        if args.preset not in creator.presets:
+            print(f"Template not found: {args.preset}", file=sys.stderr)
+            return 1
+        try:
+            options = creator.parse_options(args.preset, args.option)
+            creator.option_values(args.preset, options)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        record = None
+        for record in creator.iter_create(args.preset, args.path, git_init=args.git, options=options):
+            if args.jsonl:
+                print(json.dumps(record._asdict()), flush=True)
+            else:
+                print(record.path, flush=True)
+        if record is not None and record.throttled:
+            print(f"Held back {record.throttled:.2f}s by BLUEPRINT_IO_LIMITS", file=sys.stderr)
+        if args.hooks:
+            results = creator.run_hooks(args.preset, args.path, args.hook_jobs)
+            print(creator.format_hook_results(results), file=sys.stderr)
+            return 0 if all(result.status == "ok" for result in results) else 1
+        return 0
+    if args.command == "diff":
+        creator = ProjectStructureCreator()
+        differ = TreeDiffer()
+        changes = differ.diff(_load_diff_side(creator, differ, args.old), _load_diff_side(creator, differ, args.new))
+        if args.json:
+            print(json.dumps({"old": args.old, "new": args.new, "changes": changes}, indent=2))
+        else:
+            print(differ.format_diff(changes))
+        return 1 if changes else 0
+    if args.command == "daemon":
+        if not args.socket and args.http is None:
+            parser.error("daemon needs --socket and/or --http")
+        daemon = PresetDaemon(workers=args.workers)
+        if args.socket:
+            daemon.listen_unix(args.socket)
+            print(f"Listening on unix:{args.socket}")
+        if args.http is not None:
+            server = daemon.listen_http(args.http)
+            print(f"Listening on http://127.0.0.1:{server.server_address[1]} (token in {daemon.token_path})")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            daemon.shutdown()
+        return 0
+    if args.command == "request":
+        response = daemon_request(args.socket, json.loads(args.payload))
+        print(json.dumps(response, indent=2))
+        return 0 if response.get("ok") else 1
+    return 2
+
+CLI_COMMANDS = ("daemon", "request", "diff", "create", "audit", "bench", "bundle", "convert", "history", "versions",
+                "stalls")
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        sys.exit(run_cli(sys.argv[1:]))
     app = QApplication(sys.argv)
     app.setApplicationName("Blueprint Generator")
     app.setApplicationVersion("2.0")
+    app.setStyleSheet(APP_STYLESHEET)
     try:
         app.setWindowIcon(QIcon("icon.png"))
     except:
         pass
+    watchdog = StallWatchdog.from_environment(app)
+    if watchdog is not None:
+        watchdog.start()  # Before the main window, so a slow startup is caught too
     window = MainWindow()
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    QTimer.singleShot(0, window.report_startup_time)
+    status = app.exec()
+    if watchdog is not None:
+        watchdog.stop()
+        print(StallWatchdog.format_report(watchdog.stalls))
+    sys.exit(status)
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import TreeDiffer
+
+
+BASE = {
+    "$options": {"tests": {"default": True}},
+    "$if": {"tests": {"tests": {"test_app.py": None}}},
+    "src": {"app.py": "print('hi')\n"},
+}
+
+
+class TreeDifferDirectivesTest(unittest.TestCase):
+    def setUp(self):
+        self.differ = TreeDiffer()
+
+    def test_identical_presets_have_no_changes(self):
+        self.assertEqual(self.differ.diff(BASE, dict(BASE)), [])
+
+    def test_changed_if_block_is_reported(self):
+        changed = dict(BASE, **{"$if": {"tests": {"tests": {"test_app.py": None, "conftest.py": None}}}})
+        self.assertNotEqual(self.differ.digest_tree(BASE)[0], self.differ.digest_tree(changed)[0])
+        changes = self.differ.diff(BASE, changed)
+        self.assertEqual([(c["op"], c["path"]) for c in changes], [("added", "$if/tests/tests/conftest.py")])
+
+    def test_changed_options_are_reported(self):
+        changed = dict(BASE, **{"$options": {"tests": {"default": False}}})
+        changes = self.differ.diff(BASE, changed)
+        self.assertEqual([(c["op"], c["path"]) for c in changes], [("modified", "$options")])
+
+    def test_added_hooks_are_reported(self):
+        changed = dict(BASE, **{"$hooks": {"install": {"run": "npm install"}}})
+        changes = self.differ.diff(BASE, changed)
+        self.assertEqual([(c["op"], c["path"]) for c in changes], [("added", "$hooks")])
+
+    def test_directives_are_ignored_against_a_directory(self):
+        on_disk = self.differ._dir_node(self.differ.digest_tree(BASE)[1])
+        self.assertEqual(self.differ.diff(self.differ.digest_tree(BASE), on_disk), [])
+
+    def test_stats_do_not_change_the_digest(self):
+        with_stats = dict(BASE, **{"$stats": {"nodes": 2}})
+        self.assertEqual(self.differ.digest_tree(BASE)[0], self.differ.digest_tree(with_stats)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()